@@ -33,23 +33,30 @@ from os import environ
 from os.path import dirname, join, realpath
 
 # Cryptocompare API.
-from cryptocompare import (
-    get_historical_price_hour,
-    get_historical_price_minute,
-    get_price,
-)
+from cryptocompare import get_price
 
 # Loading environment variables from a `.env` file.
 from dotenv import load_dotenv
 
-# Manipulating the raw data to save it in a ``.csv`` files.
-from pandas import DataFrame, DatetimeIndex
-from pandas import concat as concat_df
+# Manipulating the raw data to save it in columnar files.
+from pandas import DataFrame
 from pandas import date_range
 
 # Twython API.
 from twython import Twython
 
+# Indexing the saved datasets.
+from catalog import Catalog
+
+# Fetching the prices of every coin concurrently.
+from crypto_fetcher import sync_crypto_datasets
+
+# Reading the partitions of collected tweets.
+from storage import read_partitions
+
+# Collecting tweets without duplicates, resuming from checkpoints.
+from tweet_collector import TweetCollector
+
 
 # %%
 def is_interactive():
@@ -117,53 +124,21 @@ LAST_DAY = datetime(2022, 3, 12)
 DATE_RANGE = date_range(end=LAST_DAY, periods=NUM_DAYS)
 
 
-def get_and_save_crypto_dataset(
-    cryptocurrencies: list[str], time_period: DatetimeIndex, save_folder: str
-):
-    """Get cryptocurrency data and save it to a csv file."""
-    for cryptocurrency in cryptocurrencies:
-        price_dataset = []
-        for date in time_period:
-            price_dataset += get_historical_price_hour(
-                cryptocurrency,
-                "USD",
-                limit=24,
-                toTs=date,
-            )
-
-        # Saving the raw price data to a csv file.
-        price_data_frame = DataFrame(price_dataset)
-        price_data_frame.to_csv(
-            join(
-                save_folder,
-                "raw",
-                "crypto",
-                f"{cryptocurrency.lower()}"
-                f"_{(time_period[0] - timedelta(days=1)).strftime('%Y_%m_%d')}"
-                f"-{time_period[-1].strftime('%Y_%m_%d')}_minute.csv",
-            ),
-            index=False,
-        )
-
-
-get_and_save_crypto_dataset(CRYPTOCURRENCIES, DATE_RANGE, DATA_DIR)
+# Only the prices missing from each coin's store are fetched, and they're
+# added to the store instead of a new file per run.
+sync_crypto_datasets(
+    CRYPTOCURRENCIES,
+    DATE_RANGE[0] - timedelta(days=1),
+    DATE_RANGE[-1],
+    join(DATA_DIR, "raw", "crypto"),
+    granularity="hour",
+    catalog=Catalog.load(DATA_DIR),
+)
 
 # %% [markdown]
 # ## Getting Twitter data
 
 # %%
-tweet_data: dict = {
-    "text": [],  # statuses
-    "retweet_count": [],
-    "favorite_count": [],
-    "followers_count": [],
-    "verified": [],
-    "listed_count": [],
-    "created_at": [],
-    "hashtags": [],
-    "name": [],
-}
-
 HASHTAG_LIST = [
     "#cryptocurrency",
     "#crypto",
@@ -179,55 +154,22 @@ HASHTAG_LIST = [
     "#SOL",
 ]
 
-
-def read_tweets(search_results):
-    """Read tweets from the search results into a data frame."""
-    for i in range(len(search_results["statuses"])):
-        for j, _ in tweet_data.items():
-            if (
-                (j == "text")
-                or (j == "retweet_count")
-                or (j == "favorite_count")
-            ):
-                tweet_data[j].append(search_results["statuses"][i][j])
-            elif j == "hashtags":
-                tweet_data[j].append(
-                    search_results["statuses"][i]["entities"][j]
-                )
-            else:
-                tweet_data[j].append(search_results["statuses"][i]["user"][j])
-
-    return DataFrame(tweet_data)
-
-
 date_today = datetime.today().strftime("%Y-%m-%d")
 
-
-def make_df(hashtag_list, until_date=date_today, result_type="popular"):
-    """Make a dataframe of tweets containing the specified hashtags."""
-    count = 0
-    tweets_dataframe = DataFrame()
-    for i in hashtag_list:
-        search_results = twitter.search(
-            count=100, q=i, until=until_date, result_type=result_type
-        )
-        tweets_dataframe = concat_df(
-            [tweets_dataframe, read_tweets(search_results)]
-        )
-        count = count + 1
-
-    return tweets_dataframe
-
-
-df = make_df(HASHTAG_LIST)
-
-df.to_csv(
-    join(
-        DATA_DIR,
-        "raw",
-        "twitter",
-        f"tweets_{date_today}.csv".replace("-", "_"),
-    )
+# Each hashtag is paged back to where its last collection stopped, and
+# tweets found by several hashtags are kept once.
+collector = TweetCollector(
+    twitter, join(DATA_DIR, "raw", "twitter", "collected")
 )
+new_partitions = collector.collect(
+    HASHTAG_LIST, until=date_today, result_type="popular"
+)
+# The new tweets are read straight from their partitions, which are the
+# only copy kept of them.
+if new_partitions:
+    df = read_partitions(collector.data_dir, new_partitions)
+else:
+    df = DataFrame()
+    print("No new tweets")
 
 df.head()
@@ -23,11 +23,23 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
 
-# Manipulating the raw data to save it in a ``.csv`` files.
+# Manipulating the raw data to save it in columnar files.
 from pandas import DataFrame, DatetimeIndex
 from pandas import concat as concat_df
 from pandas import date_range
 
+from catalog import Catalog
+from storage import (
+    find_table,
+    has_partition,
+    read_partitions,
+    read_table,
+    table_path,
+    write_partition,
+    write_table,
+)
+from time_utils import from_epoch
+
 
 # %%
 def is_interactive():
@@ -54,24 +66,21 @@ CRYPTOCURRENCIES = [
     "AVAX",
 ]
 
-prices_dataframe = pd.DataFrame()
+CATALOG = Catalog.load(DATA_DIR)
+
+prices_dataframes = []
 
 for cryptocurrency in CRYPTOCURRENCIES:
-    temp_dataframe = pd.read_csv(
-        join(
-            DATA_DIR,
-            "raw",
-            "crypto",
-            f"{cryptocurrency.lower()}_2022_03_05-2022_03_11_minute.csv",
-        )
+    temp_dataframe = CATALOG.load_prices(
+        cryptocurrency, datetime(2022, 3, 5), datetime(2022, 3, 12)
     )
 
-    temp_dataframe["time"] = temp_dataframe["time"].transform(
-        datetime.fromtimestamp
-    )
+    temp_dataframe["time"] = from_epoch(temp_dataframe["time"])
 
     temp_dataframe["cryptocurrency"] = cryptocurrency
-    prices_dataframe = pd.concat([prices_dataframe, temp_dataframe])
+    prices_dataframes.append(temp_dataframe)
+
+prices_dataframe = pd.concat(prices_dataframes)
 
 prices_dataframe.head()
 
@@ -81,34 +90,47 @@ NUM_DAYS = 7
 LAST_DAY = datetime(2022, 3, 11)
 DATE_RANGE = date_range(end=LAST_DAY, periods=NUM_DAYS)
 
-tweets_dataframe = pd.DataFrame()
+# Each day of tweets is processed once and kept as a partition, so adding a
+# day only processes that day.
+TWEETS_BY_DAY_DIR = join(DATA_DIR, "processed", "twitter", "tweets_by_day")
 
 for date in DATE_RANGE:
-    temp_dataframe = pd.read_csv(
-        join(
-            DATA_DIR,
-            "raw",
-            "twitter",
-            f"tweets-{date.strftime('%Y-%m-%d')}.csv",
-        )
+    day = date.strftime("%Y_%m_%d")
+    if has_partition(TWEETS_BY_DAY_DIR, day):
+        continue
+
+    temp_dataframe = read_table(
+        find_table(
+            join(
+                DATA_DIR,
+                "raw",
+                "twitter",
+                f"tweets-{date.strftime('%Y-%m-%d')}",
+            )
+        ),
+        parse_dates=["created_at"],
     )
+    write_partition(TWEETS_BY_DAY_DIR, day, temp_dataframe)
 
-    temp_dataframe["created_at"] = pd.to_datetime(temp_dataframe["created_at"])
-
-    tweets_dataframe = pd.concat([tweets_dataframe, temp_dataframe])
+tweets_dataframe = read_partitions(
+    TWEETS_BY_DAY_DIR, [date.strftime("%Y_%m_%d") for date in DATE_RANGE]
+)
 
 tweets_dataframe.head()
 
 # %%
-tweets_dataframe.to_csv(
-    join(
-        DATA_DIR,
-        "processed",
-        "twitter",
-        f"tweets"
-        f"_{(DATE_RANGE[0]).strftime('%Y_%m_%d')}"
-        f"-{DATE_RANGE[-1].strftime('%Y_%m_%d')}.csv",
-    )
+write_table(
+    tweets_dataframe,
+    table_path(
+        join(
+            DATA_DIR,
+            "processed",
+            "twitter",
+            f"tweets"
+            f"_{(DATE_RANGE[0]).strftime('%Y_%m_%d')}"
+            f"-{DATE_RANGE[-1].strftime('%Y_%m_%d')}",
+        )
+    ),
 )
 
 # %%
@@ -29,6 +29,9 @@ import seaborn as sns
 # Manipulating the raw data to save it in a ``.csv`` files.
 from pandas import DataFrame, DatetimeIndex
 
+from catalog import Catalog
+from time_utils import from_epoch
+
 
 # %%
 def is_interactive():
@@ -58,26 +61,25 @@ CRYPTOCURRENCIES = [
     "AVAX",
 ]
 
-prices_dataframe = pd.DataFrame()
+CATALOG = Catalog.load(DATA_DIR)
+
+prices_dataframes = []
 
 for cryptocurrency in CRYPTOCURRENCIES:
-    temp_dataframe = pd.read_csv(
-        join(
-            DATA_DIR,
-            "raw",
-            "crypto",
-            f"{cryptocurrency.lower()}_2022_03_05-2022_03_11_minute.csv",
-        ),
-        # Number of minutes in an hour + header row.
-        nrows=61,
+    # Only an hour of prices is graphed.
+    temp_dataframe = CATALOG.load_prices(
+        cryptocurrency,
+        datetime(2022, 3, 4, 18),
+        datetime(2022, 3, 4, 19),
+        columns=["open"],
     )
 
-    temp_dataframe["time"] = temp_dataframe["time"].transform(
-        datetime.fromtimestamp
-    )
+    temp_dataframe["time"] = from_epoch(temp_dataframe["time"])
 
     temp_dataframe["cryptocurrency"] = cryptocurrency
-    prices_dataframe = pd.concat([prices_dataframe, temp_dataframe])
+    prices_dataframes.append(temp_dataframe)
+
+prices_dataframe = pd.concat(prices_dataframes)
 
 prices_dataframe.head()
 
@@ -0,0 +1,45 @@
+"""Attach to each tweet the latest candle of its coin at the tweet's time."""
+
+import pandas as pd
+from pandas import DataFrame
+
+# Just under a minute, since merge_asof's tolerance is inclusive, so that a
+# tweet isn't joined to the candle of the minute before its own.
+MINUTE_TOLERANCE = pd.Timedelta(minutes=1) - pd.Timedelta(nanoseconds=1)
+
+
+def attach_candles(
+    tweets: DataFrame,
+    candles: DataFrame,
+    columns: list[str] | None = None,
+    by: str = "cryptocurrency",
+    on: str = "time",
+    tolerance: pd.Timedelta = MINUTE_TOLERANCE,
+) -> DataFrame:
+    """Join each tweet to the latest candle of its coin opened before it.
+
+    Tweets and candles of every coin, told apart by the `by` column, are
+    joined in one sorted pass. A tweet whose latest candle is more than
+    `tolerance` older is kept, with missing values for the candle's
+    `columns` (all of them by default). Tweets are returned in time order.
+
+    By default, a tweet is only joined to the candle of its own minute, as
+    merging on the tweet's minute would.
+    """
+    columns = [
+        column
+        for column in (candles.columns if columns is None else columns)
+        if column not in (by, on)
+    ]
+    tweets = tweets.sort_values(on, kind="stable")
+    candles = candles[[on, by, *columns]].sort_values(on, kind="stable")
+    # merge_asof needs the times to be of the same resolution.
+    candles[on] = candles[on].astype(tweets[on].dtype)
+    return pd.merge_asof(
+        tweets.drop(columns=columns, errors="ignore"),
+        candles,
+        on=on,
+        by=by,
+        tolerance=tolerance,
+        direction="backward",
+    ).reset_index(drop=True)
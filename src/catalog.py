@@ -0,0 +1,267 @@
+"""Index of the saved datasets by coin, granularity and time range."""
+
+import json
+import re
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from os import listdir, stat
+from os.path import basename, dirname, exists, join, realpath, splitext
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from storage import SUFFIXES, read_table
+
+# "../data"
+DATA_DIR = join(dirname(dirname(realpath(__file__))), "data")
+CRYPTO_DIR = join("raw", "crypto")
+TWITTER_DIR = join("processed", "twitter")
+INDEX_FILENAME = "catalog.json"
+
+# Names used for each coin in the file names of twitter datasets.
+COIN_NAMES = {
+    "BTC": "bitcoin",
+    "ETH": "ethereum",
+    "DOGE": "doge",
+    "SOL": "solana",
+    "AVAX": "avalanche",
+}
+COIN_TICKERS = {name: ticker for ticker, name in COIN_NAMES.items()}
+
+# Seconds between candles of each granularity, from finest to coarsest.
+GRANULARITIES = {"minute": 60, "hour": 60 * 60, "day": 24 * 60 * 60}
+
+# Dated files of a single fetch, e.g., "btc_2022_03_05-2022_03_11_minute",
+# or synced stores of every fetch, e.g., "btc_hour".
+CRYPTO_FILENAME = re.compile(
+    r"(?P<coin>[a-z]+)_(\d{4}_\d{2}_\d{2}-|(minute|hour|day)\.)"
+)
+
+
+@dataclass
+class CatalogEntry:
+    """A saved dataset and the time range it covers, in epoch seconds."""
+
+    path: str
+    kind: str
+    coin: str | None
+    granularity: str | None
+    start: int | None
+    end: int | None
+    mtime: float
+    size: int
+
+
+def to_epoch(time) -> int:
+    """Convert a time to epoch seconds, treating naive times as UTC."""
+    return int(pd.Timestamp(time).timestamp())
+
+
+def infer_granularity(times: np.ndarray) -> str | None:
+    """Get the granularity closest to the typical spacing of the times."""
+    if len(times) < 2:
+        return None
+    spacing = np.median(np.diff(np.sort(times)))
+    return min(
+        GRANULARITIES, key=lambda name: abs(GRANULARITIES[name] - spacing)
+    )
+
+
+def describe_crypto(path: str) -> tuple:
+    """Get the coin, granularity and time range of a price dataset."""
+    match = CRYPTO_FILENAME.match(basename(path))
+    coin = match["coin"].upper() if match else None
+    times = read_table(path, columns=["time"])["time"].to_numpy()
+    if len(times) == 0:
+        return coin, None, None, None
+    return coin, infer_granularity(times), int(times.min()), int(times.max())
+
+
+def describe_twitter(path: str) -> tuple:
+    """Get the coin, granularity and time range of a twitter dataset."""
+    name = splitext(basename(path))[0]
+    coin = COIN_TICKERS.get(name.removesuffix("_sentiment"))
+    try:
+        created_at = read_table(path, columns=["created_at"])["created_at"]
+    except (KeyError, ValueError):
+        # Not every dataset has tweets, e.g., coin membership tables.
+        return coin, None, None, None
+    created_at = pd.to_datetime(created_at, utc=True, format="mixed")
+    created_at = created_at.dropna()
+    if len(created_at) == 0:
+        return coin, None, None, None
+    return coin, None, to_epoch(created_at.min()), to_epoch(created_at.max())
+
+
+class Catalog:
+    """Index of the price and twitter datasets under the data directory.
+
+    The index is saved to ``catalog.json`` in the data directory, so loading
+    the catalog doesn't read the datasets again. Loading only lists the
+    dataset folders, and indexes the datasets added or changed since the
+    index was saved.
+    """
+
+    # Catalogs already loaded in this process, by data directory.
+    _loaded: dict[str, "Catalog"] = {}
+
+    def __init__(self, data_dir: str = DATA_DIR):
+        self.data_dir = data_dir
+        self.index_path = join(data_dir, INDEX_FILENAME)
+        self.entries: list[CatalogEntry] = []
+
+    @classmethod
+    def load(cls, data_dir: str = DATA_DIR) -> "Catalog":
+        """Load the saved index, updating it if the datasets changed.
+
+        Datasets are only checked for changes the first time a data
+        directory's catalog is loaded in a process. Later loads return the
+        same catalog, which writers keep up to date with `refresh`.
+        """
+        key = realpath(data_dir)
+        if key in cls._loaded:
+            return cls._loaded[key]
+
+        catalog = cls(data_dir)
+        if exists(catalog.index_path):
+            with open(catalog.index_path, encoding="utf-8") as index_file:
+                catalog.entries = [
+                    CatalogEntry(**entry) for entry in json.load(index_file)
+                ]
+            if catalog.is_stale():
+                catalog.refresh()
+        else:
+            catalog.refresh()
+        cls._loaded[key] = catalog
+        return catalog
+
+    def is_stale(self) -> bool:
+        """Check whether datasets were added, changed or removed.
+
+        Only the dataset folders are listed, and the datasets' files are
+        compared by size and modification time.
+        """
+        indexed = {
+            entry.path: (entry.mtime, entry.size) for entry in self.entries
+        }
+        current = {}
+        for folder in [CRYPTO_DIR, TWITTER_DIR]:
+            for path in self._dataset_paths(folder):
+                file_stat = stat(join(self.data_dir, path))
+                current[path] = (file_stat.st_mtime, file_stat.st_size)
+        return current != indexed
+
+    def refresh(self):
+        """Index new and changed datasets, and forget removed ones.
+
+        Only datasets whose size or modification time changed are read.
+        """
+        known = {entry.path: entry for entry in self.entries}
+        entries = []
+        for kind, folder, describe in [
+            ("crypto", CRYPTO_DIR, describe_crypto),
+            ("twitter", TWITTER_DIR, describe_twitter),
+        ]:
+            for path in self._dataset_paths(folder):
+                file_stat = stat(join(self.data_dir, path))
+                entry = known.get(path)
+                if (
+                    entry is None
+                    or entry.mtime != file_stat.st_mtime
+                    or entry.size != file_stat.st_size
+                ):
+                    entry = CatalogEntry(
+                        path,
+                        kind,
+                        *describe(join(self.data_dir, path)),
+                        mtime=file_stat.st_mtime,
+                        size=file_stat.st_size,
+                    )
+                entries.append(entry)
+
+        self.entries = entries
+        with open(self.index_path, "w", encoding="utf-8") as index_file:
+            json.dump([asdict(entry) for entry in entries], index_file)
+
+    def _dataset_paths(self, folder: str) -> list[str]:
+        """List the datasets in a folder, one file per dataset.
+
+        Columnar files are preferred over csv files of the same dataset.
+        """
+        paths: dict[str, str] = {}
+        filenames = listdir(join(self.data_dir, folder))
+        for suffix in reversed(SUFFIXES):
+            for filename in filenames:
+                stem, file_suffix = splitext(filename)
+                if file_suffix == suffix:
+                    paths[stem] = join(folder, filename)
+        return sorted(paths.values())
+
+    def find(
+        self,
+        kind: str,
+        coin: str | None = None,
+        granularity: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> list[CatalogEntry]:
+        """Find the datasets that overlap the time range."""
+        start_time = None if start is None else to_epoch(start)
+        end_time = None if end is None else to_epoch(end)
+        return [
+            entry
+            for entry in self.entries
+            if entry.kind == kind
+            and (coin is None or entry.coin == coin)
+            and (granularity is None or entry.granularity == granularity)
+            and (
+                start_time is None
+                or (entry.end is not None and entry.end >= start_time)
+            )
+            and (
+                end_time is None
+                or (entry.start is not None and entry.start < end_time)
+            )
+        ]
+
+    def load_prices(
+        self,
+        coin: str,
+        start: datetime,
+        end: datetime,
+        granularity: str = "minute",
+        columns: list[str] | None = None,
+    ) -> DataFrame:
+        """Load a coin's candles from `start` up to, excluding, `end`.
+
+        Only the datasets overlapping the range are read, including those of
+        finer granularities, which are thinned out to the requested one.
+        Candles found in several datasets are kept once.
+        """
+        step = GRANULARITIES[granularity]
+        start_time = to_epoch(start)
+        end_time = to_epoch(end)
+        if columns is not None and "time" not in columns:
+            columns = ["time", *columns]
+
+        pieces = [
+            read_table(join(self.data_dir, entry.path), columns=columns)
+            for entry in self.find("crypto", coin, start=start, end=end)
+            if GRANULARITIES.get(entry.granularity or "", np.inf) <= step
+        ]
+        if not pieces:
+            raise FileNotFoundError(
+                f"No {granularity} prices of {coin} from {start} to {end}"
+            )
+
+        prices = pd.concat(pieces, ignore_index=True)
+        times = prices["time"]
+        prices = prices[
+            (times >= start_time) & (times < end_time) & (times % step == 0)
+        ]
+        return (
+            prices.drop_duplicates(subset="time", keep="last")
+            .sort_values("time")
+            .reset_index(drop=True)
+        )
@@ -0,0 +1,109 @@
+"""Tag tweets with the cryptocurrencies they mention in a single scan."""
+
+import re
+from os.path import join
+
+import pandas as pd
+from pandas import DataFrame, Series
+
+from storage import find_table, read_table, table_path, write_table
+
+# Keywords mentioning each coin, keyed by the name used in file names.
+COIN_KEYWORDS = {
+    "bitcoin": ["bitcoin", "BTC"],
+    "ethereum": ["ethereum", "ETH"],
+    "doge": ["dogecoin", "DOGE"],
+    "avalanche": ["avalanche", "AVAX"],
+    "solana": ["solana", "SOL"],
+    "crypto": ["crypto", "cryptocurrency", "coin"],
+}
+KEYWORD_COINS = {
+    keyword: coin
+    for coin, keywords in COIN_KEYWORDS.items()
+    for keyword in keywords
+}
+# A lookahead finds overlapping matches too, e.g., "coin" in "bitcoin". Only
+# one keyword is reported per position, which is fine as long as keywords of
+# different coins aren't prefixes of each other.
+COIN_MATCHER = re.compile(
+    "(?=("
+    + "|".join(
+        re.escape(keyword)
+        for keyword in sorted(KEYWORD_COINS, key=len, reverse=True)
+    )
+    + "))"
+)
+
+SENTIMENT_NAME = "tweets_sentiment"
+MEMBERSHIP_NAME = "coin_membership"
+
+
+def tag_coins(texts: Series) -> DataFrame:
+    """Get the coins each text mentions, as one (row, coin) pair per row.
+
+    Rows are labelled by the index of `texts`.
+    """
+    rows = []
+    coins = []
+    for row, text in texts.items():
+        if not isinstance(text, str):
+            continue
+        for coin in dict.fromkeys(
+            KEYWORD_COINS[keyword] for keyword in COIN_MATCHER.findall(text)
+        ):
+            rows.append(row)
+            coins.append(coin)
+
+    return DataFrame(
+        {
+            "row": rows,
+            "coin": pd.Categorical(coins, categories=list(COIN_KEYWORDS)),
+        }
+    )
+
+
+def select_coin(
+    tweets: DataFrame, membership: DataFrame, coin: str
+) -> DataFrame:
+    """Select the tweets that mention a coin."""
+    coin_rows = membership.loc[membership["coin"] == coin, "row"]
+    return tweets[tweets.index.isin(coin_rows)]
+
+
+def save_coin_sentiment(data_dir: str, tweets: DataFrame, membership):
+    """Save the tweets once, along with which coins each one mentions."""
+    write_table(
+        tweets.rename_axis("row").reset_index(),
+        table_path(join(data_dir, SENTIMENT_NAME)),
+    )
+    write_table(membership, table_path(join(data_dir, MEMBERSHIP_NAME)))
+
+
+def load_coin_sentiment(
+    data_dir: str, coin: str, columns: list[str] | None = None
+) -> DataFrame:
+    """Load the sentiment of the tweets that mention a coin.
+
+    Only `columns` are read if given. Falls back to the per-coin
+    ``{coin}_sentiment`` datasets written before tweets were saved once with
+    a membership table.
+    """
+    parse_dates = (
+        ["created_at"] if columns is None or "created_at" in columns else []
+    )
+    try:
+        sentiment_path = find_table(join(data_dir, SENTIMENT_NAME))
+        membership_path = find_table(join(data_dir, MEMBERSHIP_NAME))
+    except FileNotFoundError:
+        return read_table(
+            find_table(join(data_dir, f"{coin}_sentiment")),
+            columns=columns,
+            parse_dates=parse_dates,
+        )
+
+    tweets = read_table(
+        sentiment_path,
+        columns=None if columns is None else ["row", *columns],
+        parse_dates=parse_dates,
+    ).set_index("row")
+    return select_coin(tweets, read_table(membership_path), coin)
@@ -0,0 +1,416 @@
+"""Fetch CryptoCompare candles of several coins concurrently.
+
+Candles are either saved to a new file per fetch, or synced into one store
+per coin and granularity, e.g., ``btc_hour.parquet``, which only the
+missing candles are fetched for.
+"""
+
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from os import environ, makedirs, replace
+from os.path import basename, dirname, exists, join
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+import pandas as pd
+from pandas import DataFrame
+
+from catalog import GRANULARITIES, Catalog, to_epoch
+from storage import read_table, table_path, write_table
+
+API_URL = "https://min-api.cryptocompare.com/data/v2"
+ENDPOINTS = {"minute": "histominute", "hour": "histohour", "day": "histoday"}
+# Most candles a single call may ask for, besides the one at `toTs`.
+MAX_LIMIT = 2000
+# Where stores are written before replacing the old ones. It's a folder, so
+# the catalog never indexes a half written store.
+PARTIAL_DIR = ".partial"
+
+
+class FetchError(Exception):
+    """A request that kept failing, or that can't succeed by retrying."""
+
+
+class TokenBucket:
+    """Limit requests to `rate` per second, allowing bursts of `capacity`."""
+
+    def __init__(self, rate: float, capacity: int | None = None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a request may be made."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated) * self.rate,
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class FetcherConfig:
+    """How fast, and how persistently, to query the API."""
+
+    base_url: str = API_URL
+    api_key: str | None = None
+    # Requests per second, and how many may be made at once after idling.
+    rate: float = 20
+    burst: int = 20
+    retries: int = 5
+    # Seconds before the first retry, doubled on each following one.
+    backoff: float = 1
+    timeout: float = 30
+    # Requests in flight at once, each of which takes up a thread.
+    concurrency: int = 16
+
+
+def get_windows(
+    start_time: int, end_time: int, step: int, limit: int = MAX_LIMIT
+) -> list[tuple[int, int]]:
+    """Split a time range into the (toTs, limit) of the calls covering it.
+
+    A call returns the candle at `toTs` and the `limit` candles before it.
+    """
+    windows = []
+    to_ts = end_time - end_time % step
+    while to_ts >= start_time:
+        # The API asks for at least one candle before `toTs`.
+        window_limit = max(1, min(limit, (to_ts - start_time) // step))
+        windows.append((to_ts, window_limit))
+        to_ts -= (window_limit + 1) * step
+    return windows
+
+
+def should_retry(error: Exception) -> bool:
+    """Check whether a failed request may succeed if it's made again."""
+    if isinstance(error, HTTPError):
+        return error.code == 429 or error.code >= 500
+    return isinstance(error, (URLError, TimeoutError, ConnectionError))
+
+
+def retry_after(header: str | None, default: float) -> float:
+    """Get the seconds to wait before retrying from a Retry-After header.
+
+    The header is either a number of seconds or an HTTP date to wait until.
+    Missing or malformed headers give the default.
+    """
+    if header is None:
+        return default
+    try:
+        return max(0.0, float(header))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return default
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def run(coroutine):
+    """Run a coroutine to completion, even from within a running loop.
+
+    Notebooks already run an event loop, which `asyncio.run` refuses to
+    nest in, so the coroutine then runs in a loop of its own thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+class CryptoCompareFetcher:
+    """Fetch the candles of coins across many concurrent API calls.
+
+    Calls are spread out by a token bucket, so bursts don't hit the API's
+    rate limit, and calls that fail on rate limits, server or network errors
+    are retried with exponential backoff.
+    """
+
+    def __init__(self, config: FetcherConfig | None = None):
+        self.config = config or FetcherConfig()
+        if self.config.api_key is None:
+            self.config.api_key = environ.get("CRYPTOCOMPARE_API_KEY")
+
+    def _get(self, url: str) -> dict:
+        """Make a blocking API call, returning its decoded response."""
+        request = Request(url)
+        if self.config.api_key:
+            request.add_header(
+                "authorization", f"Apikey {self.config.api_key}"
+            )
+        with urlopen(request, timeout=self.config.timeout) as response:
+            return json.load(response)
+
+    async def fetch_page(
+        self,
+        bucket: TokenBucket,
+        semaphore: asyncio.Semaphore,
+        coin: str,
+        currency: str,
+        granularity: str,
+        to_ts: int,
+        limit: int,
+    ) -> list[dict]:
+        """Fetch the candles of a single call, retrying it if it fails."""
+        query = urlencode(
+            {"fsym": coin, "tsym": currency, "limit": limit, "toTs": to_ts}
+        )
+        url = f"{self.config.base_url}/{ENDPOINTS[granularity]}?{query}"
+
+        for attempt in range(self.config.retries + 1):
+            await bucket.acquire()
+            try:
+                async with semaphore:
+                    response = await asyncio.to_thread(self._get, url)
+            except Exception as error:  # pylint: disable=broad-except
+                if not should_retry(error) or attempt == self.config.retries:
+                    raise FetchError(f"{url}: {error}") from error
+                delay = self.config.backoff * 2**attempt
+                if isinstance(error, HTTPError):
+                    delay = retry_after(
+                        error.headers.get("Retry-After"), delay
+                    )
+            else:
+                if response.get("Response") != "Error":
+                    return response["Data"]["Data"]
+                message = response.get("Message", "")
+                # Rate limits are also reported in successful responses.
+                if (
+                    "rate limit" not in message.lower()
+                    or attempt == self.config.retries
+                ):
+                    raise FetchError(f"{url}: {message}")
+                delay = self.config.backoff * 2**attempt
+
+            await asyncio.sleep(delay * random.uniform(1, 1.5))
+        raise FetchError(url)
+
+    async def fetch_coin(
+        self,
+        bucket: TokenBucket,
+        semaphore: asyncio.Semaphore,
+        coin: str,
+        start: datetime,
+        end: datetime,
+        currency: str = "USD",
+        granularity: str = "hour",
+    ) -> DataFrame:
+        """Fetch a coin's candles from `start` to `end`, inclusive.
+
+        Ranges beyond a single call's limit are split by `toTs` into windows
+        that are all fetched at once.
+        """
+        step = GRANULARITIES[granularity]
+        start_time = to_epoch(start)
+        end_time = to_epoch(end)
+        pages = await asyncio.gather(
+            *(
+                self.fetch_page(
+                    bucket,
+                    semaphore,
+                    coin,
+                    currency,
+                    granularity,
+                    to_ts,
+                    limit,
+                )
+                for to_ts, limit in get_windows(start_time, end_time, step)
+            )
+        )
+
+        candles = DataFrame([candle for page in pages for candle in page])
+        if candles.empty:
+            return candles
+        candles = candles[
+            (candles["time"] >= start_time) & (candles["time"] <= end_time)
+        ]
+        return (
+            candles.drop_duplicates(subset="time", keep="last")
+            .sort_values("time")
+            .reset_index(drop=True)
+        )
+
+    async def fetch_and_save(
+        self,
+        coins: list[str],
+        start: datetime,
+        end: datetime,
+        save_folder: str,
+        currency: str = "USD",
+        granularity: str = "hour",
+        filename_suffix: str | None = None,
+    ) -> dict[str, str]:
+        """Fetch the candles of every coin, saving each as soon as it's done.
+
+        Every coin's calls share the rate limit. Files are named after the
+        coin, the dates and `filename_suffix` (`granularity` by default),
+        e.g., ``btc_2022_03_11-2022_03_12_hour``. Returns the path each coin
+        was saved to.
+        """
+        bucket = TokenBucket(self.config.rate, self.config.burst)
+        semaphore = asyncio.Semaphore(self.config.concurrency)
+        suffix = filename_suffix or granularity
+
+        async def fetch(coin: str) -> tuple[str, DataFrame]:
+            return coin, await self.fetch_coin(
+                bucket, semaphore, coin, start, end, currency, granularity
+            )
+
+        paths = {}
+        for completed in asyncio.as_completed([fetch(c) for c in coins]):
+            coin, candles = await completed
+            filename = (
+                f"{coin.lower()}_{start.strftime('%Y_%m_%d')}"
+                f"-{end.strftime('%Y_%m_%d')}_{suffix}"
+            )
+            paths[coin] = table_path(join(save_folder, filename))
+            await asyncio.to_thread(write_table, candles, paths[coin])
+        return paths
+
+    async def sync(
+        self,
+        coins: list[str],
+        start: datetime,
+        end: datetime,
+        save_folder: str,
+        currency: str = "USD",
+        granularity: str = "hour",
+    ) -> dict[str, int]:
+        """Bring each coin's store up to `end`, fetching only what's missing.
+
+        Coins without a store yet are fetched from `start`. Returns how many
+        candles were added to each coin's store.
+        """
+        bucket = TokenBucket(self.config.rate, self.config.burst)
+        semaphore = asyncio.Semaphore(self.config.concurrency)
+        step = GRANULARITIES[granularity]
+
+        async def sync_coin(coin: str) -> tuple[str, int]:
+            path = store_path(save_folder, coin, granularity)
+            stored = await asyncio.to_thread(read_store, path)
+            # The last stored candle is fetched again, since it may have
+            # been saved before its period was over.
+            fetch_start = (
+                start
+                if stored.empty
+                else pd.Timestamp(stored["time"].max(), unit="s")
+            )
+            if to_epoch(fetch_start) > to_epoch(end):
+                return coin, 0
+
+            candles = await self.fetch_coin(
+                bucket,
+                semaphore,
+                coin,
+                fetch_start,
+                end,
+                currency,
+                granularity,
+            )
+            added = await asyncio.to_thread(
+                append_to_store, path, stored, candles
+            )
+            return coin, added
+
+        added = {}
+        for completed in asyncio.as_completed([sync_coin(c) for c in coins]):
+            coin, count = await completed
+            added[coin] = count
+        return added
+
+
+def store_path(save_folder: str, coin: str, granularity: str) -> str:
+    """Get the path of a coin's canonical store of candles."""
+    return table_path(join(save_folder, f"{coin.lower()}_{granularity}"))
+
+
+def read_store(path: str) -> DataFrame:
+    """Load a coin's store, which is empty if nothing was synced yet."""
+    return read_table(path) if exists(path) else DataFrame()
+
+
+def append_to_store(path: str, stored: DataFrame, candles: DataFrame) -> int:
+    """Add new candles to a coin's store, returning how many were new.
+
+    Candles already in the store are replaced by their fetched version. The
+    store is written next to the old one first, so an interrupted sync
+    doesn't lose it.
+    """
+    if candles.empty:
+        return 0
+    added = (
+        len(candles)
+        if stored.empty
+        else int((~candles["time"].isin(stored["time"])).sum())
+    )
+    combined = (
+        pd.concat([stored, candles], ignore_index=True)
+        .drop_duplicates(subset="time", keep="last")
+        .sort_values("time")
+        .reset_index(drop=True)
+    )
+
+    partial_dir = join(dirname(path), PARTIAL_DIR)
+    makedirs(partial_dir, exist_ok=True)
+    partial_path = join(partial_dir, basename(path))
+    write_table(combined, partial_path)
+    replace(partial_path, path)
+    return added
+
+
+def fetch_crypto_datasets(
+    coins: list[str],
+    start: datetime,
+    end: datetime,
+    save_folder: str,
+    config: FetcherConfig | None = None,
+    **kwargs,
+) -> dict[str, str]:
+    """Fetch and save the candles of every coin, see `fetch_and_save`."""
+    fetcher = CryptoCompareFetcher(config)
+    return run(
+        fetcher.fetch_and_save(coins, start, end, save_folder, **kwargs)
+    )
+
+
+def sync_crypto_datasets(
+    coins: list[str],
+    start: datetime,
+    end: datetime,
+    save_folder: str,
+    config: FetcherConfig | None = None,
+    catalog: Catalog | None = None,
+    **kwargs,
+) -> dict[str, int]:
+    """Sync every coin's store of candles, see `CryptoCompareFetcher.sync`.
+
+    The catalog, if given, is refreshed once the stores are written, so its
+    `load_prices` returns the synced candles.
+    """
+    fetcher = CryptoCompareFetcher(config)
+    added = run(fetcher.sync(coins, start, end, save_folder, **kwargs))
+    if catalog is not None and any(added.values()):
+        catalog.refresh()
+    return added
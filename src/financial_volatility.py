@@ -33,6 +33,20 @@ from pandas import DataFrame, DatetimeIndex
 from pandas import concat as concat_df
 from pandas import date_range
 
+from asof_join import attach_candles
+from catalog import Catalog
+from coin_tagging import load_coin_sentiment
+from sentiment_bars import (
+    resample_sentiment,
+    save_sentiment_bars,
+    stack_bars,
+)
+from social_volatility import rank_social_volatility
+from time_utils import floor_minute, from_epoch, strip_timezone
+from tweet_features import KEY_COLUMNS, join_features, load_features
+from volatility import OHLC_COLUMNS, compute_volatilities, stack_prices
+from volatility_stream import SocialVolatilityStream, frame_events
+
 
 # %%
 # Create and resolve paths to the data in an OS agnostic way.
@@ -52,14 +66,6 @@ else:
 DATA_DIR = path.join(path.dirname(SCRIPT_DIR), "data")
 
 
-# %%
-def hour_rounder(t):
-    # Rounds to nearest hour by adding a timedelta hour if minute >= 30
-    return t.replace(
-        second=0, microsecond=0, minute=0, hour=t.hour
-    ) + timedelta(hours=t.minute // 30)
-
-
 # %%
 # Read in the raw cryptocurrency data.
 CRYPTOCURRENCIES = {
@@ -71,19 +77,21 @@ CRYPTOCURRENCIES = {
 }
 
 
+CATALOG = Catalog.load(DATA_DIR)
+
+
 def load_dataset(
     cryptocurrency: str, start_date: datetime, end_date: datetime
 ):
-    filename = path.join(
-        DATA_DIR,
-        "raw",
-        "crypto",
-        f"{cryptocurrency.lower()}_{start_date.strftime('%Y_%m_%d')}"
-        f"-{end_date.strftime('%Y_%m_%d')}_minute.csv",
+    """Load the minutely prices from the start date to the end date."""
+    crypto_df = CATALOG.load_prices(
+        cryptocurrency,
+        start_date,
+        end_date + timedelta(days=1),
+        columns=["open"],
     )
-    crypto_df = pd.read_csv(filename, index_col=0)
-    crypto_df = crypto_df[["time", "open"]].rename({"open": "price"}, axis=1)
-    crypto_df["time"] = crypto_df["time"].transform(datetime.fromtimestamp)
+    crypto_df = crypto_df.rename({"open": "price"}, axis=1)
+    crypto_df["time"] = from_epoch(crypto_df["time"])
     crypto_df["cryptocurrency"] = cryptocurrency
 
     return crypto_df
@@ -139,92 +147,128 @@ def get_financial_volatilitys(
 
 
 # %%
-def append_financial_volatilities(start_date: datetime, end_date: datetime):
-    """Append the financial volatility for all cryptocurrencies"""
-    global btc_prices, eth_prices, doge_prices, sol_prices, avax_prices
-    btc_prices = pd.concat(
-        [btc_prices, get_financial_volatilitys("BTC", start_date, end_date)]
-    )
-    eth_prices = pd.concat(
-        [eth_prices, get_financial_volatilitys("ETH", start_date, end_date)]
-    )
-    doge_prices = pd.concat(
-        [doge_prices, get_financial_volatilitys("DOGE", start_date, end_date)]
-    )
-    sol_prices = pd.concat(
-        [sol_prices, get_financial_volatilitys("SOL", start_date, end_date)]
-    )
-    avax_prices = pd.concat(
-        [avax_prices, get_financial_volatilitys("AVAX", start_date, end_date)]
-    )
+def get_financial_volatilities(intervals: list[tuple[datetime, datetime]]):
+    """Calculate the financial volatility of each cryptocurrency.
+
+    The prices of each interval are joined once per cryptocurrency.
+    """
+    return {
+        cryptocurrency: pd.concat(
+            [
+                get_financial_volatilitys(cryptocurrency, start, end)
+                for start, end in intervals
+            ]
+        )
+        for cryptocurrency in CRYPTOCURRENCIES
+    }
 
 
 # %%
-btc_prices = DataFrame()
-eth_prices = DataFrame()
-doge_prices = DataFrame()
-sol_prices = DataFrame()
-avax_prices = DataFrame()
-
-start_date = datetime(2022, 3, 5)
-end_date = datetime(2022, 3, 11)
-
-append_financial_volatilities(start_date, end_date)
-
-start_date = datetime(2022, 3, 28)
-end_date = datetime(2022, 4, 4)
-
-append_financial_volatilities(start_date, end_date)
+INTERVALS = [
+    (datetime(2022, 3, 5), datetime(2022, 3, 11)),
+    (datetime(2022, 3, 28), datetime(2022, 4, 4)),
+]
+
+financial_volatilities = get_financial_volatilities(INTERVALS)
+btc_prices = financial_volatilities["BTC"]
+eth_prices = financial_volatilities["ETH"]
+doge_prices = financial_volatilities["DOGE"]
+sol_prices = financial_volatilities["SOL"]
+avax_prices = financial_volatilities["AVAX"]
 
 print(btc_prices.head())
 print(btc_prices.tail())
 
+# %% [markdown]
+# ## Volatility over several windows and estimators
+#
+# Besides the 2 minute close-to-close volatility, the volatility of every
+# coin is estimated over 5 minutes, 15 minutes, an hour and a day, from the
+# returns (close-to-close, EWMA) and from the range of each candle
+# (Parkinson, Garman-Klass).
 
 # %%
-def floor_minute(t: datetime):
-    """Floor the minute of a datetime."""
-    return t.replace(second=0, microsecond=0)
-
-
-def sync_twitter_and_crypto_data(cryptocurrency, crypto_df):
-    financial_volatility_and_sentiment_df = DataFrame()
-    twitter_df = pd.read_csv(
-        path.join(
-            DATA_DIR,
-            "processed",
-            "twitter",
-            f"{CRYPTOCURRENCIES[cryptocurrency]}_sentiment.csv",
-        ),
-        index_col=0,
-    )
-    twitter_df = twitter_df[["created_at", "vader_sentiment_compound"]].rename(
-        {"created_at": "time", "vader_sentiment_compound": "sentiment"}, axis=1
+ohlc_prices = {
+    cryptocurrency: pd.concat(
+        [
+            CATALOG.load_prices(
+                cryptocurrency,
+                start,
+                end + timedelta(days=1),
+                columns=OHLC_COLUMNS,
+            )
+            for start, end in INTERVALS
+        ]
     )
+    for cryptocurrency in CRYPTOCURRENCIES
+}
+volatilities = compute_volatilities(stack_prices(ohlc_prices))
+volatilities.xs("1h", axis=1, level="window").describe()
 
-    price_dict = crypto_df.set_index("time")["price"].to_dict()
 
-    twitter_df["time"] = twitter_df["time"].transform(
-        lambda x: pd.to_datetime(x).tz_localize(None)
-    )
-    twitter_df["time"] = twitter_df["time"].transform(floor_minute)
-    crypto_df["time"] = crypto_df["time"].transform(floor_minute)
+# %%
+# Influence of each tweet, computed once by `twitter_influence_feature.py`.
+TWEET_FEATURES = load_features(
+    path.join(DATA_DIR, "processed", "twitter"), ["influence"]
+)
 
-    financial_volatility_and_sentiment_df = crypto_df.merge(
-        twitter_df, on="time"
-    ).drop_duplicates()
 
-    financial_volatility_and_sentiment_df = (
-        financial_volatility_and_sentiment_df[
-            financial_volatility_and_sentiment_df["sentiment"].notna()
-        ]
+def load_tweet_sentiment():
+    """Load the sentiment and influence of the tweets of each coin."""
+    return pd.concat(
+        [
+            join_features(
+                load_coin_sentiment(
+                    path.join(DATA_DIR, "processed", "twitter"),
+                    name,
+                    # The key columns identify each tweet in the store.
+                    columns=[*KEY_COLUMNS, "vader_sentiment_compound"],
+                ),
+                TWEET_FEATURES,
+            )[["created_at", "vader_sentiment_compound", "influence"]]
+            .rename(
+                {
+                    "created_at": "time",
+                    "vader_sentiment_compound": "sentiment",
+                },
+                axis=1,
+            )
+            .assign(cryptocurrency=cryptocurrency)
+            for cryptocurrency, name in CRYPTOCURRENCIES.items()
+        ],
+        ignore_index=True,
     )
 
-    return financial_volatility_and_sentiment_df
 
+def sync_twitter_and_crypto_data(tweets: DataFrame, prices: DataFrame):
+    """Attach the latest minute's volatility of its coin to each tweet.
 
-financial_volatility_and_sentiment_df = sync_twitter_and_crypto_data(
-    "BTC", btc_prices
+    Tweets without a candle in the minute before them are left out. The
+    datasets repeat many tweets, so tweets of the same minute and sentiment
+    count once.
+    """
+    columns = ["price", "minutely_return", "minutely_volatility"]
+    tweets = tweets.assign(time=strip_timezone(tweets["time"]))
+    synced = attach_candles(
+        tweets[tweets["sentiment"].notna()], prices, columns=columns
+    )
+    synced = synced[synced["price"].notna()]
+    return synced[
+        ~synced.assign(minute=floor_minute(synced["time"])).duplicated(
+            ["cryptocurrency", "minute", *columns, "sentiment"]
+        )
+    ]
+
+
+tweet_sentiment = load_tweet_sentiment()
+synced_df = sync_twitter_and_crypto_data(
+    tweet_sentiment, pd.concat(financial_volatilities.values())
 )
+print(f"{len(tweet_sentiment) - len(synced_df)} tweets without prices")
+
+financial_volatility_and_sentiment_df = synced_df[
+    synced_df["cryptocurrency"] == "BTC"
+]
 print(len(financial_volatility_and_sentiment_df))
 print(financial_volatility_and_sentiment_df.head())
 print(financial_volatility_and_sentiment_df.tail())
@@ -239,10 +283,10 @@ btc_social_volitility
 
 
 # %%
-def get_social_volitility(cryptocurrency, crypto_df):
-    financial_volatility_and_sentiment_df = sync_twitter_and_crypto_data(
-        cryptocurrency, crypto_df
-    )
+def get_social_volitility(cryptocurrency, synced_df):
+    financial_volatility_and_sentiment_df = synced_df[
+        synced_df["cryptocurrency"] == cryptocurrency
+    ]
     return abs(
         financial_volatility_and_sentiment_df[
             ["minutely_volatility", "sentiment"]
@@ -250,10 +294,10 @@ def get_social_volitility(cryptocurrency, crypto_df):
     )
 
 
-eth_social_volitility = get_social_volitility("ETH", eth_prices)
-doge_social_volitility = get_social_volitility("DOGE", doge_prices)
-sol_social_volitility = get_social_volitility("SOL", sol_prices)
-avax_social_volitility = get_social_volitility("AVAX", avax_prices)
+eth_social_volitility = get_social_volitility("ETH", synced_df)
+doge_social_volitility = get_social_volitility("DOGE", synced_df)
+sol_social_volitility = get_social_volitility("SOL", synced_df)
+avax_social_volitility = get_social_volitility("AVAX", synced_df)
 
 # %%
 social_volatilities_df = pd.DataFrame(
@@ -277,3 +321,82 @@ social_volatilities_df.head()
 sns.barplot(
     x="social_volatility", y="crypcocurrency", data=social_volatilities_df
 )
+
+# %% [markdown]
+# ## Social volatility over many windows and lags
+#
+# Volatility may follow the sentiment of tweets rather than coincide with it.
+# Each coin's sentiment is correlated with its volatility of every window and
+# estimator, from the tweet's minute up to an hour later.
+
+# %%
+social_volatility_ranking = rank_social_volatility(
+    volatilities, tweet_sentiment, lags=range(0, 61)
+)
+social_volatility_ranking.head(10)
+
+# %%
+# The strongest relationship of each coin, with its significance.
+social_volatility_ranking.groupby("cryptocurrency").head(1)
+
+# %% [markdown]
+# ## Sentiment bars
+#
+# Correlating single tweets repeats a minute's volatility once per tweet, so
+# busy minutes weigh more. Instead, each coin's tweets are summarized per
+# minute, with their count, mean, mean weighted by the tweets' influence in
+# the feature store, and dispersion, and correlated with the volatility of the
+# same minutes.
+
+# %%
+sentiment_bars = resample_sentiment(
+    tweet_sentiment,
+    freq="min",
+    weights=tweet_sentiment["influence"].to_numpy(),
+)
+save_sentiment_bars(
+    path.join(DATA_DIR, "processed", "twitter"), sentiment_bars, freq="min"
+)
+
+bar_ranking = rank_social_volatility(
+    volatilities,
+    sentiment_bars.reset_index().rename(
+        {"sentiment_weighted_mean": "sentiment"}, axis=1
+    ),
+    lags=range(0, 61),
+)
+bar_ranking.groupby("cryptocurrency").head(1)
+
+# %%
+# Bars line up with the minutes of the volatilities, one column per coin, so
+# each coin's sentiment and volatility are correlated as aligned arrays.
+aligned_bars = stack_bars(sentiment_bars, volatilities.index)
+aligned_bars["sentiment_weighted_mean"].corrwith(
+    volatilities["close_to_close"]["1h"]
+)
+
+# %% [markdown]
+# ## Streaming social volatility
+#
+# The same ranking can be kept up to date as candles and tweets arrive, over
+# a sliding window of the last day instead of the whole period. Here, the
+# loaded data is replayed as a feed, and a ranking is published every minute.
+
+# %%
+stream = SocialVolatilityStream(
+    volatility_window=2, correlation_window=24 * 60
+)
+rankings = list(
+    stream.replay(
+        frame_events(
+            financial_volatilities,
+            {
+                cryptocurrency: tweets
+                for cryptocurrency, tweets in tweet_sentiment.groupby(
+                    "cryptocurrency"
+                )
+            },
+        )
+    )
+)
+rankings[-1].to_frame()
@@ -0,0 +1,158 @@
+"""Versions of each coin's trained models, with what they were trained on.
+
+Each version is a folder holding the model, the scaler of its inputs and
+``meta.json``, which has the fingerprint of its training data and the
+version it was warm-started from. Models are only loaded when used.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from functools import cached_property
+from os.path import dirname, exists, join, realpath
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from scaler import ZScoreScaler
+
+if TYPE_CHECKING:
+    import keras
+
+# "../models/registry"
+REGISTRY_DIR = join(dirname(dirname(realpath(__file__))), "models", "registry")
+MODEL_FILENAME = "model.keras"
+SCALER_FILENAME = "scaler.json"
+META_FILENAME = "meta.json"
+
+
+def dataset_fingerprint(*arrays) -> str:
+    """Hash the shapes and values of a model's training arrays."""
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+@dataclass
+class ModelVersion:
+    """A saved version of a coin's model."""
+
+    coin: str
+    kind: str
+    version: int
+    fingerprint: str
+    rows: int
+    epochs: int
+    created_at: str
+    # Version the model was warm-started from, if any.
+    parent: int | None = None
+    path: str = field(default="", compare=False)
+
+    @property
+    def model_path(self) -> str:
+        return join(self.path, MODEL_FILENAME)
+
+    @cached_property
+    def model(self) -> "keras.Model":
+        """Load the model, the first time it's used."""
+        # Imported here, so versions can be listed without loading keras.
+        import keras
+
+        return keras.models.load_model(self.model_path)
+
+    @cached_property
+    def scaler(self) -> ZScoreScaler | None:
+        """Load the scaler of the model's inputs, if it has one."""
+        path = join(self.path, SCALER_FILENAME)
+        return ZScoreScaler.load(path) if exists(path) else None
+
+
+class ModelRegistry:
+    """Local store of the versions of each coin's models.
+
+    Versions are numbered from 1 per coin and kind of model, and a version
+    only counts once its ``meta.json`` is written, so a half saved version
+    is never loaded.
+    """
+
+    def __init__(self, root: str = REGISTRY_DIR):
+        self.root = root
+
+    def model_dir(self, coin: str, kind: str) -> str:
+        return join(self.root, f"{coin}_{kind}")
+
+    def versions(self, coin: str, kind: str) -> list[ModelVersion]:
+        """List the saved versions of a coin's model, oldest first."""
+        model_dir = self.model_dir(coin, kind)
+        if not exists(model_dir):
+            return []
+        versions = []
+        for name in sorted(os.listdir(model_dir)):
+            meta_path = join(model_dir, name, META_FILENAME)
+            if exists(meta_path):
+                with open(meta_path, encoding="utf-8") as file:
+                    meta = json.load(file)
+                versions.append(
+                    ModelVersion(**meta, path=join(model_dir, name))
+                )
+        return sorted(versions, key=lambda version: version.version)
+
+    def latest(self, coin: str, kind: str) -> ModelVersion | None:
+        """Get the newest version of a coin's model, if there is one."""
+        versions = self.versions(coin, kind)
+        return versions[-1] if versions else None
+
+    def get(
+        self, coin: str, kind: str, version: int | None = None
+    ) -> ModelVersion:
+        """Get a version of a coin's model, the newest one by default."""
+        for found in reversed(self.versions(coin, kind)):
+            if version is None or found.version == version:
+                return found
+        raise KeyError(f"No version {version} of the {kind} model of {coin}")
+
+    def register(
+        self,
+        coin: str,
+        kind: str,
+        model_path: str,
+        fingerprint: str,
+        rows: int,
+        epochs: int,
+        scaler: ZScoreScaler | None = None,
+        parent: int | None = None,
+    ) -> ModelVersion:
+        """Save a trained model as the next version of a coin's model."""
+        latest = self.latest(coin, kind)
+        number = 1 if latest is None else latest.version + 1
+        path = join(self.model_dir(coin, kind), f"v{number:04d}")
+        if exists(path):
+            # Left over from a version that wasn't completely saved.
+            shutil.rmtree(path)
+        os.makedirs(path)
+
+        shutil.copy2(model_path, join(path, MODEL_FILENAME))
+        if scaler is not None:
+            scaler.save(join(path, SCALER_FILENAME))
+        version = ModelVersion(
+            coin,
+            kind,
+            number,
+            fingerprint,
+            rows,
+            epochs,
+            datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            parent,
+            path,
+        )
+        meta = asdict(version)
+        del meta["path"]
+        with open(join(path, META_FILENAME), "w", encoding="utf-8") as file:
+            json.dump(meta, file)
+        return version
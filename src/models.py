@@ -0,0 +1,31 @@
+"""Keras models predicting cryptocurrency prices."""
+
+import keras
+
+
+def make_model(n=3):
+    """Make a model predicting the next 23 hourly prices from n features."""
+    model = keras.Sequential()
+    model.add(keras.layers.LSTM(8, input_shape=(n, 1)))
+    model.add(keras.layers.Dense(32))
+    model.add(keras.layers.Dense(23))
+    model.compile(
+        loss="mean_squared_error",
+        optimizer="adam",
+        metrics=["mean_squared_error"],
+    )
+    return model
+
+
+def make_ts_model():
+    """Make a model predicting the next hourly price from the last 23."""
+    model = keras.Sequential()
+    model.add(keras.layers.LSTM(8, input_shape=(23, 1)))
+    model.add(keras.layers.Dense(32))
+    model.add(keras.layers.Dense(1))
+    model.compile(
+        loss="mean_squared_error",
+        optimizer="adam",
+        metrics=["mean_squared_error"],
+    )
+    return model
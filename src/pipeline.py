@@ -0,0 +1,349 @@
+"""Run the project's scripts in order, skipping stages that are up to date.
+
+Each stage runs a script in its own process, so the module-level side
+effects of the scripts, e.g., changing directories, don't leak between
+stages. A stage is skipped when its code and inputs have the same
+fingerprint as when it last ran and its outputs still exist. e.g.,
+
+    python pipeline.py model
+    python pipeline.py --force sentiment
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from glob import glob
+from graphlib import TopologicalSorter
+from os import environ, replace, stat, walk
+from os.path import dirname, exists, isdir, join, realpath, relpath, splitext
+
+from storage import SUFFIXES
+
+SRC_DIR = dirname(realpath(__file__))
+# "../"
+REPO_DIR = dirname(SRC_DIR)
+STATE_PATH = join(REPO_DIR, "data", "pipeline.json")
+
+TWEETS = "data/processed/twitter/tweets_2022_03_05-2022_03_11"
+
+
+@dataclass
+class Stage:
+    """A script, the files it reads and writes, and the code it runs.
+
+    Paths are relative to the repository. Datasets may be given without a
+    suffix, to match any of the formats they can be saved in, and folders
+    stand for all the files under them. Inputs may also be glob patterns of
+    dataset names, e.g., "data/processed/twitter/tweets_*".
+    """
+
+    name: str
+    script: str
+    inputs: list[str] = field(default_factory=list)
+    outputs: list[str] = field(default_factory=list)
+
+    @property
+    def modules(self) -> list[str]:
+        """Modules of `src` the script imports, directly or not."""
+        return local_imports(join(SRC_DIR, self.script))
+
+    def run(self):
+        """Run the script from `src`, as it's run by hand."""
+        subprocess.run(
+            [sys.executable, self.script],
+            cwd=SRC_DIR,
+            # Plots are drawn off screen instead of waiting to be closed.
+            env={**environ, "MPLBACKEND": "Agg"},
+            check=True,
+        )
+
+
+STAGES = [
+    Stage(
+        "raw",
+        "1_get_raw_dataset.py",
+        outputs=["data/raw/crypto", "data/raw/twitter"],
+    ),
+    Stage(
+        "processed",
+        "2_process_dataset.py",
+        inputs=["data/raw/crypto", "data/raw/twitter"],
+        outputs=[TWEETS],
+    ),
+    Stage(
+        "exploration",
+        "3_exploratory_visualization.py",
+        inputs=["data/raw/crypto", TWEETS],
+    ),
+    Stage(
+        "sentiment",
+        "sentiment_analysis.py",
+        inputs=[TWEETS],
+        outputs=[
+            "data/processed/twitter/tweets_sentiment",
+            "data/processed/twitter/coin_membership",
+        ],
+    ),
+    Stage(
+        "volatility",
+        "financial_volatility.py",
+        inputs=[
+            "data/raw/crypto",
+            "data/processed/twitter/tweets_sentiment",
+            "data/processed/twitter/coin_membership",
+            "data/processed/twitter/tweet_features",
+        ],
+    ),
+    Stage(
+        "features",
+        "twitter_influence_feature.py",
+        # Every dataset of tweets in the folder is read, including those of
+        # the stages before, but not the other datasets saved next to them.
+        inputs=[
+            "data/processed/twitter/tweets_*",
+            "data/processed/twitter/*_sentiment",
+        ],
+        outputs=[
+            "data/processed/twitter/tweet_features",
+            "data/processed/twitter/tweet_features_authority.json",
+        ],
+    ),
+    Stage(
+        "model",
+        "predictor.py",
+        inputs=[
+            "data/raw/crypto",
+            "data/processed/twitter/tweets_sentiment",
+            "data/processed/twitter/coin_membership",
+            "data/processed/twitter/tweet_features",
+        ],
+        outputs=["models"],
+    ),
+]
+
+
+def local_imports(script: str) -> list[str]:
+    """List the modules of `src` a script imports, and those they import.
+
+    Imports are read from the code, without running it, so modules imported
+    anywhere in it count, e.g., within functions.
+    """
+    found: set[str] = set()
+    pending = [script]
+    while pending:
+        with open(pending.pop(), encoding="utf-8") as file:
+            tree = ast.parse(file.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                filename = f"{name.split('.')[0]}.py"
+                if filename not in found and exists(join(SRC_DIR, filename)):
+                    found.add(filename)
+                    pending.append(join(SRC_DIR, filename))
+    return sorted(found)
+
+
+def resolve(path: str) -> str | None:
+    """Find the file or folder a stage's path refers to, if it exists."""
+    path = join(REPO_DIR, path)
+    if exists(path):
+        return path
+    for suffix in SUFFIXES:
+        if exists(path + suffix):
+            return path + suffix
+    return None
+
+
+def is_pattern(path: str) -> bool:
+    """Check whether a stage's path is a glob pattern."""
+    return any(char in path for char in "*?[")
+
+
+def expand(path: str) -> list[str | None]:
+    """Resolve a stage's path, or find every dataset matching a pattern."""
+    if not is_pattern(path):
+        return [resolve(path)]
+    return sorted(
+        found
+        for found in glob(join(REPO_DIR, path) + ".*")
+        if splitext(found)[1] in SUFFIXES
+    )
+
+
+def list_files(path: str) -> list[str]:
+    """List the files of a path, which is itself a file or a folder."""
+    if not isdir(path):
+        return [path]
+    return sorted(
+        join(folder, filename)
+        for folder, _, filenames in walk(path)
+        for filename in filenames
+    )
+
+
+def covers(output: str, path: str) -> bool:
+    """Check whether a path is an output, or is inside an output folder.
+
+    A pattern covers the outputs it matches.
+    """
+    output = splitext(output)[0] if splitext(output)[1] in SUFFIXES else output
+    if is_pattern(path):
+        return fnmatch(output, path)
+    path = splitext(path)[0] if splitext(path)[1] in SUFFIXES else path
+    return path == output or path.startswith(output + "/")
+
+
+class Pipeline:
+    """Stages run in the order of the files they read and write.
+
+    The fingerprints of the stages that ran are saved to `state_path`, along
+    with the hashes of the files read, which are only hashed again once
+    their size or modification time changes.
+    """
+
+    def __init__(self, stages: list[Stage], state_path: str = STATE_PATH):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        self.state = {"stages": {}, "files": {}}
+        if exists(state_path):
+            with open(state_path, encoding="utf-8") as state_file:
+                self.state = json.load(state_file)
+
+    def dependencies(self, stage: Stage) -> set[str]:
+        """Get the stages writing the files a stage reads."""
+        return {
+            other.name
+            for other in self.stages.values()
+            if other is not stage
+            and any(
+                covers(output, path)
+                for output in other.outputs
+                for path in stage.inputs
+            )
+        }
+
+    def hash_file(self, path: str) -> str:
+        """Hash a file's contents, reusing the hash if it didn't change."""
+        file_stat = stat(path)
+        key = relpath(path, REPO_DIR)
+        known = self.state["files"].get(key)
+        if known and known[:2] == [file_stat.st_size, file_stat.st_mtime_ns]:
+            return known[2]
+
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        self.state["files"][key] = [
+            file_stat.st_size,
+            file_stat.st_mtime_ns,
+            digest.hexdigest(),
+        ]
+        return digest.hexdigest()
+
+    def fingerprint(self, stage: Stage) -> str:
+        """Hash a stage's code and the current contents of its inputs."""
+        digest = hashlib.blake2b(digest_size=16)
+        code = [join(SRC_DIR, name) for name in [stage.script, *stage.modules]]
+        inputs = [found for path in stage.inputs for found in expand(path)]
+        for path in [*code, *inputs]:
+            files = [] if path is None else list_files(path)
+            digest.update(f"{path and relpath(path, REPO_DIR)}\n".encode())
+            for file in files:
+                line = f"{relpath(file, REPO_DIR)} {self.hash_file(file)}\n"
+                digest.update(line.encode())
+        return digest.hexdigest()
+
+    def is_up_to_date(self, stage: Stage) -> bool:
+        """Check whether a stage's outputs match its code and inputs."""
+        return self.state["stages"].get(stage.name) == self.fingerprint(
+            stage
+        ) and all(resolve(path) is not None for path in stage.outputs)
+
+    def plan(self, targets: list[str] | None = None) -> list[str]:
+        """Order the targets, and the stages they depend on, to be run."""
+        graph = {
+            name: self.dependencies(stage)
+            for name, stage in self.stages.items()
+        }
+        needed = set(targets or self.stages)
+        pending = list(needed)
+        while pending:
+            for dependency in graph[pending.pop()]:
+                if dependency not in needed:
+                    needed.add(dependency)
+                    pending.append(dependency)
+        return [
+            name
+            for name in TopologicalSorter(graph).static_order()
+            if name in needed
+        ]
+
+    def run(
+        self, targets: list[str] | None = None, force: set[str] | None = None
+    ) -> dict[str, str]:
+        """Run the stages needed by the targets, all stages by default.
+
+        Stages that are up to date are skipped, unless they're forced.
+        Returns whether each stage ran or was skipped.
+        """
+        results = {}
+        for name in self.plan(targets):
+            stage = self.stages[name]
+            if name not in (force or set()) and self.is_up_to_date(stage):
+                print(f"{name}: up to date")
+                results[name] = "skipped"
+                continue
+
+            print(f"{name}: running {stage.script}")
+            stage.run()
+            # The fingerprint is taken once the stage is done, in case it
+            # changed its own inputs.
+            self.state["stages"][name] = self.fingerprint(stage)
+            self.save()
+            results[name] = "ran"
+        return results
+
+    def save(self):
+        """Save the state of the stages, replacing it in a single step."""
+        partial_path = f"{self.state_path}.partial"
+        with open(partial_path, "w", encoding="utf-8") as state_file:
+            json.dump(self.state, state_file)
+        replace(partial_path, self.state_path)
+
+
+def main():
+    """Run the pipeline from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        help="stages to bring up to date, all of them by default",
+    )
+    parser.add_argument(
+        "--force",
+        action="append",
+        default=[],
+        metavar="STAGE",
+        help="run a stage even if it's up to date",
+    )
+    args = parser.parse_args()
+    names = {stage.name for stage in STAGES}
+    unknown = set(args.targets + args.force) - names
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    Pipeline(STAGES).run(args.targets or None, force=set(args.force))
+
+
+if __name__ == "__main__":
+    main()
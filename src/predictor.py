@@ -20,82 +20,96 @@
 import os
 from datetime import datetime, timedelta
 
-import keras
 import numpy as np
 import pandas as pd
+import tensorflow as tf
+
+from catalog import COIN_TICKERS, Catalog
+from coin_tagging import load_coin_sentiment
+from model_registry import ModelRegistry
+from models import make_model
+from scaler import ZScoreScaler
+from time_utils import from_epoch, round_hour, strip_timezone
+from training import TrainingConfig, train_models
+from tweet_features import join_features, load_features
 
 # %% pycharm={"name": "#%%\n"}
 # os.chdir("src") #used to reset to original working directory
 
+# %% [markdown]
+# Models are trained in spawned worker processes, which import this script
+# again before they start. Cells that load data or train models only run in
+# the main process, so the workers don't train models of their own.
+
 # %% pycharm={"name": "#%%\n"}
-os.chdir(
-    "../"
-)  # Used to go out into the cmpe-351-group-1 folder to access the data without changing directories multiple times
+if __name__ == "__main__":
+    os.chdir(
+        "../"
+    )  # Used to go out into the cmpe-351-group-1 folder to access the data without changing directories multiple times
 
 
 # %% pycharm={"name": "#%%\n"}
-def hour_rounder(t):
-    # Rounds to nearest hour by adding a timedelta hour if minute >= 30
-    return t.replace(
-        second=0, microsecond=0, minute=0, hour=t.hour
-    ) + timedelta(hours=t.minute // 30)
+if __name__ == "__main__":
+    CATALOG = Catalog.load()
+    # Scores of each tweet, computed once by `twitter_influence_feature.py`.
+    TWEET_FEATURES = load_features("data/processed/twitter", ["authority"])
 
 
-# %% pycharm={"name": "#%%\n"}
-def normalize(df, column):
-    m = df[column].mean()
-    s = df[column].std()
-    df[column] = df[column].apply(lambda x: (x - m) / s)
-    return df[column]
+def load_hourly_prices(crypto, start_month, start_day, end_month, end_day):
+    """Load a coin's hourly prices over the days, stitching saved datasets."""
+    return CATALOG.load_prices(
+        COIN_TICKERS[crypto],
+        datetime(2022, int(start_month), int(start_day)),
+        datetime(2022, int(end_month), int(end_day)) + timedelta(days=1),
+        granularity="hour",
+        columns=["open"],
+    )
 
 
 # %% pycharm={"name": "#%%\n"}
 ##Dates is an array of tuples consisting of month and day as numbers
 def get_dataset(crypto, start_month, start_day, end_month, end_day):
-    twitter_df = pd.read_csv(f"data/processed/twitter/{crypto}_sentiment.csv")
-    try:
-        crypt_prices = pd.read_csv(
-            f"data/raw/crypto/{crypto_dict[crypto]}_2022_{start_month}_{start_day}-2022_{end_month}_{end_day}_minute.csv"
-        )
-    except:
-        crypt_prices = pd.read_csv(
-            f"data/raw/crypto/{crypto_dict[crypto]}_2022_{start_month}_{start_day}-2022_{end_month}_{end_day}.csv"
-        )
-    crypt_prices["time"] = pd.to_datetime(crypt_prices["time"], unit="s")
-    price_dict = crypt_prices.set_index("time")["open"].to_dict()
-    twitter_df["created_at"] = twitter_df["created_at"].apply(
-        lambda x: pd.to_datetime(x).tz_localize(None)
+    twitter_df = load_coin_sentiment("data/processed/twitter", crypto)
+    # Tweets are keyed by their exact time, so their features are joined
+    # before it's rounded to the hour.
+    twitter_df = join_features(twitter_df, TWEET_FEATURES, ["authority"])
+    crypt_prices = load_hourly_prices(
+        crypto, start_month, start_day, end_month, end_day
     )
-    twitter_df["created_at"] = twitter_df["created_at"].apply(
-        lambda x: hour_rounder(x)
+    hourly_prices = pd.Series(
+        crypt_prices["open"].to_numpy(),
+        index=from_epoch(crypt_prices["time"]),
     )
-    twitter_df["future_date"] = twitter_df["created_at"].apply(
-        lambda x: x + timedelta(hours=23)
+    twitter_df["created_at"] = round_hour(
+        strip_timezone(twitter_df["created_at"])
+    )
+    twitter_df["future_date"] = twitter_df["created_at"] + timedelta(hours=23)
+
+    # Prices at the tweet's hour and each of the following 23 hours, looked
+    # up all at once.
+    label_times = twitter_df["created_at"].to_numpy()[:, None] + np.arange(
+        24
+    ) * np.timedelta64(1, "h")
+    labels = (
+        hourly_prices.reindex(label_times.ravel())
+        .to_numpy()
+        .reshape(label_times.shape)
     )
 
-    twitter_df = twitter_df[
-        twitter_df["future_date"].isin(crypt_prices["time"])
-    ]  ##Filter out dates for which we don't have price data
-
-    # print(len(twitter_df))
-
-    twitter_df = twitter_df[
-        twitter_df["created_at"].isin(crypt_prices["time"])
-    ]  ##Filter out dates for which we don't have price data
-
-    twitter_df["price"] = twitter_df["created_at"].apply(
-        lambda x: price_dict[x]
+    ##Filter out dates for which we don't have price data
+    has_prices = ~np.isnan(labels).any(axis=1)
+    twitter_df = twitter_df[has_prices]
+    twitter_df = pd.concat(
+        [
+            twitter_df,
+            pd.DataFrame(
+                labels[has_prices],
+                index=twitter_df.index,
+                columns=["price"] + [f"price_{i}hours" for i in range(1, 24)],
+            ),
+        ],
+        axis=1,
     )
-    for i in range(1, 24):
-        twitter_df[f"price_{i}hours"] = twitter_df["created_at"].apply(
-            lambda x: price_dict[x + timedelta(hours=i)]
-        )
-    twitter_df["retweet_count"] = normalize(twitter_df, "retweet_count")
-    twitter_df["favourite_count"] = normalize(twitter_df, "retweet_count")
-    twitter_df["followers_count"] = normalize(twitter_df, "retweet_count")
-    twitter_df["authority"] = twitter_df[
-        ["retweet_count", "favourite_count", "followers_count"]
-    ].sum(axis=1)
 
     X = twitter_df[["authority", "vader_sentiment_compound", "price"]]
     y = twitter_df[[f"price_{i}hours" for i in range(1, 24)]]
@@ -103,366 +117,510 @@ def get_dataset(crypto, start_month, start_day, end_month, end_day):
 
 
 # %% pycharm={"name": "#%%\n"}
-def make_model(n=3):
-    model = keras.Sequential()
-    model.add(keras.layers.LSTM(8, input_shape=(n, 1)))
-    model.add(keras.layers.Dense(32))
-    model.add(keras.layers.Dense(23))
-    model.compile(
-        loss="mean_squared_error",
-        optimizer="adam",
-        metrics=["mean_squared_error"],
-    )
-    return model
+# (start month, start day, end month, end day) of the training data.
+TRAINING_INTERVALS = [
+    ("03", "05", "03", "11"),
+    ("03", "28", "04", "04"),
+    ("03", "11", "03", "12"),
+    ("04", "04", "04", "05"),
+]
+# Intervals are loaded with a day of prices past their end, which overlaps
+# the next interval and the test data. Training keeps each tweet once, and
+# only tweets whose prices all come before the test data.
+TEST_INTERVAL = ("04", "05", "04", "07")
+TEST_START = datetime(2022, 4, 5)
 
 
-# %% pycharm={"name": "#%%\n"}
-def estimate_price(model, date, df):
-    date_23_hours = date - timedelta(hours=23)
-    date_1_hours = date - timedelta(hours=1)
-    df_useful = df[
-        (df["created_at"] <= date_1_hours)
-        & (df["created_at"] >= date_23_hours)
-    ]
-    if len(df_useful) == 0:
-        return ""
-    else:
-        df_useful["idx"] = df_useful["created_at"].apply(
-            lambda x: round((date - x).seconds / 60 / 60)
-        )
-        X = df_useful[["authority", "vader_sentiment_compound", "price"]]
-        y_hat = model.predict_on_batch(X)
-        # print(y_hat)
-        idx = df_useful["idx"].values
-        vals = []
-        for i in range(len(y_hat)):
-            vals.append(y_hat[i][idx[i] - 1])
-        return np.mean(vals)
+def get_datasets(crypto, intervals, end=None):
+    """Get the dataset of each interval, joined into one dataset.
+
+    Tweets found in several intervals are kept once. Tweets whose prices
+    reach `end`, e.g., the start of the test data, are left out.
+    """
+    pieces = [get_dataset(crypto, *interval) for interval in intervals]
+    twitter_df = pd.concat([piece[0] for piece in pieces])
+    keep = ~twitter_df.index.duplicated()
+    if end is not None:
+        keep &= (
+            twitter_df["created_at"] + timedelta(hours=23) < end
+        ).to_numpy()
+    return tuple(pd.concat(frames)[keep] for frames in zip(*pieces))
 
 
 # %% pycharm={"name": "#%%\n"}
-def daterange(start_date, end_date):
-    for n in range(int((end_date - start_date).days) * 24):
-        yield start_date + timedelta(hours=n)
+def estimate_prices(
+    model, start_date, end_date, df, batch_size=1024, scaler=None
+):
+    """Estimate the price of every hour from start_date up to end_date.
+
+    An hour's estimate is the mean of the predictions made for it by the
+    tweets of the 23 hours before it, whose created_at is rounded to the hour
+    as get_dataset does. Each tweet goes through the model only once, since
+    its predictions for all 23 hours ahead come from the same output.
+    Hours without any tweets before them are left out. The inputs are scaled
+    by the model's scaler, if it was trained on scaled inputs.
+    """
+    hours = pd.date_range(start_date, end_date, freq="h", inclusive="left")
+    if len(hours) == 0:
+        return pd.Series(dtype=float, index=hours)
+
+    df = df.sort_values("created_at")
+    created_at = df["created_at"].to_numpy()
+    first = np.searchsorted(created_at, hours[0] - timedelta(hours=23))
+    last = np.searchsorted(
+        created_at, hours[-1] - timedelta(hours=1), side="right"
+    )
+    df = df.iloc[first:last]
+    if len(df) == 0:
+        return pd.Series(dtype=float, index=hours[:0])
+
+    inputs = df[["authority", "vader_sentiment_compound", "price"]]
+    if scaler is not None:
+        inputs = scaler.transform(inputs)
+    y_hat = model.predict(
+        inputs,
+        batch_size=batch_size,
+        verbose=0,
+    )
+
+    # Column i of a tweet's prediction is for the hour i + 1 hours later.
+    tweet_hours = (
+        df["created_at"].to_numpy() - hours[0].to_datetime64()
+    ) // np.timedelta64(1, "h")
+    target_hours = tweet_hours[:, None] + np.arange(1, 24)
+    tweets, columns = np.nonzero(
+        (target_hours >= 0) & (target_hours < len(hours))
+    )
+    targets = target_hours[tweets, columns]
+    sums = np.bincount(
+        targets, weights=y_hat[tweets, columns], minlength=len(hours)
+    )
+    counts = np.bincount(targets, minlength=len(hours))
+    has_tweets = counts > 0
+    return pd.Series(
+        sums[has_tweets] / counts[has_tweets], index=hours[has_tweets]
+    )
 
 
 # %% pycharm={"name": "#%%\n"}
 def make_prediction(start_date, end_date, model, df):
-    pred = {}
-    for date in daterange(
+    estimates = estimate_prices(
+        model,
         datetime.strptime(start_date, "%d/%m/%Y"),
         datetime.strptime(end_date, "%d/%m/%Y"),
-    ):
-        val = estimate_price(model, date, df)
-        if val != "":
-            pred[date.strftime("%Y-%m-%d %H:%M:%S")] = val
-    return pred
-
-
-# %% pycharm={"name": "#%%\n"}
-def evaluate_model(start_date, end_date, model, df_test):
-    y_hat = make_prediction(start_date, end_date, model, df_test)
-    df_temp = df_test.set_index("created_at")["price"].drop_duplicates()
-    mse = 0
-    for i in y_hat:
-        try:
-            mse += (df_temp.loc[i].values[0] - y_hat[i]) ** 2
-        except:
-            pass
-    return mse / len(y_hat)
+        df,
+    )
+    return {
+        date.strftime("%Y-%m-%d %H:%M:%S"): value
+        for date, value in estimates.items()
+    }
 
 
 # %% pycharm={"name": "#%%\n"}
-def make_time_series_dataset(
-    crypto, start_month, start_day, end_month, end_day
-):
-    X = []
-    y = []
-    try:
-        crypt_prices = pd.read_csv(
-            f"data/raw/crypto/{crypto_dict[crypto]}_2022_{start_month}_{start_day}-2022_{end_month}_{end_day}_minute.csv"
-        )
+def mean_where(values, mask):
+    """Average each row of values over its masked entries, or NaN if none."""
+    counts = mask.sum(axis=1)
+    totals = np.where(mask, values, 0).sum(axis=1)
+    return np.divide(
+        totals, counts, out=np.full(len(counts), np.nan), where=counts > 0
+    )
 
-    except:
-        crypt_prices = pd.read_csv(
-            f"data/raw/crypto/{crypto_dict[crypto]}_2022_{start_month}_{start_day}-2022_{end_month}_{end_day}.csv"
-        )
 
-    crypt_prices["time"] = pd.to_datetime(crypt_prices["time"], unit="s")
-
-    crypt_prices_useful = {}
-
-    for i in crypt_prices[["time", "open"]].values:
-        if int(i[0].strftime("%M")) == 0 and int(i[0].strftime("%S")) == 0:
-            crypt_prices_useful[i[0]] = i[1]
-    for i in crypt_prices_useful:
-        if (i - timedelta(hours=23)) in crypt_prices_useful:
-            X.append(
-                [
-                    crypt_prices_useful[i]
-                    for i in pd.date_range(
-                        i - timedelta(hours=23),
-                        i - timedelta(hours=1),
-                        freq="H",
-                    )
-                ]
+def evaluate_models(start_date, end_date, models):
+    """Score the models of several coins over the same hours at once.
+
+    models maps each coin to its model and test dataset, and the scaler of
+    the model's inputs if it has one. An hour is scored
+    if the model made a prediction for it and the test dataset has its
+    price. The hours that weren't are counted by the reason they were
+    dropped.
+    """
+    start_date = datetime.strptime(start_date, "%d/%m/%Y")
+    end_date = datetime.strptime(end_date, "%d/%m/%Y")
+    hours = pd.date_range(start_date, end_date, freq="h", inclusive="left")
+
+    # One row per coin, one column per hour.
+    predicted = np.vstack(
+        [
+            estimate_prices(
+                model,
+                start_date,
+                end_date,
+                df_test,
+                scaler=scaler[0] if scaler else None,
             )
-            y.append(crypt_prices_useful[i])
-    return X, y
-
-
-# %% pycharm={"name": "#%%\n"}
-def make_ts_model():
-    model = keras.Sequential()
-    model.add(keras.layers.LSTM(8, input_shape=(23, 1)))
-    model.add(keras.layers.Dense(32))
-    model.add(keras.layers.Dense(1))
-    model.compile(
-        loss="mean_squared_error",
-        optimizer="adam",
-        metrics=["mean_squared_error"],
+            .reindex(hours)
+            .to_numpy()
+            for model, df_test, *scaler in models.values()
+        ]
     )
-    return model
-
-
-# %% pycharm={"name": "#%%\n"}
-df_avax, X_avax, y_avax = get_dataset("avalanche", "03", "05", "03", "11")
-df_avax2, X_avax2, y_avax2 = get_dataset("avalanche", "03", "28", "04", "04")
-df_avax3, X_avax3, y_avax3 = get_dataset("avalanche", "03", "11", "03", "12")
-df_avax4, X_avax4, y_avax4 = get_dataset("avalanche", "04", "04", "04", "05")
-
-df_avax = df_avax.append(df_avax2)
-df_avax = df_avax.append(df_avax3)
-df_avax = df_avax.append(df_avax4)
-
-X_avax = X_avax.append(X_avax2)
-X_avax = X_avax.append(X_avax3)
-X_avax = X_avax.append(X_avax4)
-
-y_avax = y_avax.append(y_avax2)
-y_avax = y_avax.append(y_avax3)
-y_avax = y_avax.append(y_avax4)
-
-df_avax_test, _, _ = get_dataset("avalanche", "04", "05", "04", "07")
-
-
-# %% pycharm={"name": "#%%\n"}
-df_btc, X_btc, y_btc = get_dataset("bitcoin", "03", "05", "03", "11")
-df_btc2, X_btc2, y_btc2 = get_dataset("bitcoin", "03", "28", "04", "04")
-df_btc3, X_btc3, y_btc3 = get_dataset("bitcoin", "03", "11", "03", "12")
-df_btc4, X_btc4, y_btc4 = get_dataset("bitcoin", "04", "04", "04", "05")
-
-df_btc = df_btc.append(df_btc2)
-df_btc = df_btc.append(df_btc3)
-df_btc = df_btc.append(df_btc4)
-
-X_btc = X_btc.append(X_btc2)
-X_btc = X_btc.append(X_btc3)
-X_btc = X_btc.append(X_btc4)
-
-y_btc = y_btc.append(y_btc2)
-y_btc = y_btc.append(y_btc3)
-y_btc = y_btc.append(y_btc4)
-df_btc_test, _, _ = get_dataset("bitcoin", "04", "05", "04", "07")
-
-
-# %% pycharm={"name": "#%%\n"}
-df_eth, X_eth, y_eth = get_dataset("ethereum", "03", "05", "03", "11")
-df_eth2, X_eth2, y_eth2 = get_dataset("ethereum", "03", "28", "04", "04")
-df_eth3, X_eth3, y_eth3 = get_dataset("ethereum", "03", "11", "03", "12")
-df_eth4, X_eth4, y_eth4 = get_dataset("ethereum", "04", "04", "04", "05")
-
-df_eth = df_eth.append(df_eth2)
-df_eth = df_eth.append(df_eth3)
-df_eth = df_eth.append(df_eth4)
-
+    actual = np.vstack(
+        [
+            df_test.groupby("created_at")["price"]
+            .first()
+            .reindex(hours)
+            .to_numpy()
+            for _, df_test, *_ in models.values()
+        ]
+    )
+    previous_actual = np.full_like(actual, np.nan)
+    previous_actual[:, 1:] = actual[:, :-1]
+
+    has_prediction = ~np.isnan(predicted)
+    has_actual = ~np.isnan(actual)
+    scored = has_prediction & has_actual
+    has_move = scored & ~np.isnan(previous_actual)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        errors = predicted - actual
+        mse = mean_where(errors**2, scored)
+        right_direction = np.sign(predicted - previous_actual) == np.sign(
+            actual - previous_actual
+        )
+        return pd.DataFrame(
+            {
+                "hours_scored": scored.sum(axis=1),
+                "mse": mse,
+                "rmse": np.sqrt(mse),
+                "mae": mean_where(np.abs(errors), scored),
+                "mape": 100 * mean_where(np.abs(errors / actual), scored),
+                "directional_accuracy": mean_where(right_direction, has_move),
+                "dropped_no_prediction": (~has_prediction).sum(axis=1),
+                "dropped_no_price": (has_prediction & ~has_actual).sum(axis=1),
+            },
+            index=pd.Index(list(models), name="cryptocurrency"),
+        )
 
-X_eth = X_eth.append(X_eth2)
-X_eth = X_eth.append(X_eth3)
-X_eth = X_eth.append(X_eth4)
 
-y_eth = y_eth.append(y_eth2)
-y_eth = y_eth.append(y_eth3)
-y_eth = y_eth.append(y_eth4)
+def evaluate_model(start_date, end_date, model, df_test, scaler=None):
+    """Get the mean squared error of a model over the scored hours."""
+    return evaluate_models(
+        start_date, end_date, {"": (model, df_test, scaler)}
+    )["mse"].iloc[0]
 
-df_eth_test, _, _ = get_dataset("ethereum", "04", "05", "04", "07")
 
 # %% pycharm={"name": "#%%\n"}
-df_sol, X_sol, y_sol = get_dataset("solana", "03", "05", "03", "11")
-df_sol2, X_sol2, y_sol2 = get_dataset("solana", "03", "28", "04", "04")
-df_sol3, X_sol3, y_sol3 = get_dataset("solana", "03", "11", "03", "12")
-df_sol4, X_sol4, y_sol4 = get_dataset("solana", "04", "04", "04", "05")
+def make_price_windows(crypt_prices, window=23, fill_limit=0):
+    """Get every run of window + 1 consecutive hourly prices.
 
-df_sol = df_sol.append(df_sol2)
-df_sol = df_sol.append(df_sol3)
-df_sol = df_sol.append(df_sol4)
+    crypt_prices holds the epoch time and open price of hourly candles,
+    which are laid out on a regular hourly grid. Runs of at most fill_limit
+    missing hours are filled with the last known price, and windows that
+    still overlap a gap are left out. Returns a read-only view of all the
+    windows, without copying the prices, and the positions of the gap free
+    ones.
+    """
+    times = crypt_prices["time"].to_numpy()
+    if len(times) == 0:
+        return np.empty((0, window + 1)), np.empty(0, dtype=int)
 
+    hours = np.arange(times.min(), times.max() + 1, 60 * 60)
+    prices = crypt_prices.set_index("time")["open"].reindex(hours)
+    if fill_limit > 0:
+        prices = prices.ffill(limit=fill_limit)
+    prices = prices.to_numpy(dtype=np.float64)
+    if len(prices) < window + 1:
+        return np.empty((0, window + 1)), np.empty(0, dtype=int)
 
-X_sol = X_sol.append(X_sol2)
-X_sol = X_sol.append(X_sol3)
-X_sol = X_sol.append(X_sol4)
+    windows = np.lib.stride_tricks.sliding_window_view(prices, window + 1)
+    # The number of gaps in each window, from a running count of gaps.
+    gap_counts = np.concatenate([[0], np.cumsum(np.isnan(prices))])
+    gaps = gap_counts[window + 1 :] - gap_counts[: -(window + 1)]
+    return windows, np.flatnonzero(gaps == 0)
 
-y_sol = y_sol.append(y_sol2)
-y_sol = y_sol.append(y_sol3)
-y_sol = y_sol.append(y_sol4)
-
-df_sol_test, _, _ = get_dataset("solana", "04", "05", "04", "07")
-
-# %% pycharm={"name": "#%%\n"}
-df_doge, X_doge, y_doge = get_dataset("doge", "03", "05", "03", "11")
-df_doge2, X_doge2, y_doge2 = get_dataset("doge", "03", "28", "04", "04")
-df_doge3, X_doge3, y_doge3 = get_dataset("doge", "03", "11", "03", "12")
-df_doge4, X_doge4, y_doge4 = get_dataset("doge", "04", "04", "04", "05")
-
-df_doge = df_doge.append(df_doge2)
-df_doge = df_doge.append(df_doge3)
-df_doge = df_doge.append(df_doge4)
 
+def split_windows(windows):
+    """Split windows into model inputs of shape (n, window, 1) and targets."""
+    X = np.ascontiguousarray(windows[:, :-1, None], dtype=np.float32)
+    y = np.ascontiguousarray(windows[:, -1], dtype=np.float32)
+    return X, y
 
-X_doge = X_doge.append(X_doge2)
-X_doge = X_doge.append(X_doge3)
-X_doge = X_doge.append(X_doge4)
 
-y_doge = y_doge.append(y_doge2)
-y_doge = y_doge.append(y_doge3)
-y_doge = y_doge.append(y_doge4)
+def make_time_series_dataset(
+    crypto, start_month, start_day, end_month, end_day, fill_limit=0
+):
+    """Get the prices of 23 hours in a row as inputs, and the next as target."""
+    crypt_prices = load_hourly_prices(
+        crypto, start_month, start_day, end_month, end_day
+    )
+    windows, valid = make_price_windows(crypt_prices, fill_limit=fill_limit)
+    return split_windows(windows[valid])
+
+
+def make_time_series_batches(
+    crypto,
+    start_month,
+    start_day,
+    end_month,
+    end_day,
+    batch_size=256,
+    fill_limit=0,
+):
+    """Get the time series dataset as a lazily batched tf.data pipeline.
 
-df_doge_test, _, _ = get_dataset("doge", "04", "05", "04", "07")
+    Only one batch of windows is copied out of the prices at a time.
+    """
+    crypt_prices = load_hourly_prices(
+        crypto, start_month, start_day, end_month, end_day
+    )
+    windows, valid = make_price_windows(crypt_prices, fill_limit=fill_limit)
+
+    def batches():
+        for start in range(0, len(valid), batch_size):
+            yield split_windows(windows[valid[start : start + batch_size]])
+
+    return tf.data.Dataset.from_generator(
+        batches,
+        output_signature=(
+            tf.TensorSpec(
+                shape=(None, windows.shape[1] - 1, 1), dtype=tf.float32
+            ),
+            tf.TensorSpec(shape=(None,), dtype=tf.float32),
+        ),
+    )
 
-# %% pycharm={"name": "#%%\n"}
-bit_model = make_model(2)
-bit_model.fit(X_btc, y_btc, epochs=500, batch_size=10)
 
 # %% pycharm={"name": "#%%\n"}
-eth_model = make_model()
-eth_model.fit(X_eth, y_eth, epochs=1000, batch_size=10)
+if __name__ == "__main__":
+    df_avax, X_avax, y_avax = get_datasets(
+        "avalanche", TRAINING_INTERVALS, end=TEST_START
+    )
+    df_avax_test, _, _ = get_dataset("avalanche", *TEST_INTERVAL)
 
 # %% pycharm={"name": "#%%\n"}
-doge_model = make_model()
-doge_model.fit(X_doge, y_doge, epochs=1000, batch_size=10)
+if __name__ == "__main__":
+    df_btc, X_btc, y_btc = get_datasets(
+        "bitcoin", TRAINING_INTERVALS, end=TEST_START
+    )
+    df_btc_test, _, _ = get_dataset("bitcoin", *TEST_INTERVAL)
 
 # %% pycharm={"name": "#%%\n"}
-sol_model = make_model()
-sol_model.fit(X_sol, y_sol, epochs=1000, batch_size=10)
+if __name__ == "__main__":
+    df_eth, X_eth, y_eth = get_datasets(
+        "ethereum", TRAINING_INTERVALS, end=TEST_START
+    )
+    df_eth_test, _, _ = get_dataset("ethereum", *TEST_INTERVAL)
 
 # %% pycharm={"name": "#%%\n"}
-avax_model = make_model()
-avax_model.fit(X_avax, y_avax, epochs=1000, batch_size=10)
+if __name__ == "__main__":
+    df_sol, X_sol, y_sol = get_datasets(
+        "solana", TRAINING_INTERVALS, end=TEST_START
+    )
+    df_sol_test, _, _ = get_dataset("solana", *TEST_INTERVAL)
 
 # %% pycharm={"name": "#%%\n"}
-X_ts_btc, y_ts_btc = make_time_series_dataset(
-    "bitcoin", "01", "03", "04", "03"
-)
-X_test_btc, y_test_btc = make_time_series_dataset(
-    "bitcoin", "04", "05", "04", "07"
-)
-bit_ltsm = make_ts_model()
-bit_ltsm.fit(
-    X_ts_btc,
-    y_ts_btc,
-    epochs=500,
-    batch_size=10,
-    validation_data=(X_test_btc, y_test_btc),
-)
+if __name__ == "__main__":
+    df_doge, X_doge, y_doge = get_datasets(
+        "doge", TRAINING_INTERVALS, end=TEST_START
+    )
+    df_doge_test, _, _ = get_dataset("doge", *TEST_INTERVAL)
+
+# %% pycharm={"name": "#%%\n"}
+if __name__ == "__main__":
+    # Each coin's model trains in its own process, until it stops improving.
+    TRAINING_CONFIG = TrainingConfig(epochs=1000, batch_size=10, patience=50)
+    # Trained models are versioned in models/registry. Models whose data hasn't
+    # changed are reused, and ones with new data are fine-tuned from their last
+    # version for TRAINING_CONFIG.warm_start_epochs instead of trained again.
+    REGISTRY = ModelRegistry()
+
+    # Inputs of new models are scaled by the statistics of each coin's
+    # training data. Models carrying on from a registered version keep its
+    # statistics instead. Either are saved with the model, and reused to
+    # scale its test data.
+    sentiment_scalers = {
+        "bitcoin": ZScoreScaler().fit(X_btc),
+        "ethereum": ZScoreScaler().fit(X_eth),
+        "doge": ZScoreScaler().fit(X_doge),
+        "solana": ZScoreScaler().fit(X_sol),
+        "avalanche": ZScoreScaler().fit(X_avax),
+    }
+    sentiment_models = train_models(
+        {
+            "bitcoin": (X_btc, y_btc),
+            "ethereum": (X_eth, y_eth),
+            "doge": (X_doge, y_doge),
+            "solana": (X_sol, y_sol),
+            "avalanche": (X_avax, y_avax),
+        },
+        "sentiment",
+        TRAINING_CONFIG,
+        scalers=sentiment_scalers,
+        registry=REGISTRY,
+    )
+    bit_model = sentiment_models["bitcoin"][0]
+    eth_model = sentiment_models["ethereum"][0]
+    doge_model = sentiment_models["doge"][0]
+    sol_model = sentiment_models["solana"][0]
+    avax_model = sentiment_models["avalanche"][0]
+    sentiment_scalers = {
+        coin: scaler for coin, (_, _, scaler) in sentiment_models.items()
+    }
+
+# %% pycharm={"name": "#%%\n"}
+if __name__ == "__main__":
+    X_ts_btc, y_ts_btc = make_time_series_dataset(
+        "bitcoin", "01", "03", "04", "03"
+    )
+    X_test_btc, y_test_btc = make_time_series_dataset(
+        "bitcoin", "04", "05", "04", "07"
+    )
+    X_ts_eth, y_ts_eth = make_time_series_dataset(
+        "ethereum", "01", "03", "04", "03"
+    )
+    X_test_eth, y_test_eth = make_time_series_dataset(
+        "ethereum", "04", "05", "04", "07"
+    )
+    X_ts_avax, y_ts_avax = make_time_series_dataset(
+        "avalanche", "01", "03", "04", "03"
+    )
+    X_test_avax, y_test_avax = make_time_series_dataset(
+        "avalanche", "04", "05", "04", "07"
+    )
+    X_ts_sol, y_ts_sol = make_time_series_dataset(
+        "solana", "01", "03", "04", "03"
+    )
+    X_test_sol, y_test_sol = make_time_series_dataset(
+        "solana", "04", "05", "04", "07"
+    )
+    X_ts_doge, y_ts_doge = make_time_series_dataset(
+        "doge", "01", "03", "04", "03"
+    )
+    X_test_doge, y_test_doge = make_time_series_dataset(
+        "doge", "04", "05", "04", "07"
+    )
 
-# %% pycharm={"name": "#%%\n"}
-evaluate_model("05/04/2022", "07/04/2022", bit_model, df_btc_test)
+    ts_models = train_models(
+        {
+            "bitcoin": (X_ts_btc, y_ts_btc, X_test_btc, y_test_btc),
+            "ethereum": (X_ts_eth, y_ts_eth, X_test_eth, y_test_eth),
+            "doge": (X_ts_doge, y_ts_doge, X_test_doge, y_test_doge),
+            "solana": (X_ts_sol, y_ts_sol, X_test_sol, y_test_sol),
+            "avalanche": (X_ts_avax, y_ts_avax, X_test_avax, y_test_avax),
+        },
+        "time_series",
+        TrainingConfig(epochs=500, batch_size=10, patience=50),
+        registry=REGISTRY,
+    )
+    bit_ltsm = ts_models["bitcoin"][0]
+    eth_ltsm = ts_models["ethereum"][0]
+    doge_ltsm = ts_models["doge"][0]
+    sol_ltsm = ts_models["solana"][0]
+    avax_ltsm = ts_models["avalanche"][0]
+
+# %% pycharm={"name": "#%%\n"}
+if __name__ == "__main__":
+    print(
+        evaluate_model(
+            "05/04/2022",
+            "07/04/2022",
+            bit_model,
+            df_btc_test,
+            sentiment_scalers["bitcoin"],
+        )
+    )
 
 # %% [markdown] pycharm={"name": "#%% md\n"}
 # Much better accuracy from sentiment model than just time series
 
 # %% pycharm={"name": "#%%\n"}
-X_ts_eth, y_ts_eth = make_time_series_dataset(
-    "ethereum", "01", "03", "04", "03"
-)
-X_test_eth, y_test_eth = make_time_series_dataset(
-    "ethereum", "04", "05", "04", "07"
-)
-eth_ltsm = make_ts_model()
-eth_ltsm.fit(X_ts_eth, y_ts_eth, epochs=500, batch_size=10)
-
-# %% pycharm={"name": "#%%\n"}
-evaluate_model("05/04/2022", "07/04/2022", eth_model, df_eth_test)
+if __name__ == "__main__":
+    print(
+        evaluate_model(
+            "05/04/2022",
+            "07/04/2022",
+            eth_model,
+            df_eth_test,
+            sentiment_scalers["ethereum"],
+        )
+    )
 
 # %% [markdown] pycharm={"name": "#%% md\n"}
 # Sentiment model significantly outperforms time series
 
 # %% pycharm={"name": "#%%\n"}
-X_ts_avax, y_ts_avax = make_time_series_dataset(
-    "avalanche", "01", "03", "04", "03"
-)
-X_test_avax, y_test_avax = make_time_series_dataset(
-    "avalanche", "04", "05", "04", "07"
-)
-
-avax_ltsm = make_ts_model()
-avax_ltsm.fit(X_ts_avax, y_ts_avax, epochs=500, batch_size=10)
-
-# %% pycharm={"name": "#%%\n"}
-evaluate_model("05/04/2022", "07/04/2022", avax_model, df_avax_test)
+if __name__ == "__main__":
+    print(
+        evaluate_model(
+            "05/04/2022",
+            "07/04/2022",
+            avax_model,
+            df_avax_test,
+            sentiment_scalers["avalanche"],
+        )
+    )
 
 # %% [markdown] pycharm={"name": "#%% md\n"}
 # Sentiment is slightly more accurate but the price values are so small here its hard to say one way or another
 
 # %% pycharm={"name": "#%%\n"}
-X_ts_sol, y_ts_sol = make_time_series_dataset("solana", "01", "03", "04", "03")
-X_test_sol, y_test_sol = make_time_series_dataset(
-    "solana", "04", "05", "04", "07"
-)
-
-sol_ltsm = make_ts_model()
-sol_ltsm.fit(X_ts_sol, y_ts_sol, epochs=500, batch_size=10)
-
-# %% pycharm={"name": "#%%\n"}
-evaluate_model("05/04/2022", "07/04/2022", sol_model, df_sol_test)
+if __name__ == "__main__":
+    print(
+        evaluate_model(
+            "05/04/2022",
+            "07/04/2022",
+            sol_model,
+            df_sol_test,
+            sentiment_scalers["solana"],
+        )
+    )
 
 # %% [markdown] pycharm={"name": "#%% md\n"}
 # Same as above
 
 # %% pycharm={"name": "#%%\n"}
-X_ts_doge, y_ts_doge = make_time_series_dataset("doge", "01", "03", "04", "03")
-X_test_doge, y_test_doge = make_time_series_dataset(
-    "doge", "04", "05", "04", "07"
-)
-
-doge_ltsm = make_ts_model()
-doge_ltsm.fit(X_ts_doge, y_ts_doge, epochs=500, batch_size=10)
-
-# %% pycharm={"name": "#%%\n"}
-evaluate_model("05/04/2022", "07/04/2022", doge_model, df_doge_test)
+if __name__ == "__main__":
+    print(
+        evaluate_model(
+            "05/04/2022",
+            "07/04/2022",
+            doge_model,
+            df_doge_test,
+            sentiment_scalers["doge"],
+        )
+    )
 
 # %% [markdown] pycharm={"name": "#%% md\n"}
 # Slightly worse but again we're dealing with such small numbers here so idk
 
+# %% pycharm={"name": "#%%\n"}
+if __name__ == "__main__":
+    print(
+        evaluate_models(
+            "05/04/2022",
+            "07/04/2022",
+            {
+                "BTC": (bit_model, df_btc_test, sentiment_scalers["bitcoin"]),
+                "ETH": (eth_model, df_eth_test, sentiment_scalers["ethereum"]),
+                "DOGE": (doge_model, df_doge_test, sentiment_scalers["doge"]),
+                "SOL": (sol_model, df_sol_test, sentiment_scalers["solana"]),
+                "AVAX": (
+                    avax_model,
+                    df_avax_test,
+                    sentiment_scalers["avalanche"],
+                ),
+            },
+        )
+    )
+
 # %% [markdown]
 # Tried making bigger model but not gonna use so ignore the rest of the code
 
 # %% pycharm={"name": "#%%\n"}
-df_tot = df_btc.copy()
-df_tot = df_tot.append(df_sol)
-df_tot = df_tot.append(df_avax)
-df_tot = df_tot.append(df_eth)
-df_tot = df_tot.append(df_doge)
-
-X_tot = X_btc.copy()
-X_tot = X_tot.append(X_sol)
-X_tot = X_tot.append(X_avax)
-X_tot = X_tot.append(X_eth)
-X_tot = X_tot.append(X_doge)
-
-y_tot = y_btc.copy()
-y_tot = y_tot.append(y_sol)
-y_tot = y_tot.append(y_avax)
-y_tot = y_tot.append(y_eth)
-y_tot = y_tot.append(y_doge)
+if __name__ == "__main__":
+    df_tot = pd.concat([df_btc, df_sol, df_avax, df_eth, df_doge])
+    X_tot = pd.concat([X_btc, X_sol, X_avax, X_eth, X_doge])
+    y_tot = pd.concat([y_btc, y_sol, y_avax, y_eth, y_doge])
 
 
 # %% pycharm={"name": "#%%\n"}
-price_df = X_tot["price"]
-y_tot = (y_tot.sub(price_df, axis=0)).div(y_tot)
-X_tot = X_tot[["authority", "vader_sentiment_compound"]]
+if __name__ == "__main__":
+    price_df = X_tot["price"]
+    y_tot = (y_tot.sub(price_df, axis=0)).div(y_tot)
+    X_tot = X_tot[["authority", "vader_sentiment_compound"]]
 
 
 # %% pycharm={"name": "#%%\n"}
-tot_model = make_model(2)
-tot_model.fit(X_tot, y_tot, batch_size=10, epochs=10)
+if __name__ == "__main__":
+    tot_model = make_model(2)
+    tot_model.fit(X_tot, y_tot, batch_size=10, epochs=10)
@@ -0,0 +1,129 @@
+"""Z-score scaling of model inputs, with statistics fitted in one pass.
+
+Statistics are accumulated chunk by chunk, so a dataset too large to load
+at once, e.g., the partitions of `storage.iter_partitions`, can be fitted
+without loading all of it. They're saved next to the model they were
+fitted for, so inputs at inference are scaled like the training inputs.
+"""
+
+import json
+from collections.abc import Iterable
+
+import numpy as np
+from pandas import DataFrame
+
+
+class ZScoreScaler:
+    """Scale columns to zero mean and unit standard deviation.
+
+    Missing values are ignored by the statistics and stay missing. Columns
+    without spread, or with less than two values, are only centered.
+    """
+
+    def __init__(self, columns: list[str] | None = None):
+        self.columns = None if columns is None else list(columns)
+        self.count = None
+        self.mean = None
+        # Sum of the squared differences from the mean of each column.
+        self.square_sum = None
+
+    def partial_fit(self, chunk: DataFrame) -> "ZScoreScaler":
+        """Add the values of a chunk of rows to the statistics.
+
+        Chunks are merged with Chan et al.'s pairwise update, so fitting
+        every chunk gives the statistics of all of them at once.
+        """
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+        values = chunk[self.columns].to_numpy(dtype=float)
+        present = ~np.isnan(values)
+        count = present.sum(axis=0)
+        values = np.where(present, values, 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(count > 0, values.sum(axis=0) / count, 0)
+        square_sum = (np.where(present, values - mean, 0) ** 2).sum(axis=0)
+
+        if self.count is None:
+            self.count, self.mean, self.square_sum = count, mean, square_sum
+            return self
+
+        total = self.count + count
+        delta = mean - self.mean
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.mean = np.where(
+                total > 0, self.mean + delta * count / total, 0
+            )
+            self.square_sum = self.square_sum + square_sum
+            self.square_sum += np.where(
+                total > 0, delta**2 * self.count * count / total, 0
+            )
+        self.count = total
+        return self
+
+    def fit(self, data: DataFrame | Iterable[DataFrame]) -> "ZScoreScaler":
+        """Fit the statistics to a frame, or to an iterable of chunks."""
+        self.count = self.mean = self.square_sum = None
+        for chunk in [data] if isinstance(data, DataFrame) else data:
+            self.partial_fit(chunk)
+        if self.count is None:
+            raise ValueError("Can't fit a scaler to no data")
+        return self
+
+    @property
+    def std(self) -> np.ndarray:
+        """Sample standard deviation of each column, like pandas' std."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.sqrt(self.square_sum / (self.count - 1))
+
+    @property
+    def scale(self) -> np.ndarray:
+        """Divisor of each column, 1 where the deviation can't be used."""
+        std = self.std
+        return np.where(np.isfinite(std) & (std > 0), std, 1.0)
+
+    def transform(self, frame: DataFrame) -> DataFrame:
+        """Scale the fitted columns of a frame."""
+        values = frame[self.columns].to_numpy(dtype=float)
+        return DataFrame(
+            (values - self.mean) / self.scale,
+            index=frame.index,
+            columns=self.columns,
+        )
+
+    def inverse_transform(self, frame: DataFrame) -> DataFrame:
+        """Undo `transform`, back to the original units."""
+        values = frame[self.columns].to_numpy(dtype=float)
+        return DataFrame(
+            values * self.scale + self.mean,
+            index=frame.index,
+            columns=self.columns,
+        )
+
+    def to_dict(self) -> dict:
+        """Get the fitted statistics, by column."""
+        return {
+            "columns": self.columns,
+            "count": self.count.tolist(),
+            "mean": self.mean.tolist(),
+            "square_sum": self.square_sum.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, stats: dict) -> "ZScoreScaler":
+        """Make a fitted scaler from the statistics of `to_dict`."""
+        scaler = cls(stats["columns"])
+        scaler.count = np.asarray(stats["count"], dtype=np.int64)
+        scaler.mean = np.asarray(stats["mean"], dtype=float)
+        scaler.square_sum = np.asarray(stats["square_sum"], dtype=float)
+        return scaler
+
+    def save(self, path: str):
+        """Save the fitted statistics to a json file."""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file)
+
+    @classmethod
+    def load(cls, path: str) -> "ZScoreScaler":
+        """Load a scaler saved by `save`."""
+        with open(path, encoding="utf-8") as file:
+            return cls.from_dict(json.load(file))
@@ -16,15 +16,16 @@
 # # Performing Sentiment Analysis via Textblob and VADER
 
 # %%
-import re
-import string
 from os.path import dirname, join, realpath
 
 import nltk
-import pandas as pd
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from nltk.stem import WordNetLemmatizer
-from textblob import TextBlob
+
+from coin_tagging import save_coin_sentiment, select_coin, tag_coins
+from sentiment_scoring import score_sentiment
+from storage import find_table, read_table
+from text_cache import TextCache
+from text_cleaning import CACHE_NAME, clean_frame
+from tweet_features import KEY, tweet_keys
 
 
 # %%
@@ -40,102 +41,80 @@ if is_interactive():
 else:
     SCRIPT_DIR = dirname(realpath(__file__))
 
-DATA_DIR = join(SCRIPT_DIR, "data", "processed", "twitter")
+# "../data/processed/twitter"
+DATA_DIR = join(dirname(SCRIPT_DIR), "data", "processed", "twitter")
+# Results of tweets seen in earlier runs, e.g., of overlapping weeks.
+CACHE_PATH = join(dirname(SCRIPT_DIR), "data", "cache", "text_cache.sqlite")
+
+# %% [markdown]
+# Tweets are cleaned and scored in spawned worker processes, which import
+# this script again before they start. Cells that load or process data only
+# run in the main process, so the workers don't start pools of their own.
 
 # %% pycharm={"name": "#%%\n"}
-data = pd.read_csv(join(DATA_DIR, "tweets_2022_03_05-2022_03_11.csv"))
-data.head()
+if __name__ == "__main__":
+    data = read_table(
+        find_table(join(DATA_DIR, "tweets_2022_03_05-2022_03_11")),
+        parse_dates=["created_at"],
+    )
+    print(data.head())
 
 # %% [markdown]
 # ## Clean Tweets
 
 # %% pycharm={"name": "#%%\n"}
-text_data = data[
-    [
-        "Unnamed: 0",
-        "name",
-        "verified",
-        "created_at",
-        "retweet_count",
-        "favorite_count",
-        "followers_count",
-        "hashtags",
-        "text",
+if __name__ == "__main__":
+    text_data = data[
+        [
+            "name",
+            "verified",
+            "created_at",
+            "retweet_count",
+            "favorite_count",
+            "followers_count",
+            "hashtags",
+            "text",
+        ]
     ]
-]
-text_data = text_data.rename(columns={"Unnamed: 0": "tweet_id"})
-text_data.head()
-
-# %% pycharm={"name": "#%%\n"}
-punctuation = string.punctuation
-punctuation = punctuation.replace("#", "")
-punctuation = punctuation.replace("@", "")
-
-
-def remove_punctuation(text):
-    punctuationfree = "".join([i for i in text if i not in punctuation])
-    return punctuationfree
-
-
-# %% pycharm={"name": "#%%\n"}
-def tokenization(text):
-    tokens = re.split("W+", text)
-    return tokens
-
+    # Tweets are identified by their row in the processed dataset, and by the
+    # key of their features in the feature store.
+    text_data = text_data.rename_axis("tweet_id").reset_index()
+    text_data[KEY] = tweet_keys(data).to_numpy()
+    print(text_data.head())
 
 # %% pycharm={"name": "#%%\n"}
-nltk.download("stopwords")
-stopwords = nltk.corpus.stopwords.words("english")
-
-
-def remove_stopwords(text):
-    output = [i for i in text if i not in stopwords]
-    return output
-
+if __name__ == "__main__":
+    nltk.download("stopwords")
+    nltk.download("wordnet")
 
 # %% pycharm={"name": "#%%\n"}
-nltk.download("wordnet")
-wordnet_lemmatizer = WordNetLemmatizer()
-
-
-def lemmatizer(text):
-    lemm_text = [wordnet_lemmatizer.lemmatize(word) for word in text]
-    return lemm_text
-
-
-# %% pycharm={"name": "#%%\n"}
-def clean_text(text):
-    text["clean_text"] = text["text"].apply(lambda x: remove_punctuation(x))
-    text["clean_text"] = text["clean_text"].apply(lambda x: x.lower())
-    text["clean_text"] = text["clean_text"].apply(lambda x: tokenization(x))
-    text["clean_text"] = text["clean_text"].apply(
-        lambda x: remove_stopwords(x)
-    )
-    text["clean_text"] = text["clean_text"].apply(lambda x: lemmatizer(x))
-    clean = text
-    return clean
-
+if __name__ == "__main__":
+    # Punctuation and stopword removal, lowercasing, tokenization and
+    # lemmatization are done in a single pass per tweet.
+    with TextCache(CACHE_PATH, CACHE_NAME) as clean_text_cache:
+        text_data = clean_frame(text_data, cache=clean_text_cache)
+        print(clean_text_cache.stats())
+    print(text_data.head())
 
 # %% pycharm={"name": "#%%\n"}
-text_data = clean_text(text_data)
-text_data.head()
-
-# %% pycharm={"name": "#%%\n"}
-text_data.info()
-
+if __name__ == "__main__":
+    text_data.info()
 
 # %% [markdown]
 # ## Sentiment Analysis
 
 # %% pycharm={"name": "#%%\n"}
-def textblob_polarity(text):
-    return TextBlob(text).sentiment.polarity
+if __name__ == "__main__":
+    nltk.download("vader_lexicon")
 
-
-# %% pycharm={"name": "#%%\n"}
-text_data["textblob_sentiment"] = (
-    text_data["clean_text"].astype("str").apply(textblob_polarity)
-)
+    # Each tweet is scored once by both VADER and TextBlob.
+    with TextCache(CACHE_PATH, "sentiment") as sentiment_cache:
+        text_data = text_data.assign(
+            **score_sentiment(
+                text_data["clean_text"].astype("str"), cache=sentiment_cache
+            )
+        )
+        print(sentiment_cache.stats())
 
 
 # %% pycharm={"name": "#%%\n"}
@@ -149,30 +128,14 @@ def textblob_sentiment_summary(text):
 
 
 # %% pycharm={"name": "#%%\n"}
-text_data["textblob_summary"] = text_data["textblob_sentiment"].apply(
-    lambda x: textblob_sentiment_summary(x)
-)
-
-# %% pycharm={"name": "#%%\n"}
-text_data.head()
-
-# %% pycharm={"name": "#%%\n"}
-nltk.download("vader_lexicon")
-sid = SentimentIntensityAnalyzer()
+if __name__ == "__main__":
+    text_data["textblob_summary"] = text_data["textblob_sentiment"].apply(
+        lambda x: textblob_sentiment_summary(x)
+    )
 
 # %% pycharm={"name": "#%%\n"}
-text_data["vader_sentiment_pos"] = (
-    text_data["clean_text"].astype("str")
-).apply(lambda x: sid.polarity_scores(x)["pos"])
-text_data["vader_sentiment_neg"] = (
-    text_data["clean_text"].astype("str")
-).apply(lambda x: sid.polarity_scores(x)["neg"])
-text_data["vader_sentiment_neu"] = (
-    text_data["clean_text"].astype("str")
-).apply(lambda x: sid.polarity_scores(x)["neu"])
-text_data["vader_sentiment_compound"] = (
-    text_data["clean_text"].astype("str")
-).apply(lambda x: sid.polarity_scores(x)["compound"])
+if __name__ == "__main__":
+    print(text_data.head())
 
 
 # %% pycharm={"name": "#%%\n"}
@@ -186,69 +149,39 @@ def vader_sentiment_summary(text):
 
 
 # %% pycharm={"name": "#%%\n"}
-text_data["vader_summary"] = text_data["vader_sentiment_compound"].apply(
-    lambda x: vader_sentiment_summary(x)
-)
+if __name__ == "__main__":
+    text_data["vader_summary"] = text_data["vader_sentiment_compound"].apply(
+        lambda x: vader_sentiment_summary(x)
+    )
 
 # %% pycharm={"name": "#%%\n"}
-text_data.info()
+if __name__ == "__main__":
+    text_data.info()
 
 # %% [markdown]
 # ## Saving Analysis per Coin
+#
+# Each tweet is scanned once for every coin it mentions. The tweets are saved
+# once, along with a table of which coins each tweet mentions, so a coin's
+# tweets can be selected without duplicating rows on disk.
 
 # %% pycharm={"name": "#%%\n"}
-bitcoin_sentiment = text_data[text_data["text"].str.contains("bitcoin|BTC")]
-ethereum_sentiment = text_data[text_data["text"].str.contains("ethereum|ETH")]
-doge_sentiment = text_data[text_data["text"].str.contains("dogecoin|DOGE")]
-avalanche_sentiment = text_data[
-    text_data["text"].str.contains("avalanche|AVAX")
-]
-solana_sentiment = text_data[text_data["text"].str.contains("solana|SOL")]
-crypto_sentiment = text_data[
-    text_data["text"].str.contains("crypto|cryptocurrency|coin")
-]
-
-# %% pycharm={"name": "#%%\n"}
-bitcoin_sentiment.to_csv(join(DATA_DIR, "bitcoin_sentiment.csv"))
-bitcoin_sentiment.head()
-
-# %% pycharm={"name": "#%%\n"}
-ethereum_sentiment.to_csv(join(DATA_DIR, "ethereum_sentiment.csv"))
-ethereum_sentiment.head()
-
-# %% pycharm={"name": "#%%\n"}
-doge_sentiment.to_csv(join(DATA_DIR, "doge_sentiment.csv"))
-doge_sentiment.head()
-
-# %% pycharm={"name": "#%%\n"}
-solana_sentiment.to_csv(join(DATA_DIR, "solana_sentiment.csv"))
-solana_sentiment.head()
-
-# %% pycharm={"name": "#%%\n"}
-avalanche_sentiment.to_csv(join(DATA_DIR, "avalanche_sentiment.csv"))
-avalanche_sentiment.head()
+if __name__ == "__main__":
+    coin_membership = tag_coins(text_data["text"])
+    save_coin_sentiment(DATA_DIR, text_data, coin_membership)
+    print(coin_membership["coin"].value_counts())
 
 # %% pycharm={"name": "#%%\n"}
-crypto_sentiment.to_csv(join(DATA_DIR, "crypto_sentiment.csv"))
-crypto_sentiment.head()
+if __name__ == "__main__":
+    bitcoin_sentiment = select_coin(text_data, coin_membership, "bitcoin")
+    print(bitcoin_sentiment.head())
 
 # %% pycharm={"name": "#%%\n"}
-len_doge = len(doge_sentiment)
-len_btc = len(bitcoin_sentiment)
-len_avax = len(avalanche_sentiment)
-len_eth = len(ethereum_sentiment)
-len_sol = len(solana_sentiment)
-
-print(len(text_data) - len_doge - len_sol - len_eth - len_btc - len_avax)
-print(
-    len(text_data)
-    - len_doge
-    - len_sol
-    - len_eth
-    - len_btc
-    - len_avax
-    - len(crypto_sentiment)
-)
+if __name__ == "__main__":
+    # Tweets that mention none of the coins, then none of the coins nor crypto.
+    coin_rows = coin_membership.loc[coin_membership["coin"] != "crypto", "row"]
+    print(len(text_data) - coin_rows.nunique())
+    print(len(text_data) - coin_membership["row"].nunique())
 
 # %% [markdown] pycharm={"name": "#%% md\n"}
 # Not all the tweets pertain to the coins - there is clearly some error within the API as there are some tweets with no hashtags or mention of the specified criteria. Perhaps it pulled in some viral tweets that were important across all spaces despite not explicitly mentioning the keywords.
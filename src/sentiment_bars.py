@@ -0,0 +1,121 @@
+"""Aggregate the sentiment of each coin's tweets into fixed time bars.
+
+A bar summarizes the tweets of a minute, 5 minutes or an hour, so a busy
+minute is one row rather than one row per tweet. Bars line up with the
+minutes of price data, e.g., of `volatility.stack_prices`.
+"""
+
+from os.path import join
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from storage import find_table, read_table, table_path, write_table
+from time_utils import strip_timezone
+
+BAR_COLUMNS = [
+    "tweet_count",
+    "sentiment_mean",
+    "sentiment_weighted_mean",
+    "sentiment_std",
+]
+BARS_NAME = "sentiment_bars_{freq}"
+
+
+def influence_weights(tweets: DataFrame) -> np.ndarray:
+    """Weigh each tweet by the log of its author's followers.
+
+    Taking the log keeps a few huge accounts from outweighing every other
+    tweet. Tweets without a follower count weigh as little as possible.
+    """
+    if "followers_count" not in tweets:
+        return np.ones(len(tweets))
+    followers = tweets["followers_count"].to_numpy(dtype=float)
+    return 1 + np.log1p(np.nan_to_num(followers, nan=0.0).clip(min=0))
+
+
+def resample_sentiment(
+    tweets: DataFrame,
+    freq: str = "min",
+    by: str = "cryptocurrency",
+    weights: np.ndarray | None = None,
+) -> DataFrame:
+    """Summarize the sentiment of each coin's tweets in bars of `freq`.
+
+    `tweets` has "time" and "sentiment" columns, and the coin of each tweet
+    in its `by` column. Each bar has the number of tweets, and the mean,
+    influence-weighted mean and standard deviation of their sentiment.
+    Tweets are weighted by `weights`, e.g., their influence in the feature
+    store, or by `influence_weights` by default. Only bars with tweets are
+    returned, indexed by coin and bar start.
+    """
+    sentiment = tweets["sentiment"].to_numpy(dtype=float)
+    if weights is None:
+        weights = influence_weights(tweets)
+    present = ~np.isnan(sentiment)
+    # Tweets of unknown influence count for nothing in the weighted mean.
+    weights = np.where(present & ~np.isnan(weights), weights, 0)
+    sentiment = np.where(present, sentiment, 0)
+
+    sums = (
+        DataFrame(
+            {
+                by: tweets[by].to_numpy(),
+                "time": strip_timezone(tweets["time"]).dt.floor(freq),
+                "count": present.astype(int),
+                "sum": sentiment,
+                "square_sum": sentiment**2,
+                "weight": weights,
+                "weighted_sum": weights * sentiment,
+            }
+        )
+        .groupby([by, "time"], observed=True)
+        .sum()
+    )
+    sums = sums[sums["count"] > 0]
+
+    count = sums["count"]
+    mean = sums["sum"] / count
+    variance = (sums["square_sum"] - count * mean**2) / (count - 1)
+    return DataFrame(
+        {
+            "tweet_count": count,
+            "sentiment_mean": mean,
+            "sentiment_weighted_mean": (
+                sums["weighted_sum"] / sums["weight"]
+            ).where(sums["weight"] > 0, mean),
+            "sentiment_std": np.sqrt(variance.clip(lower=0)),
+        }
+    )
+
+
+def stack_bars(
+    bars: DataFrame, index: pd.DatetimeIndex, by: str = "cryptocurrency"
+) -> dict[str, DataFrame]:
+    """Stack the bars into one (bar start, coin) frame per column.
+
+    Bars are aligned to `index`, e.g., the minutes of price data, with
+    missing values where a coin has no tweets.
+    """
+    return {
+        column: bars[column].unstack(by).reindex(index)
+        for column in BAR_COLUMNS
+    }
+
+
+def save_sentiment_bars(data_dir: str, bars: DataFrame, freq: str = "min"):
+    """Save the bars of a frequency, next to the datasets they came from."""
+    write_table(
+        bars.reset_index(),
+        table_path(join(data_dir, BARS_NAME.format(freq=freq))),
+    )
+
+
+def load_sentiment_bars(data_dir: str, freq: str = "min") -> DataFrame:
+    """Load the bars saved by `save_sentiment_bars`."""
+    bars = read_table(
+        find_table(join(data_dir, BARS_NAME.format(freq=freq))),
+        parse_dates=["time"],
+    )
+    return bars.set_index([bars.columns[0], "time"])
@@ -0,0 +1,101 @@
+"""Score tweet sentiment with VADER and TextBlob in a single pass."""
+
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+
+import numpy as np
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from textblob import TextBlob
+
+from text_cache import TextCache
+
+# Order of the columns in the score matrix returned by `score_texts`.
+SENTIMENT_COLUMNS = [
+    "vader_sentiment_pos",
+    "vader_sentiment_neg",
+    "vader_sentiment_neu",
+    "vader_sentiment_compound",
+    "textblob_sentiment",
+]
+VADER_COMPONENTS = ["pos", "neg", "neu", "compound"]
+
+# Below this many texts, starting a process pool costs more than it saves.
+MIN_PARALLEL_TEXTS = 5000
+
+# One analyzer per process, since loading the VADER lexicon isn't free.
+_analyzer = None
+
+
+def get_analyzer() -> SentimentIntensityAnalyzer:
+    """Get the VADER analyzer of the current process."""
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+
+def score_texts(texts: list[str]) -> np.ndarray:
+    """Score each text once, returning a (len(texts), 5) float matrix."""
+    sid = get_analyzer()
+    scores = np.empty((len(texts), len(SENTIMENT_COLUMNS)))
+    for row, text in enumerate(texts):
+        vader_scores = sid.polarity_scores(text)
+        for column, component in enumerate(VADER_COMPONENTS):
+            scores[row, column] = vader_scores[component]
+        scores[row, -1] = TextBlob(text).sentiment.polarity
+    return scores
+
+
+def score_unique_texts(
+    texts: list[str], processes: int, chunk_size: int
+) -> np.ndarray:
+    """Score texts in the current process or across a process pool."""
+    if processes == 1 or len(texts) < MIN_PARALLEL_TEXTS:
+        return score_texts(texts)
+
+    chunks = [
+        texts[start : start + chunk_size]
+        for start in range(0, len(texts), chunk_size)
+    ]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return np.vstack(list(executor.map(score_texts, chunks)))
+
+
+def score_sentiment(
+    texts,
+    processes: int | None = None,
+    chunk_size: int = 1000,
+    cache: TextCache | None = None,
+) -> dict[str, np.ndarray]:
+    """Score the texts, returning one array per sentiment column.
+
+    Duplicate texts are scored once, and texts found in `cache` aren't
+    scored at all. The rest are split into chunks of `chunk_size` texts and
+    scored across `processes` worker processes (all CPUs by default). Pass
+    `processes=1` to score in the current process.
+    """
+    texts = [str(text) for text in texts]
+    if processes is None:
+        processes = cpu_count() or 1
+
+    unique_texts = list(dict.fromkeys(texts))
+    cached = cache.get_many(unique_texts) if cache is not None else {}
+    new_texts = [text for text in unique_texts if text not in cached]
+    new_scores = score_unique_texts(new_texts, processes, chunk_size)
+    if cache is not None:
+        cache.put_many(dict(zip(new_texts, new_scores.tolist())))
+
+    positions = {text: row for row, text in enumerate(new_texts)}
+    positions.update(
+        (text, len(new_texts) + row) for row, text in enumerate(cached)
+    )
+    cached_scores = np.array(list(cached.values()), dtype=float)
+    unique_scores = np.vstack(
+        [new_scores, cached_scores.reshape(-1, len(SENTIMENT_COLUMNS))]
+    )
+    scores = unique_scores[[positions[text] for text in texts]]
+
+    return {
+        column: scores[:, index]
+        for index, column in enumerate(SENTIMENT_COLUMNS)
+    }
@@ -0,0 +1,119 @@
+"""Rank the social volatility of coins over many windows and lags at once.
+
+Social volatility is the absolute Pearson correlation between the sentiment
+of a coin's tweets and its price volatility. Here, the volatility is taken
+`lag` minutes after each tweet, so sentiment leads volatility, and every
+volatility window, lag and coin is correlated in one run.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from scipy import stats
+
+from time_utils import floor_minute, strip_timezone
+
+LAGS = range(0, 61)
+
+
+def correlate_columns(x: np.ndarray, y: np.ndarray) -> tuple:
+    """Correlate each column of `x` with `y`, ignoring missing values.
+
+    Returns the correlation and the number of pairs of each column.
+    """
+    present = ~np.isnan(x) & ~np.isnan(y)[:, None]
+    pairs = present.sum(axis=0)
+    x = np.where(present, x, 0)
+    y = np.where(present, y[:, None], 0)
+    sum_x = x.sum(axis=0)
+    sum_y = y.sum(axis=0)
+    covariance = pairs * (x * y).sum(axis=0) - sum_x * sum_y
+    variance = (pairs * (x**2).sum(axis=0) - sum_x**2) * (
+        pairs * (y**2).sum(axis=0) - sum_y**2
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlation = np.where(
+            (pairs > 2) & (variance > 0),
+            covariance / np.sqrt(variance),
+            np.nan,
+        )
+    return correlation, pairs
+
+
+def p_values(correlation: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+    """Two-sided p-values of Pearson correlations, from a t-test."""
+    freedom = np.maximum(pairs - 2, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = correlation * np.sqrt(freedom / (1 - correlation**2))
+    return 2 * stats.t.sf(np.abs(t), freedom)
+
+
+def rank_social_volatility(
+    volatilities: DataFrame,
+    sentiment: DataFrame,
+    lags=LAGS,
+    by: str = "cryptocurrency",
+) -> DataFrame:
+    """Correlate sentiment with later volatility, for every column and lag.
+
+    `volatilities` is indexed by consecutive minutes, with a "coin" level in
+    its columns, like the frames of `volatility.compute_volatilities`.
+    `sentiment` has "time" and "sentiment" columns, and the coin of each row
+    in its `by` column. Each coin's volatilities are shifted once per lag,
+    and all of their columns are correlated at once.
+
+    Returns one row per coin, volatility column and lag, ranked by social
+    volatility. The p-values are also given Bonferroni adjusted for the
+    number of windows and lags tested per coin.
+    """
+    lags = np.asarray(lags)
+    minutes = volatilities.index
+    times = floor_minute(strip_timezone(sentiment["time"]))
+    positions = ((times - minutes[0]) // pd.Timedelta(minutes=1)).to_numpy()
+
+    tables = []
+    for coin, coin_volatilities in volatilities.T.groupby(level="coin"):
+        coin_volatilities = coin_volatilities.droplevel("coin").T
+        rows = (sentiment[by] == coin).to_numpy() & (positions >= 0)
+        rows &= positions < len(minutes)
+        coin_positions = positions[rows]
+        coin_sentiment = sentiment["sentiment"].to_numpy(dtype=float)[rows]
+
+        # Missing rows past the end, for the tweets of the last minutes.
+        padded = np.vstack(
+            [
+                coin_volatilities.to_numpy(dtype=float),
+                np.full((lags.max() + 1, coin_volatilities.shape[1]), np.nan),
+            ]
+        )
+        results = [
+            correlate_columns(padded[coin_positions + lag], coin_sentiment)
+            for lag in lags
+        ]
+        correlation = np.stack([result[0] for result in results])
+        pairs = np.stack([result[1] for result in results])
+
+        table = DataFrame(
+            np.repeat(
+                coin_volatilities.columns.to_frame(index=False).to_numpy(),
+                len(lags),
+                axis=0,
+            ).reshape(-1, coin_volatilities.columns.nlevels),
+            columns=coin_volatilities.columns.names,
+        )
+        table.insert(0, by, coin)
+        table["lag"] = np.tile(lags, coin_volatilities.shape[1])
+        table["pairs"] = pairs.T.ravel()
+        table["correlation"] = correlation.T.ravel()
+        tables.append(table)
+
+    ranking = pd.concat(tables, ignore_index=True)
+    ranking["social_volatility"] = ranking["correlation"].abs()
+    ranking["p_value"] = p_values(
+        ranking["correlation"].to_numpy(), ranking["pairs"].to_numpy()
+    )
+    tests = ranking.groupby(by)["correlation"].transform("count")
+    ranking["adjusted_p_value"] = (ranking["p_value"] * tests).clip(upper=1)
+    return ranking.sort_values(
+        "social_volatility", ascending=False, na_position="last"
+    ).reset_index(drop=True)
@@ -0,0 +1,131 @@
+"""Read and write datasets as typed, compressed columnar files.
+
+Parquet is the default format. Feather files are also supported, as are the
+csv files the project used to save datasets in, so existing datasets can
+still be read until they're rewritten. Datasets that grow over time, e.g., by
+a day of tweets at a time, can be saved as partitions with one file each.
+"""
+
+from collections.abc import Iterator
+from os import listdir, makedirs
+from os.path import exists, join, splitext
+
+import pandas as pd
+from pandas import DataFrame
+
+PARQUET_SUFFIX = ".parquet"
+FEATHER_SUFFIX = ".feather"
+CSV_SUFFIX = ".csv"
+# Suffixes in order of preference when looking for a saved dataset.
+SUFFIXES = [PARQUET_SUFFIX, FEATHER_SUFFIX, CSV_SUFFIX]
+DEFAULT_SUFFIX = PARQUET_SUFFIX
+COMPRESSION = "zstd"
+
+
+def table_path(stem: str, suffix: str = DEFAULT_SUFFIX) -> str:
+    """Get the path of a dataset saved in the given format."""
+    return stem + suffix
+
+
+def find_table(stem: str) -> str:
+    """Find the saved dataset with the given path minus its suffix.
+
+    Columnar files are preferred over csv files of the same dataset.
+    """
+    for suffix in SUFFIXES:
+        if exists(stem + suffix):
+            return stem + suffix
+    raise FileNotFoundError(f"No dataset found at {stem}.*")
+
+
+def write_table(frame: DataFrame, path: str):
+    """Save a data frame, choosing the format from the path's suffix.
+
+    The index isn't saved, so keep anything worth saving in a column.
+    """
+    suffix = splitext(path)[1]
+    if suffix == PARQUET_SUFFIX:
+        frame.to_parquet(path, compression=COMPRESSION, index=False)
+    elif suffix == FEATHER_SUFFIX:
+        frame.reset_index(drop=True).to_feather(path, compression=COMPRESSION)
+    elif suffix == CSV_SUFFIX:
+        frame.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unsupported dataset format: {path}")
+
+
+def read_table(
+    path: str,
+    columns: list[str] | None = None,
+    parse_dates: list[str] | None = None,
+) -> DataFrame:
+    """Load a data frame, choosing the format from the path's suffix.
+
+    Only `columns` are read if given. Columnar files keep their datetime
+    columns' types, while the `parse_dates` columns of csv files are parsed.
+    Index columns that older csv files were saved with, i.e., ``Unnamed: 0``,
+    are dropped.
+    """
+    suffix = splitext(path)[1]
+    if suffix == PARQUET_SUFFIX:
+        return pd.read_parquet(path, columns=columns)
+    if suffix == FEATHER_SUFFIX:
+        return pd.read_feather(path, columns=columns)
+    if suffix != CSV_SUFFIX:
+        raise ValueError(f"Unsupported dataset format: {path}")
+
+    frame = pd.read_csv(path, usecols=columns)
+    frame = frame.loc[:, ~frame.columns.str.startswith("Unnamed: ")]
+    for column in parse_dates or []:
+        frame[column] = pd.to_datetime(frame[column], format="mixed")
+    return frame
+
+
+def partition_path(dataset_dir: str, key: str) -> str:
+    """Get the path of one partition of a partitioned dataset."""
+    return table_path(join(dataset_dir, key))
+
+
+def has_partition(dataset_dir: str, key: str) -> bool:
+    """Check whether a partition was already saved."""
+    return exists(partition_path(dataset_dir, key))
+
+
+def write_partition(dataset_dir: str, key: str, frame: DataFrame):
+    """Save one partition, e.g., a day of tweets, of a partitioned dataset.
+
+    Partitions are saved as separate files, so adding one to a dataset
+    doesn't rewrite the others.
+    """
+    makedirs(dataset_dir, exist_ok=True)
+    write_table(frame, partition_path(dataset_dir, key))
+
+
+def iter_partitions(
+    dataset_dir: str,
+    keys: list[str] | None = None,
+    columns: list[str] | None = None,
+) -> Iterator[DataFrame]:
+    """Load the partitions with the given keys, or all of them, one by one.
+
+    Only one partition is in memory at a time, for datasets that don't fit.
+    """
+    if keys is None:
+        keys = sorted(
+            splitext(filename)[0]
+            for filename in listdir(dataset_dir)
+            if filename.endswith(DEFAULT_SUFFIX)
+        )
+    for key in keys:
+        yield read_table(partition_path(dataset_dir, key), columns=columns)
+
+
+def read_partitions(
+    dataset_dir: str,
+    keys: list[str] | None = None,
+    columns: list[str] | None = None,
+) -> DataFrame:
+    """Load the partitions with the given keys, or all of them, in order."""
+    return pd.concat(
+        iter_partitions(dataset_dir, keys, columns), ignore_index=True
+    )
@@ -0,0 +1,129 @@
+"""Persistent least-recently-used cache of results computed per text."""
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from os import makedirs
+from os.path import dirname
+from typing import Any, Iterable
+
+# SQLite limits the number of parameters in a single query.
+MAX_QUERY_PARAMETERS = 900
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Collapse runs of whitespace, which never change a tweet's result."""
+    return WHITESPACE.sub(" ", text)
+
+
+class TextCache:
+    """An on-disk cache of JSON values keyed by a hash of the text.
+
+    Each `name` is stored in its own table, so e.g. cleaned tokens and
+    sentiment scores can share a file. Once a table holds more than
+    `max_entries` rows, the least recently used ones are evicted.
+    """
+
+    def __init__(self, path: str, name: str, max_entries: int = 1_000_000):
+        if dirname(path):
+            makedirs(dirname(path), exist_ok=True)
+        self.path = path
+        self.name = name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.execute(
+                f'CREATE TABLE IF NOT EXISTS "{name}" ('
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "last_used INTEGER NOT NULL)"
+            )
+            self._connection.execute(
+                f'CREATE INDEX IF NOT EXISTS "{name}_last_used" '
+                f'ON "{name}" (last_used)'
+            )
+
+    @staticmethod
+    def key(text: str) -> str:
+        """Hash a text into its cache key."""
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+    def get_many(self, texts: Iterable[str]) -> dict[str, Any]:
+        """Get the cached values of the texts that are in the cache."""
+        keys = {self.key(text): text for text in texts}
+        found = {}
+        key_list = list(keys)
+        for start in range(0, len(key_list), MAX_QUERY_PARAMETERS):
+            batch = key_list[start : start + MAX_QUERY_PARAMETERS]
+            rows = self._connection.execute(
+                f'SELECT key, value FROM "{self.name}" '
+                f"WHERE key IN ({', '.join('?' * len(batch))})",
+                batch,
+            )
+            for key, value in rows:
+                found[keys[key]] = json.loads(value)
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        self._touch([self.key(text) for text in found])
+        return found
+
+    def put_many(self, values: dict[str, Any]):
+        """Cache the value of each text, evicting old entries if needed."""
+        now = time.time_ns()
+        with self._connection:
+            self._connection.executemany(
+                f'INSERT OR REPLACE INTO "{self.name}" '
+                "(key, value, last_used) VALUES (?, ?, ?)",
+                (
+                    (self.key(text), json.dumps(value), now)
+                    for text, value in values.items()
+                ),
+            )
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries beyond `max_entries`."""
+        excess = len(self) - self.max_entries
+        if excess <= 0:
+            return
+        with self._connection:
+            self._connection.execute(
+                f'DELETE FROM "{self.name}" WHERE key IN ('
+                f'SELECT key FROM "{self.name}" '
+                "ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def _touch(self, keys: list[str]):
+        """Mark the keys as just used."""
+        now = time.time_ns()
+        with self._connection:
+            self._connection.executemany(
+                f'UPDATE "{self.name}" SET last_used = ? WHERE key = ?',
+                ((now, key) for key in keys),
+            )
+
+    def __len__(self) -> int:
+        return self._connection.execute(
+            f'SELECT COUNT(*) FROM "{self.name}"'
+        ).fetchone()[0]
+
+    def stats(self) -> dict[str, int]:
+        """Get the hit and miss counts since the cache was opened."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+    def close(self):
+        """Close the connection to the cache file."""
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
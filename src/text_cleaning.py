@@ -0,0 +1,157 @@
+"""Clean tweet text into lemmatized tokens in a single pass per tweet."""
+
+import re
+import string
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from os import cpu_count
+from typing import Iterable, Iterator
+
+import nltk
+import pandas as pd
+from nltk.stem import WordNetLemmatizer
+from pandas import DataFrame
+
+from text_cache import TextCache, normalize_text
+
+# Hashtags and mentions are kept when removing punctuation.
+PUNCTUATION = string.punctuation.replace("#", "").replace("@", "")
+PUNCTUATION_TABLE = str.maketrans("", "", PUNCTUATION)
+TOKEN_SEPARATOR = re.compile(r"[^\w#@]+")
+# Cache table of cleaned tokens, renamed whenever the cleaning changes.
+CACHE_NAME = "clean_text_2"
+
+# Below this many texts, starting a process pool costs more than it saves.
+MIN_PARALLEL_TEXTS = 5000
+
+_wordnet_lemmatizer = WordNetLemmatizer()
+
+
+@lru_cache(maxsize=None)
+def get_stopwords() -> frozenset[str]:
+    """Get the set of English stopwords."""
+    return frozenset(nltk.corpus.stopwords.words("english"))
+
+
+@lru_cache(maxsize=2**16)
+def lemmatize(word: str) -> str:
+    """Lemmatize a word, remembering words that were already seen."""
+    return _wordnet_lemmatizer.lemmatize(word)
+
+
+def clean_tweet(text: str) -> list[str]:
+    """Remove punctuation and stopwords, then lowercase and lemmatize."""
+    stopwords = get_stopwords()
+    tokens = TOKEN_SEPARATOR.split(text.translate(PUNCTUATION_TABLE).lower())
+    return [
+        lemmatize(token)
+        for token in tokens
+        if token and token not in stopwords
+    ]
+
+
+def clean_texts(texts: Iterable[str]) -> list[list[str]]:
+    """Clean each text in the current process."""
+    return [clean_tweet(text) for text in texts]
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    """Split an iterable into lists of at most `size` items."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def iter_clean_chunks(
+    chunks: Iterable[list[str]], processes: int | None = None
+) -> Iterator[list[list[str]]]:
+    """Clean chunks of texts across worker processes.
+
+    Cleaned chunks are yielded in input order as soon as they are ready, with
+    at most two chunks per worker in flight, so `chunks` can lazily cover
+    more tweets than fit in memory.
+    """
+    if processes is None:
+        processes = cpu_count() or 1
+
+    if processes == 1:
+        yield from map(clean_texts, chunks)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending: deque = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(clean_texts, chunk))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def clean_frame(
+    frame: DataFrame,
+    column: str = "text",
+    chunk_size: int = 1000,
+    processes: int | None = None,
+    cache: TextCache | None = None,
+) -> DataFrame:
+    """Add a ``clean_text`` column with the cleaned tokens of `column`.
+
+    Texts that only differ in whitespace are cleaned once, and texts found
+    in `cache` aren't cleaned at all.
+    """
+    texts = [normalize_text(text) for text in frame[column]]
+    unique_texts = list(dict.fromkeys(texts))
+    cleaned = cache.get_many(unique_texts) if cache is not None else {}
+    new_texts = [text for text in unique_texts if text not in cleaned]
+    if len(new_texts) < MIN_PARALLEL_TEXTS:
+        processes = 1
+
+    new_tokens: list[list[str]] = []
+    chunks = chunked(new_texts, chunk_size)
+    for clean_chunk in iter_clean_chunks(chunks, processes):
+        new_tokens.extend(clean_chunk)
+    new_cleaned = dict(zip(new_texts, new_tokens))
+    if cache is not None:
+        cache.put_many(new_cleaned)
+    cleaned.update(new_cleaned)
+
+    return frame.assign(
+        clean_text=pd.Series(
+            [cleaned[text] for text in texts], index=frame.index
+        )
+    )
+
+
+def clean_csv(
+    input_path: str,
+    output_path: str,
+    column: str = "text",
+    chunk_size: int = 1000,
+    processes: int | None = None,
+):
+    """Stream a csv of tweets to a new csv with a ``clean_text`` column.
+
+    Rows are read, cleaned and written `chunk_size` at a time, so only the
+    chunks in flight are ever held in memory.
+    """
+    frames: deque = deque()
+
+    def text_chunks():
+        for frame in pd.read_csv(input_path, chunksize=chunk_size):
+            frames.append(frame)
+            yield frame[column].tolist()
+
+    header = True
+    for clean_chunk in iter_clean_chunks(text_chunks(), processes):
+        frame = frames.popleft()
+        frame["clean_text"] = pd.Series(clean_chunk, index=frame.index)
+        frame.to_csv(
+            output_path,
+            mode="w" if header else "a",
+            header=header,
+            index=False,
+        )
+        header = False
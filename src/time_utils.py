@@ -0,0 +1,41 @@
+"""Convert and round whole columns of times at once."""
+
+import pandas as pd
+from pandas import Series
+
+ONE_SECOND = pd.Timedelta(seconds=1)
+
+
+def from_epoch(seconds: Series) -> Series:
+    """Convert epoch seconds, e.g., of candles, to naive UTC datetimes."""
+    return pd.to_datetime(seconds, unit="s")
+
+
+def epoch_seconds(times: Series) -> Series:
+    """Convert datetimes to epoch seconds, treating naive times as UTC."""
+    return (strip_timezone(times) - pd.Timestamp(0)) // ONE_SECOND
+
+
+def strip_timezone(times: Series) -> Series:
+    """Convert times to naive UTC datetimes, whatever their time zones.
+
+    Strings, e.g., of tweets saved in csv files, are parsed too, even when
+    they mix formats.
+    """
+    times = pd.to_datetime(times, utc=True, format="mixed")
+    return times.dt.tz_localize(None)
+
+
+def floor_minute(times: Series) -> Series:
+    """Round times down to the start of their minute."""
+    return times.dt.floor("min")
+
+
+def floor_hour(times: Series) -> Series:
+    """Round times down to the start of their hour."""
+    return times.dt.floor("h")
+
+
+def round_hour(times: Series) -> Series:
+    """Round times to the nearest hour, rounding up from half past."""
+    return floor_hour(times) + pd.to_timedelta(times.dt.minute // 30, unit="h")
@@ -0,0 +1,227 @@
+"""Train the models of several coins concurrently across processes."""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from os.path import dirname, join, realpath
+
+import keras
+import numpy as np
+import tensorflow as tf
+
+import models
+from model_registry import ModelRegistry, dataset_fingerprint
+from scaler import ZScoreScaler
+
+# "../models"
+MODELS_DIR = join(dirname(dirname(realpath(__file__))), "models")
+
+# Builders of the models in `models`, by the kind of model they build.
+MODEL_KINDS = {"sentiment": "make_model", "time_series": "make_ts_model"}
+
+
+@dataclass
+class TrainingConfig:
+    """Settings shared by the training of every coin's model."""
+
+    epochs: int = 1000
+    batch_size: int = 10
+    # Epochs without improvement before training stops early.
+    patience: int = 50
+    checkpoint_dir: str = MODELS_DIR
+    # Epochs to fine-tune a registered model for on new data.
+    warm_start_epochs: int = 20
+
+
+def split_cpus(processes: int) -> list[list[int]]:
+    """Split the CPUs this process may run on into one group per process."""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    return [
+        [int(cpu) for cpu in group]
+        for group in np.array_split(cpus, min(processes, len(cpus)))
+    ]
+
+
+def scaler_path(checkpoint_dir: str, coin: str, kind: str) -> str:
+    """Get the path of the input statistics saved with a coin's model."""
+    return join(checkpoint_dir, f"{coin}_{kind}_scaler.json")
+
+
+def to_float32(data) -> np.ndarray:
+    """Convert a data frame or array to a float32 array."""
+    return np.asarray(data, dtype=np.float32)
+
+
+def pin_worker(cpu_groups):
+    """Pin a worker process to the next free group of CPUs.
+
+    TensorFlow's thread pools are sized to the group, so workers don't
+    compete for the same cores. This has to run before TensorFlow is used.
+    """
+    cpus = cpu_groups.get()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    tf.config.threading.set_intra_op_parallelism_threads(len(cpus))
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def train_model(
+    coin: str,
+    kind: str,
+    X,
+    y,
+    validation_data,
+    config: TrainingConfig,
+    initial_path: str | None = None,
+):
+    """Train a coin's model, keeping its best weights in a checkpoint.
+
+    The model is warm-started from the one saved at initial_path, if given,
+    and only trained for config.warm_start_epochs.
+    """
+    if initial_path is None:
+        build = getattr(models, MODEL_KINDS[kind])
+        model = build(X.shape[1]) if kind == "sentiment" else build()
+        epochs = config.epochs
+    else:
+        model = keras.models.load_model(initial_path)
+        epochs = config.warm_start_epochs
+
+    monitor = "loss" if validation_data is None else "val_loss"
+    os.makedirs(config.checkpoint_dir, exist_ok=True)
+    checkpoint_path = join(config.checkpoint_dir, f"{coin}_{kind}.keras")
+    history = model.fit(
+        X,
+        y,
+        epochs=epochs,
+        batch_size=config.batch_size,
+        validation_data=validation_data,
+        callbacks=[
+            keras.callbacks.EarlyStopping(
+                monitor=monitor,
+                patience=config.patience,
+                restore_best_weights=True,
+            ),
+            keras.callbacks.ModelCheckpoint(
+                checkpoint_path, monitor=monitor, save_best_only=True
+            ),
+        ],
+        verbose=0,
+    )
+    return checkpoint_path, history.history
+
+
+def train_models(
+    datasets: dict,
+    kind: str,
+    config: TrainingConfig | None = None,
+    processes: int | None = None,
+    scalers: dict[str, ZScoreScaler] | None = None,
+    registry: ModelRegistry | None = None,
+) -> dict:
+    """Train one model per coin, with each coin trained in its own process.
+
+    datasets maps each coin to its training inputs and targets, optionally
+    followed by validation inputs and targets. Returns each coin's trained
+    model, the history of its training and the scaler of its inputs.
+
+    scalers maps coins to the fitted scalers of their input frames, if the
+    inputs are to be scaled. Each scaler is saved next to its coin's model,
+    so the model's inputs can be scaled the same way at inference.
+
+    With a registry, each trained model is saved as a new version of the
+    coin's model. A coin whose training data is the same as its latest
+    version's isn't trained again, and one with new data is warm-started
+    from its latest version rather than trained from scratch. Both keep
+    the scaler of the latest version, since the model's weights were
+    trained on inputs scaled by it, instead of the one in scalers.
+
+    Workers are spawned, so a script calling this has to do so under an
+    ``if __name__ == "__main__":`` guard, while notebooks needn't.
+    """
+    config = config or TrainingConfig()
+    results = {}
+    jobs = {}
+    for coin, (X, y, *validation) in datasets.items():
+        fingerprint = dataset_fingerprint(X, y)
+        latest = None if registry is None else registry.latest(coin, kind)
+        # A model only carries on from one whose inputs were scaled alike.
+        if latest is not None and (latest.scaler is None) != (scalers is None):
+            latest = None
+        scaler = None
+        if latest is not None:
+            scaler = latest.scaler
+        elif scalers is not None:
+            scaler = scalers[coin]
+
+        if latest is not None and latest.fingerprint == fingerprint:
+            results[coin] = (latest.model, {}, scaler)
+            continue
+
+        if scaler is not None:
+            X = scaler.transform(X)
+            if validation:
+                validation[0] = scaler.transform(validation[0])
+            os.makedirs(config.checkpoint_dir, exist_ok=True)
+            scaler.save(scaler_path(config.checkpoint_dir, coin, kind))
+        jobs[coin] = (
+            to_float32(X),
+            to_float32(y),
+            tuple(map(to_float32, validation)) if validation else None,
+            fingerprint,
+            latest,
+            scaler,
+        )
+    if not jobs:
+        return results
+
+    processes = min(processes or os.cpu_count() or 1, len(jobs))
+    cpu_groups = split_cpus(processes)
+
+    # TensorFlow isn't safe to fork, so workers start from scratch.
+    context = multiprocessing.get_context("spawn")
+    free_cpu_groups = context.Queue()
+    for group in cpu_groups:
+        free_cpu_groups.put(group)
+
+    with ProcessPoolExecutor(
+        max_workers=len(cpu_groups),
+        mp_context=context,
+        initializer=pin_worker,
+        initargs=(free_cpu_groups,),
+    ) as executor:
+        futures = {
+            coin: executor.submit(
+                train_model,
+                coin,
+                kind,
+                X,
+                y,
+                validation_data,
+                config,
+                None if latest is None else latest.model_path,
+            )
+            for coin, (X, y, validation_data, _, latest, _) in jobs.items()
+        }
+
+        for coin, future in futures.items():
+            checkpoint_path, history = future.result()
+            if registry is not None:
+                _, y, _, fingerprint, latest, scaler = jobs[coin]
+                registry.register(
+                    coin,
+                    kind,
+                    checkpoint_path,
+                    fingerprint,
+                    rows=len(y),
+                    epochs=len(next(iter(history.values()), [])),
+                    scaler=scaler,
+                    parent=None if latest is None else latest.version,
+                )
+            model = keras.models.load_model(checkpoint_path)
+            results[coin] = (model, history, jobs[coin][5])
+    return {coin: results[coin] for coin in datasets}
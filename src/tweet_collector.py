@@ -0,0 +1,175 @@
+"""Collect the tweets of several hashtags, resuming from checkpoints."""
+
+import json
+from os import listdir, makedirs, replace
+from os.path import exists, join, splitext
+
+import pandas as pd
+from pandas import DataFrame
+from twython import TwythonRateLimitError
+
+from storage import DEFAULT_SUFFIX, read_partitions, write_partition
+
+# Columns read from each tweet, and the object of the tweet they're in.
+TWEET_FIELDS = {
+    "id": None,
+    "text": None,
+    "retweet_count": None,
+    "favorite_count": None,
+    "followers_count": "user",
+    "verified": "user",
+    "listed_count": "user",
+    "created_at": None,
+    "hashtags": "entities",
+    "name": "user",
+}
+CREATED_AT_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+CHECKPOINT_FILENAME = "checkpoints.json"
+# Most tweets a single search may return.
+MAX_COUNT = 100
+
+
+def read_tweet(status: dict) -> dict:
+    """Read a tweet of the search results into a row of columns."""
+    return {
+        field: (status[parent] if parent else status)[field]
+        for field, parent in TWEET_FIELDS.items()
+    }
+
+
+class TweetCollector:
+    """Page through the searches of hashtags, saving each tweet once.
+
+    Pages are requested from the newest tweets back with `max_id`, down to
+    the newest tweet of the hashtag's previous collection, its `since_id`.
+    Tweets found by several hashtags, or by earlier collections, are
+    skipped. Rows are streamed to `data_dir` in partitions of about
+    `flush_size` tweets, and checkpoints of both ids are only saved with
+    them, so an interrupted collection resumes after the last tweets saved.
+    """
+
+    def __init__(self, client, data_dir: str, flush_size: int = 1000):
+        self.client = client
+        self.data_dir = data_dir
+        self.flush_size = flush_size
+        self.checkpoint_path = join(data_dir, CHECKPOINT_FILENAME)
+        self.checkpoints: dict[str, dict] = {}
+        if exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding="utf-8") as file:
+                self.checkpoints = json.load(file)
+
+        makedirs(data_dir, exist_ok=True)
+        self.partitions = sorted(
+            splitext(filename)[0]
+            for filename in listdir(data_dir)
+            if filename.endswith(DEFAULT_SUFFIX)
+        )
+        self.seen_ids: set[int] = set()
+        if self.partitions:
+            self.seen_ids.update(
+                read_partitions(data_dir, self.partitions, columns=["id"])[
+                    "id"
+                ]
+            )
+        self._rows: list[dict] = []
+
+    def collect(
+        self,
+        hashtags: list[str],
+        max_pages: int | None = None,
+        **search_kwargs,
+    ) -> list[str]:
+        """Collect the new tweets of each hashtag.
+
+        At most `max_pages` pages are requested per hashtag, and the rest
+        are left for the next collection. `search_kwargs` are passed on to
+        every search, e.g., `until` or `result_type`. Collecting stops early
+        once the API's rate limit is hit. Returns the partitions written.
+        """
+        first_partition = len(self.partitions)
+        try:
+            for hashtag in hashtags:
+                self.collect_hashtag(hashtag, max_pages, **search_kwargs)
+        except TwythonRateLimitError:
+            pass
+        finally:
+            self.flush()
+        return self.partitions[first_partition:]
+
+    def collect_hashtag(
+        self, hashtag: str, max_pages: int | None = None, **search_kwargs
+    ):
+        """Page back through a hashtag's tweets since its last collection."""
+        checkpoint = self.checkpoints.setdefault(
+            hashtag, {"since_id": None, "max_id": None, "newest_id": None}
+        )
+        pages = 0
+        while max_pages is None or pages < max_pages:
+            params = {
+                key: checkpoint[key]
+                for key in ["since_id", "max_id"]
+                if checkpoint[key] is not None
+            }
+            statuses = self.client.search(
+                q=hashtag, count=MAX_COUNT, **params, **search_kwargs
+            )["statuses"]
+            pages += 1
+            if not statuses:
+                break
+
+            for status in statuses:
+                if status["id"] not in self.seen_ids:
+                    self.seen_ids.add(status["id"])
+                    self._rows.append(read_tweet(status))
+
+            ids = [status["id"] for status in statuses]
+            checkpoint["newest_id"] = max(
+                checkpoint["newest_id"] or 0, max(ids)
+            )
+            checkpoint["max_id"] = min(ids) - 1
+            self.save_progress()
+        else:
+            # Out of pages before reaching the last collection's tweets.
+            return
+
+        # Caught up, so the next collection stops at this one's tweets.
+        checkpoint["since_id"] = checkpoint["newest_id"]
+        checkpoint["max_id"] = None
+        self.save_progress()
+
+    def save_progress(self):
+        """Save the checkpoints, unless they'd get ahead of the saved rows.
+
+        Rows are flushed once `flush_size` of them are waiting. Until then,
+        the saved checkpoints stay at the last flush, so the waiting rows are
+        collected again if the collection is killed.
+        """
+        if len(self._rows) >= self.flush_size:
+            self.flush()
+        elif not self._rows:
+            self.save_checkpoints()
+
+    def flush(self):
+        """Save the tweets collected since the last flush as a partition.
+
+        The checkpoints are saved after the tweets they cover.
+        """
+        if not self._rows:
+            self.save_checkpoints()
+            return
+        tweets = DataFrame(self._rows)
+        tweets["created_at"] = pd.to_datetime(
+            tweets["created_at"], format=CREATED_AT_FORMAT
+        )
+        key = f"tweets_{len(self.partitions):06d}"
+        write_partition(self.data_dir, key, tweets)
+        self.partitions.append(key)
+        self._rows = []
+        self.save_checkpoints()
+
+    def save_checkpoints(self):
+        """Save the checkpoints, replacing the old ones in a single step."""
+        partial_path = f"{self.checkpoint_path}.partial"
+        with open(partial_path, "w", encoding="utf-8") as file:
+            json.dump(self.checkpoints, file)
+        replace(partial_path, self.checkpoint_path)
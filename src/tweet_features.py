@@ -0,0 +1,222 @@
+"""Store of influence features computed once per tweet.
+
+Features are kept in a single table keyed by tweet, which the sentiment,
+volatility and prediction stages join to instead of computing their own.
+"""
+
+from collections.abc import Iterator
+from os import listdir
+from os.path import exists, join, splitext
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+from scaler import ZScoreScaler
+from storage import SUFFIXES, find_table, read_table, table_path, write_table
+from time_utils import strip_timezone
+
+KEY = "tweet_key"
+FEATURES_NAME = "tweet_features"
+# Statistics authority is normalized by, kept next to the store.
+AUTHORITY_STATS_FILENAME = f"{FEATURES_NAME}_authority.json"
+# Columns identifying tweets without an id.
+KEY_COLUMNS = ["created_at", "name", "text"]
+# Counts the features are computed from, kept to normalize new tweets with.
+COUNT_COLUMNS = [
+    "retweet_count",
+    "favorite_count",
+    "followers_count",
+    "listed_count",
+]
+# Counts whose z-scores are summed into authority.
+AUTHORITY_COLUMNS = ["retweet_count", "favorite_count", "followers_count"]
+FEATURE_COLUMNS = [
+    "popularity",
+    "reach",
+    "verified_boost",
+    "listed_boost",
+    "influence",
+    "authority",
+]
+# Verified authors reach half again as many readers as their followers.
+VERIFIED_BOOST = 1.5
+# Boost per order of magnitude, roughly, of the lists an author is on.
+LISTED_WEIGHT = 0.1
+
+
+def normalize_whitespace(texts: Series) -> Series:
+    """Replace each run of whitespace by a space, and trim the ends."""
+    return texts.astype("string").str.split().str.join(" ")
+
+
+def tweet_keys(tweets: DataFrame) -> Series:
+    """Identify each tweet, by its id if it has one.
+
+    Tweets collected before ids were kept are identified by a hash of their
+    time, author and text. Runs of whitespace are hashed as a single space,
+    since datasets saved on different systems break lines differently.
+    """
+    if KEY in tweets:
+        return tweets[KEY]
+    if "id" in tweets:
+        return tweets["id"].astype("int64").rename(KEY)
+    hashes = pd.util.hash_pandas_object(
+        DataFrame(
+            {
+                "created_at": strip_timezone(tweets["created_at"]),
+                "name": normalize_whitespace(tweets["name"]),
+                "text": normalize_whitespace(tweets["text"]),
+            }
+        ),
+        index=False,
+    )
+    return Series(
+        hashes.to_numpy().view(np.int64), index=tweets.index, name=KEY
+    )
+
+
+def count_column(tweets: DataFrame, column: str) -> np.ndarray:
+    """Get a count of each tweet, with missing counts as 0."""
+    if column not in tweets:
+        return np.zeros(len(tweets))
+    counts = pd.to_numeric(tweets[column], errors="coerce")
+    return counts.fillna(0).clip(lower=0).to_numpy(dtype=float)
+
+
+def compute_features(tweets: DataFrame) -> DataFrame:
+    """Compute the features of tweets that don't depend on other tweets."""
+    counts = {column: count_column(tweets, column) for column in COUNT_COLUMNS}
+    verified = (
+        tweets["verified"]
+        .astype("string")
+        .str.lower()
+        .eq("true")
+        .fillna(False)
+        .to_numpy(dtype=bool)
+        if "verified" in tweets
+        else np.zeros(len(tweets), dtype=bool)
+    )
+
+    features = DataFrame({KEY: tweet_keys(tweets).to_numpy(), **counts})
+    features["popularity"] = counts["retweet_count"] + counts["favorite_count"]
+    features["reach"] = np.log1p(counts["followers_count"])
+    features["verified_boost"] = np.where(verified, VERIFIED_BOOST, 1.0)
+    features["listed_boost"] = 1 + LISTED_WEIGHT * np.log1p(
+        counts["listed_count"]
+    )
+    features["influence"] = (
+        (np.log1p(features["popularity"]) + features["reach"])
+        * features["verified_boost"]
+        * features["listed_boost"]
+    )
+    return features
+
+
+def normalize_authority(features: DataFrame, scaler: ZScoreScaler) -> Series:
+    """Sum the z-scores of the retweets, likes and followers of tweets.
+
+    Scores are relative to the statistics fitted by `scaler`.
+    """
+    return scaler.transform(features[AUTHORITY_COLUMNS]).sum(axis=1)
+
+
+def read_tweet_tables(data_dir: str) -> Iterator[DataFrame]:
+    """Read every dataset of tweets in a folder.
+
+    Datasets of tweets are those with the columns tweets are identified and
+    scored by, e.g., the processed tweets and the sentiment of each coin's
+    tweets. Those with more of the counts the features use come first.
+    """
+    stems = sorted(
+        {
+            stem
+            for stem, suffix in map(splitext, listdir(data_dir))
+            if suffix in SUFFIXES and stem != FEATURES_NAME
+        }
+    )
+    tables = []
+    for stem in stems:
+        table = read_table(find_table(join(data_dir, stem)))
+        if set(KEY_COLUMNS) <= set(table.columns) and any(
+            column in table for column in COUNT_COLUMNS
+        ):
+            tables.append(table)
+    tables.sort(
+        key=lambda table: -sum(column in table for column in COUNT_COLUMNS)
+    )
+    yield from tables
+
+
+def update_feature_store(data_dir: str, tweets: DataFrame) -> DataFrame:
+    """Add the features of new tweets to the store, returning the store.
+
+    Tweets already in the store, or seen earlier in `tweets`, aren't
+    computed again, and stored features never change. The authority of new
+    tweets is normalized by the statistics of every tweet stored so far,
+    theirs included, which are merged into the saved ones.
+    """
+    path = table_path(join(data_dir, FEATURES_NAME))
+    stats_path = join(data_dir, AUTHORITY_STATS_FILENAME)
+    stored = read_table(path) if exists(path) else None
+    if exists(stats_path):
+        scaler = ZScoreScaler.load(stats_path)
+    else:
+        scaler = ZScoreScaler(AUTHORITY_COLUMNS)
+        if stored is not None:
+            # Stores saved before the statistics were, normalized over
+            # every stored tweet.
+            scaler.partial_fit(stored[AUTHORITY_COLUMNS])
+
+    keys = tweet_keys(tweets)
+    new = ~keys.duplicated()
+    if stored is not None:
+        new &= ~keys.isin(stored[KEY])
+    if stored is not None and not new.any():
+        return stored
+    features = compute_features(tweets[new.to_numpy()])
+    scaler.partial_fit(features[AUTHORITY_COLUMNS])
+    features["authority"] = normalize_authority(features, scaler)
+    if stored is not None:
+        features = pd.concat([stored, features], ignore_index=True)
+
+    write_table(features, path)
+    scaler.save(stats_path)
+    return features
+
+
+def load_features(
+    data_dir: str, columns: list[str] | None = None
+) -> DataFrame:
+    """Load the stored features, indexed by tweet."""
+    return read_table(
+        find_table(join(data_dir, FEATURES_NAME)),
+        columns=None if columns is None else [KEY, *columns],
+    ).set_index(KEY)
+
+
+def join_features(
+    tweets: DataFrame,
+    features: DataFrame,
+    columns: list[str] | None = None,
+    fill: float | None = None,
+) -> DataFrame:
+    """Join the stored features of each tweet, by its key.
+
+    Tweets missing from the store raise a KeyError, unless `fill` is given
+    as the value of their features.
+    """
+    features = features if columns is None else features[columns]
+    keys = tweet_keys(tweets)
+    missing = ~keys.isin(features.index).to_numpy()
+    if missing.any() and fill is None:
+        raise KeyError(
+            f"{missing.sum()} of {len(tweets)} tweets aren't in the feature "
+            "store, run twitter_influence_feature.py to add them"
+        )
+    joined = tweets.drop(columns=features.columns, errors="ignore").join(
+        features, on=keys
+    )
+    if missing.any():
+        joined.loc[missing, list(features.columns)] = fill
+    return joined
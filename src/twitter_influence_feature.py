@@ -22,14 +22,27 @@
 #
 # Results:
 # - Popularity score = Retweets + Likes
-# - Reach score = Followers - Following (N/A)
+# - Reach score = log(1 + Followers)
+# - Verified and listed boosts, for verified authors and authors on many lists
+# - Influence score = (log(1 + Popularity) + Reach) * Boosts
+# - Authority score = Sum of the z-scores of Retweets, Likes and Followers
 # - Relevance_score = Comments + Mentions (N/A)
+#
+# The scores are kept in a feature store, once per tweet, which other
+# notebooks join to by tweet. Authority is normalized by statistics saved with
+# the store and merged as tweets are added, so stored scores never change.
 
 # %%
 from os.path import dirname, join, realpath
 
 import pandas as pd
 
+from tweet_features import (
+    FEATURE_COLUMNS,
+    read_tweet_tables,
+    update_feature_store,
+)
+
 
 # %%
 def is_interactive():
@@ -47,20 +60,15 @@ else:
 DATA_DIR = join(dirname(SCRIPT_DIR), "data", "processed", "twitter")
 
 # %%
-tweet_data = pd.read_csv(join(DATA_DIR, "tweets_2022_03_05-2022_03_11.csv"))
-# Drop 2 unnamed columns.
-tweet_data.drop(columns=["Unnamed: 0", "Unnamed: 0.1"], inplace=True)
+# Every dataset of tweets, so that every tweet the other notebooks score,
+# e.g., the sentiment of each coin's tweets, is in the store. Unnamed index
+# columns of older csv files are dropped when reading.
+tweet_data = pd.concat(read_tweet_tables(DATA_DIR), ignore_index=True)
 tweet_data.head()
 
 # %%
-tweet_data["popularity"] = (
-    tweet_data["retweet_count"] + tweet_data["favorite_count"]
-)
-# Remove combined features.
-tweet_data = tweet_data.drop(["retweet_count", "favorite_count"], axis=1)
-tweet_data.to_csv(
-    join(DATA_DIR, "tweets_2022_03_05-2022_03_11_popularity.csv"), index=False
-)
-tweet_data.head()
+# Only tweets that aren't in the store yet are computed.
+tweet_features = update_feature_store(DATA_DIR, tweet_data)
+tweet_features[FEATURE_COLUMNS].describe()
 
 # %%
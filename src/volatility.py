@@ -0,0 +1,161 @@
+"""Estimate the volatility of every coin over several windows at once.
+
+Prices of all coins are stacked into (minute, coin) matrices, so each
+estimator runs once over the matrix instead of once per coin. Volatilities
+are scaled to their window, like ``calculate_financial_volatility``, i.e.,
+the per-minute standard deviation times the square root of the window.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from time_utils import from_epoch
+
+OHLC_COLUMNS = ["open", "high", "low", "close"]
+# Length of each window, in minutes.
+WINDOWS = {"5m": 5, "15m": 15, "1h": 60, "1d": 24 * 60}
+ESTIMATORS = ["close_to_close", "parkinson", "garman_klass", "ewma"]
+
+
+def stack_prices(
+    prices: dict[str, DataFrame], columns: list[str] = OHLC_COLUMNS
+) -> dict[str, DataFrame]:
+    """Stack each coin's candles into one (minute, coin) frame per column.
+
+    Minutes without a candle, e.g., between the loaded periods, are left
+    missing, so windows always span the same length of time.
+    """
+    stacked = {}
+    for column in columns:
+        series = {}
+        for coin, frame in prices.items():
+            times = frame["time"]
+            if pd.api.types.is_numeric_dtype(times):
+                times = from_epoch(times)
+            coin_series = pd.Series(
+                frame[column].to_numpy(dtype=float), index=times.to_numpy()
+            )
+            series[coin] = coin_series[
+                ~coin_series.index.duplicated(keep="last")
+            ]
+        stacked[column] = DataFrame(series)
+
+    minutes = pd.date_range(
+        min(frame.index.min() for frame in stacked.values()),
+        max(frame.index.max() for frame in stacked.values()),
+        freq="min",
+    )
+    return {
+        column: frame.reindex(minutes) for column, frame in stacked.items()
+    }
+
+
+def log_returns(close: np.ndarray) -> np.ndarray:
+    """Get the log return of each minute, as in `calculate_returns`."""
+    returns = np.full_like(close, np.nan)
+    returns[1:] = np.log(close[1:] / close[:-1])
+    return returns
+
+
+def rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Sum the last `window` rows of each column, in a single pass.
+
+    Sums of windows with missing values are missing, like pandas' rolling
+    windows.
+    """
+    missing = np.isnan(values)
+    zero = np.zeros((1, values.shape[1]))
+    sums = np.concatenate([zero, np.cumsum(np.where(missing, 0, values), 0)])
+    counts = np.concatenate([zero, np.cumsum(missing, axis=0)])
+
+    result = np.full_like(values, np.nan)
+    window_sums = sums[window:] - sums[:-window]
+    complete = counts[window:] - counts[:-window] == 0
+    result[window - 1 :] = np.where(complete, window_sums, np.nan)
+    return result
+
+
+def close_to_close(returns: np.ndarray, window: int) -> np.ndarray:
+    """Scaled standard deviation of the returns in each window."""
+    sums = rolling_sum(returns, window)
+    square_sums = rolling_sum(returns**2, window)
+    variance = (square_sums - sums**2 / window) / max(window - 1, 1)
+    return np.sqrt(np.clip(variance, 0, None) * window)
+
+
+def parkinson(high: np.ndarray, low: np.ndarray, window: int) -> np.ndarray:
+    """Volatility from the range of each candle, ignoring its drift."""
+    variance = np.log(high / low) ** 2 / (4 * np.log(2))
+    return np.sqrt(rolling_sum(variance, window))
+
+
+def garman_klass(
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    window: int,
+) -> np.ndarray:
+    """Volatility from the range and the open to close move of candles."""
+    variance = (
+        0.5 * np.log(high / low) ** 2
+        - (2 * np.log(2) - 1) * np.log(close / open_) ** 2
+    )
+    return np.sqrt(np.clip(rolling_sum(variance, window), 0, None))
+
+
+def ewma(returns: np.ndarray, window: int) -> np.ndarray:
+    """Volatility from exponentially weighted squared returns.
+
+    Weights decay with a span of `window` minutes, like RiskMetrics with
+    lambda = 1 - 2 / (window + 1).
+    """
+    variance = (
+        DataFrame(returns**2)
+        .ewm(span=window, min_periods=window, ignore_na=True)
+        .mean()
+        .to_numpy()
+    )
+    return np.sqrt(variance * window)
+
+
+def compute_volatilities(
+    stacked: dict[str, DataFrame],
+    windows: dict[str, int] = WINDOWS,
+    estimators: list[str] = ESTIMATORS,
+) -> DataFrame:
+    """Estimate the volatility of every coin with each estimator and window.
+
+    `stacked` holds the prices of `stack_prices`. Returns a frame indexed by
+    minute, with (estimator, window, coin) columns.
+    """
+    close = stacked["close"]
+    arrays = {column: frame.to_numpy() for column, frame in stacked.items()}
+    returns = log_returns(arrays["close"])
+
+    results = {}
+    for estimator in estimators:
+        for name, window in windows.items():
+            if estimator == "close_to_close":
+                volatility = close_to_close(returns, window)
+            elif estimator == "parkinson":
+                volatility = parkinson(arrays["high"], arrays["low"], window)
+            elif estimator == "garman_klass":
+                volatility = garman_klass(
+                    arrays["open"],
+                    arrays["high"],
+                    arrays["low"],
+                    arrays["close"],
+                    window,
+                )
+            elif estimator == "ewma":
+                volatility = ewma(returns, window)
+            else:
+                raise ValueError(f"Unknown estimator: {estimator}")
+            for column, coin in enumerate(close.columns):
+                results[estimator, name, coin] = volatility[:, column]
+
+    volatilities = DataFrame(results, index=close.index)
+    volatilities.columns.names = ["estimator", "window", "coin"]
+    return volatilities
@@ -0,0 +1,340 @@
+"""Rank the social volatility of coins as prices and tweets stream in.
+
+Social volatility is the absolute Pearson correlation between the sentiment
+of a coin's tweets and the volatility of its price in the tweet's minute,
+as in ``financial_volatility.py``. Here it's kept up to date over sliding
+windows, one event at a time, with memory bounded by the windows.
+"""
+
+import csv
+import heapq
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from time_utils import epoch_seconds
+
+MINUTE = 60
+
+
+class RollingMoments:
+    """Mean and variance of the last values added, updated in O(1).
+
+    Values are added and removed with Welford's updates, so the window
+    slides without summing it again.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float):
+        """Add a value to the window."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def remove(self, value: float):
+        """Remove a value that was added to the window."""
+        if self.count <= 1:
+            self.__init__()
+            return
+        self.count -= 1
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.m2 -= delta * (value - self.mean)
+
+    def std(self) -> float:
+        """Get the sample standard deviation, NaN for less than 2 values."""
+        if self.count < 2:
+            return math.nan
+        return math.sqrt(max(self.m2, 0.0) / (self.count - 1))
+
+
+class RollingCorrelation:
+    """Pearson correlation of the last pairs added, updated in O(1)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.co_moment = 0.0
+
+    def add(self, x: float, y: float):
+        """Add a pair to the window."""
+        self.count += 1
+        delta_x = x - self.mean_x
+        delta_y = y - self.mean_y
+        self.mean_x += delta_x / self.count
+        self.mean_y += delta_y / self.count
+        self.m2_x += delta_x * (x - self.mean_x)
+        self.m2_y += delta_y * (y - self.mean_y)
+        self.co_moment += delta_x * (y - self.mean_y)
+
+    def remove(self, x: float, y: float):
+        """Remove a pair that was added to the window."""
+        if self.count <= 1:
+            self.__init__()
+            return
+        self.count -= 1
+        delta_x = x - self.mean_x
+        delta_y = y - self.mean_y
+        self.mean_x -= delta_x / self.count
+        self.mean_y -= delta_y / self.count
+        self.m2_x -= delta_x * (x - self.mean_x)
+        self.m2_y -= delta_y * (y - self.mean_y)
+        self.co_moment -= delta_x * (y - self.mean_y)
+
+    def correlation(self) -> float:
+        """Get the correlation, NaN if either side doesn't vary."""
+        variance = self.m2_x * self.m2_y
+        if self.count < 2 or variance <= 0:
+            return math.nan
+        return self.co_moment / math.sqrt(variance)
+
+
+@dataclass
+class CoinState:
+    """What's kept of a coin's recent prices and tweets."""
+
+    last_price: float = math.nan
+    last_minute: int | None = None
+    returns: deque = field(default_factory=deque)
+    return_moments: RollingMoments = field(default_factory=RollingMoments)
+    # Volatility of the latest minutes, for tweets arriving after them.
+    volatilities: dict[int, float] = field(default_factory=dict)
+    # Tweets waiting for the candle of their minute.
+    pending: dict[int, list[float]] = field(default_factory=dict)
+    # (minute, volatility, sentiment) of the pairs in the window.
+    pairs: deque = field(default_factory=deque)
+    correlation: RollingCorrelation = field(default_factory=RollingCorrelation)
+
+
+@dataclass
+class Ranking:
+    """Social volatility of each coin at the end of a minute, highest first."""
+
+    time: pd.Timestamp
+    social_volatility: dict[str, float]
+
+    def to_frame(self) -> DataFrame:
+        """Get the ranking in the shape of ``social_volatilities_df``."""
+        return DataFrame(
+            {
+                "crypcocurrency": list(self.social_volatility),
+                "social_volatility": list(self.social_volatility.values()),
+            }
+        )
+
+
+class SocialVolatilityStream:
+    """Keep each coin's social volatility up to date as events arrive.
+
+    A coin's volatility is the standard deviation of its last
+    `volatility_window` minutely log returns, scaled by the square root of
+    the window, like ``calculate_financial_volatility``. Its social
+    volatility correlates the tweets of the last `correlation_window`
+    minutes with the volatility of their minute. Tweets more than
+    `max_delay` minutes older than their coin's latest candle, or than the
+    clock while they wait for their candle, are dropped.
+
+    Events are expected in time order. Each time the clock passes a
+    minute, a ranking of the finished minute is passed to `subscribers`.
+    """
+
+    def __init__(
+        self,
+        volatility_window: int = 2,
+        correlation_window: int = 24 * 60,
+        max_delay: int = 5,
+        subscribers: list[Callable[[Ranking], None]] | None = None,
+    ):
+        self.volatility_window = volatility_window
+        self.correlation_window = correlation_window
+        self.max_delay = max_delay
+        self.subscribers = subscribers or []
+        self.coins: dict[str, CoinState] = {}
+        self.minute: int | None = None
+
+    def on_candle(self, coin: str, time: float, price: float) -> list:
+        """Add a coin's price at the start of a minute."""
+        rankings = self._advance(time)
+        state = self.coins.setdefault(coin, CoinState())
+        minute = int(time) // MINUTE * MINUTE
+
+        state.last_minute = minute
+        if price > 0:
+            log_return = math.log(price / state.last_price)
+            state.last_price = price
+        else:
+            # No return can be taken to or from a price that isn't
+            # positive, so the window starts over after it.
+            log_return = math.nan
+            state.last_price = math.nan
+            state.returns.clear()
+            state.return_moments = RollingMoments()
+        if not math.isnan(log_return):
+            state.returns.append(log_return)
+            state.return_moments.add(log_return)
+            if len(state.returns) > self.volatility_window:
+                state.return_moments.remove(state.returns.popleft())
+        volatility = (
+            state.return_moments.std() * math.sqrt(self.volatility_window)
+            if len(state.returns) == self.volatility_window
+            else math.nan
+        )
+
+        state.volatilities[minute] = volatility
+        for old_minute in list(state.volatilities):
+            if old_minute < minute - self.max_delay * MINUTE:
+                del state.volatilities[old_minute]
+        for sentiment in state.pending.pop(minute, []):
+            self._pair(state, minute, volatility, sentiment)
+        for old_minute in list(state.pending):
+            if old_minute < minute:
+                # Their minute has no candle.
+                del state.pending[old_minute]
+        return rankings
+
+    def on_tweet(self, coin: str, time: float, sentiment: float) -> list:
+        """Add the sentiment of a tweet mentioning a coin."""
+        rankings = self._advance(time)
+        if sentiment is None or math.isnan(sentiment):
+            return rankings
+        state = self.coins.setdefault(coin, CoinState())
+        minute = int(time) // MINUTE * MINUTE
+
+        if minute in state.volatilities:
+            self._pair(state, minute, state.volatilities[minute], sentiment)
+        elif state.last_minute is None or minute > state.last_minute:
+            state.pending.setdefault(minute, []).append(sentiment)
+        return rankings
+
+    def _pair(
+        self, state: CoinState, minute: int, volatility: float, sentiment
+    ):
+        """Add a tweet and its minute's volatility to the correlation."""
+        if math.isnan(volatility):
+            return
+        state.pairs.append((minute, volatility, sentiment))
+        state.correlation.add(volatility, sentiment)
+        self._evict(state)
+
+    def _evict(self, state: CoinState):
+        """Remove the pairs that are out of the correlation window."""
+        if self.minute is None:
+            return
+        start = self.minute - self.correlation_window * MINUTE
+        while state.pairs and state.pairs[0][0] < start:
+            _, volatility, sentiment = state.pairs.popleft()
+            state.correlation.remove(volatility, sentiment)
+
+    def _expire(self, state: CoinState):
+        """Drop the tweets whose candle is too late to come."""
+        start = self.minute - self.max_delay * MINUTE
+        for old_minute in list(state.pending):
+            if old_minute < start:
+                del state.pending[old_minute]
+
+    def _advance(self, time: float) -> list[Ranking]:
+        """Move the clock forward, publishing the minute that finished."""
+        minute = int(time) // MINUTE * MINUTE
+        if self.minute is None:
+            self.minute = minute
+        if minute <= self.minute:
+            return []
+
+        ranking = self.ranking()
+        self.minute = minute
+        for state in self.coins.values():
+            self._evict(state)
+            self._expire(state)
+        for subscriber in self.subscribers:
+            subscriber(ranking)
+        return [ranking]
+
+    def ranking(self) -> Ranking:
+        """Rank the coins by their current social volatility."""
+        social_volatility = {
+            coin: abs(state.correlation.correlation())
+            for coin, state in self.coins.items()
+        }
+        return Ranking(
+            pd.Timestamp(self.minute, unit="s"),
+            dict(
+                sorted(
+                    (
+                        (coin, value)
+                        for coin, value in social_volatility.items()
+                        if not math.isnan(value)
+                    ),
+                    key=lambda item: item[1],
+                    reverse=True,
+                )
+            ),
+        )
+
+    def replay(self, events: Iterable[tuple]) -> Iterator[Ranking]:
+        """Feed (time, kind, coin, value) events, yielding each ranking.
+
+        `kind` is either "candle", with the price as the value, or "tweet",
+        with the sentiment as the value.
+        """
+        handlers = {"candle": self.on_candle, "tweet": self.on_tweet}
+        for time, kind, coin, value in events:
+            yield from handlers[kind](coin, time, value)
+
+
+def read_feed(path: str) -> Iterator[tuple]:
+    """Read (time, kind, coin, value) events from a csv file, in order.
+
+    Times are either epoch seconds or dates, e.g., "2022-03-05 10:00:00".
+    The file is read one row at a time.
+    """
+    with open(path, newline="", encoding="utf-8") as feed:
+        for row in csv.DictReader(feed):
+            try:
+                time = float(row["time"])
+            except ValueError:
+                time = pd.Timestamp(row["time"]).timestamp()
+            yield time, row["kind"], row["coin"], float(row["value"])
+
+
+def frame_events(
+    prices: dict[str, DataFrame], tweets: dict[str, DataFrame]
+) -> Iterator[tuple]:
+    """Merge the prices and tweets of each coin into one ordered feed.
+
+    Prices have "time" and "price" columns and tweets have "time" and
+    "sentiment" columns, with times as datetimes.
+    """
+
+    def events(frame: DataFrame, kind: str, coin: str, column: str):
+        times = epoch_seconds(frame["time"]).to_numpy()
+        values = frame[column].to_numpy(dtype=float)
+        order = np.argsort(times, kind="stable")
+        for time, value in zip(times[order], values[order]):
+            # Candles come before the tweets of their minute.
+            yield int(time), kind == "tweet", kind, coin, float(value)
+
+    merged = heapq.merge(
+        *(
+            events(frame, "candle", coin, "price")
+            for coin, frame in prices.items()
+        ),
+        *(
+            events(frame, "tweet", coin, "sentiment")
+            for coin, frame in tweets.items()
+        ),
+    )
+    for time, _, kind, coin, value in merged:
+        yield time, kind, coin, value
@@ -0,0 +1,6 @@
+"""Make the modules of `src` importable from the tests."""
+
+import sys
+from os.path import dirname, join, realpath
+
+sys.path.insert(0, join(dirname(dirname(realpath(__file__))), "src"))
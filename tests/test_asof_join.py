@@ -0,0 +1,48 @@
+"""Tests of joining tweets to the candles of their minute."""
+
+import numpy as np
+import pandas as pd
+
+from asof_join import attach_candles
+
+
+def test_joins_the_same_pairs_as_merging_on_the_minute():
+    rng = np.random.default_rng(0)
+    minutes = pd.date_range("2022-03-05", periods=60, freq="min")
+    # Some minutes have no candle, so their tweets have none either.
+    candles = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "time": minutes[rng.random(len(minutes)) < 0.7],
+                    "cryptocurrency": coin,
+                }
+            )
+            for coin in ["BTC", "ETH"]
+        ],
+        ignore_index=True,
+    )
+    candles["price"] = rng.random(len(candles))
+    tweets = pd.DataFrame(
+        {
+            "time": minutes[0]
+            + pd.to_timedelta(rng.integers(0, 60 * 60, 500), unit="s"),
+            "cryptocurrency": rng.choice(["BTC", "ETH"], 500),
+        }
+    )
+    # Tweets sent right as a minute starts.
+    tweets.loc[:50, "time"] = tweets.loc[:50, "time"].dt.floor("min")
+
+    joined = attach_candles(tweets, candles, ["price"])
+    expected = tweets.assign(minute=tweets["time"].dt.floor("min")).merge(
+        candles.rename(columns={"time": "minute"}),
+        on=["minute", "cryptocurrency"],
+        how="left",
+    )
+    pd.testing.assert_frame_equal(
+        joined.sort_values(["time", "cryptocurrency"]).reset_index(drop=True),
+        expected.drop(columns="minute")
+        .sort_values(["time", "cryptocurrency"])
+        .reset_index(drop=True),
+        check_like=True,
+    )
@@ -0,0 +1,79 @@
+"""Tests of the catalog of saved datasets."""
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from catalog import CRYPTO_DIR, TWITTER_DIR, Catalog
+
+START = int(pd.Timestamp("2022-03-05", tz="UTC").timestamp())
+
+
+def write_candles(data_dir, name, step, count):
+    times = START + step * pd.RangeIndex(count)
+    pd.DataFrame({"time": times, "open": range(count)}).to_parquet(
+        data_dir / CRYPTO_DIR / name, index=False
+    )
+
+
+@pytest.fixture(name="new_session")
+def fixture_new_session(monkeypatch):
+    """Forget the catalogs loaded so far, as a new process would."""
+
+    def forget():
+        monkeypatch.setattr(Catalog, "_loaded", {})
+
+    forget()
+    return forget
+
+
+def test_load_indexes_datasets_added_after_the_index(tmp_path, new_session):
+    (tmp_path / CRYPTO_DIR).mkdir(parents=True)
+    (tmp_path / TWITTER_DIR).mkdir(parents=True)
+    write_candles(tmp_path, "btc_2022_03_05-2022_03_06_minute.parquet", 60, 3)
+    assert len(Catalog.load(str(tmp_path)).entries) == 1
+
+    write_candles(tmp_path, "btc_hour.parquet", 60 * 60, 24)
+    new_session()
+    catalog = Catalog.load(str(tmp_path))
+    assert len(catalog.entries) == 2
+    prices = catalog.load_prices(
+        "BTC", datetime(2022, 3, 5), datetime(2022, 3, 6), granularity="hour"
+    )
+    assert len(prices) == 24
+
+
+def test_load_forgets_removed_datasets(tmp_path, new_session):
+    (tmp_path / CRYPTO_DIR).mkdir(parents=True)
+    (tmp_path / TWITTER_DIR).mkdir(parents=True)
+    write_candles(tmp_path, "btc_hour.parquet", 60 * 60, 24)
+    Catalog.load(str(tmp_path))
+
+    (tmp_path / CRYPTO_DIR / "btc_hour.parquet").unlink()
+    new_session()
+    assert Catalog.load(str(tmp_path)).entries == []
+
+
+def test_datasets_are_checked_once_per_session(
+    tmp_path, new_session, monkeypatch
+):
+    (tmp_path / CRYPTO_DIR).mkdir(parents=True)
+    (tmp_path / TWITTER_DIR).mkdir(parents=True)
+    write_candles(tmp_path, "btc_hour.parquet", 60 * 60, 24)
+    Catalog.load(str(tmp_path))
+    new_session()
+    checks = []
+    is_stale = Catalog.is_stale
+    monkeypatch.setattr(
+        Catalog, "is_stale", lambda self: checks.append(1) or is_stale(self)
+    )
+
+    catalog = Catalog.load(str(tmp_path))
+    assert Catalog.load(str(tmp_path)) is catalog
+    assert len(checks) == 1
+
+    # Writers refresh the catalog they loaded.
+    write_candles(tmp_path, "btc_2022_03_05-2022_03_06_minute.parquet", 60, 3)
+    catalog.refresh()
+    assert len(Catalog.load(str(tmp_path)).entries) == 2
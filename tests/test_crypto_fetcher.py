@@ -0,0 +1,145 @@
+"""Tests of fetching candles, against a local stub of the API."""
+
+import json
+import threading
+import time
+from datetime import datetime
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from catalog import CRYPTO_DIR, TWITTER_DIR, Catalog
+from crypto_fetcher import (
+    MAX_LIMIT,
+    FetchError,
+    FetcherConfig,
+    fetch_crypto_datasets,
+    retry_after,
+    sync_crypto_datasets,
+)
+from storage import read_table
+
+STEPS = {"histominute": 60, "histohour": 60 * 60}
+
+
+class StubAPI(BaseHTTPRequestHandler):
+    """Serve candles whose prices are their times."""
+
+    # Responses to give before the candles, e.g., errors, as
+    # (status, headers, body).
+    failures: list = []
+    requests: list = []
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.requests.append(self.path)
+        if self.failures:
+            status, headers, body = self.failures.pop(0)
+        else:
+            url = urlparse(self.path)
+            step = STEPS[url.path.rsplit("/", 1)[-1]]
+            query = parse_qs(url.query)
+            to_ts = int(query["toTs"][0])
+            limit = int(query["limit"][0])
+            candles = [
+                {"time": time, "open": time, "close": time}
+                for time in range(to_ts - limit * step, to_ts + 1, step)
+            ]
+            status, headers = 200, {}
+            body = {"Response": "Success", "Data": {"Data": candles}}
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(name="config")
+def fixture_config():
+    StubAPI.failures = []
+    StubAPI.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAPI)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield FetcherConfig(
+        base_url=f"http://127.0.0.1:{server.server_port}",
+        api_key="",
+        backoff=0.01,
+    )
+    server.shutdown()
+
+
+def test_synced_prices_are_loaded_by_the_catalog(tmp_path, config):
+    (tmp_path / CRYPTO_DIR).mkdir(parents=True)
+    (tmp_path / TWITTER_DIR).mkdir(parents=True)
+    catalog = Catalog.load(str(tmp_path))
+    start, end = datetime(2022, 3, 5), datetime(2022, 3, 6)
+
+    added = sync_crypto_datasets(
+        ["BTC"],
+        start,
+        end,
+        str(tmp_path / CRYPTO_DIR),
+        config=config,
+        catalog=catalog,
+    )
+    assert added == {"BTC": 25}
+    prices = catalog.load_prices("BTC", start, end, granularity="hour")
+    assert len(prices) == 24
+    assert (prices["open"] == prices["time"]).all()
+
+
+def test_ranges_beyond_a_call_are_fetched_in_pages(tmp_path, config):
+    start, end = datetime(2022, 3, 5), datetime(2022, 3, 7)
+    paths = fetch_crypto_datasets(
+        ["BTC", "ETH"], start, end, str(tmp_path), config, granularity="minute"
+    )
+
+    # Two days of minutes, and the minute at the end.
+    assert len(StubAPI.requests) == 2 * -(-(2 * 24 * 60 + 1) // MAX_LIMIT)
+    for path in paths.values():
+        candles = read_table(path)
+        assert len(candles) == 2 * 24 * 60 + 1
+        assert candles["time"].is_monotonic_increasing
+        assert candles["time"].diff().dropna().eq(60).all()
+
+
+def test_rate_limits_are_retried_after_the_given_date(tmp_path, config):
+    StubAPI.failures = [
+        (429, {"Retry-After": formatdate(time.time(), usegmt=True)}, {}),
+        (503, {"Retry-After": "0"}, {}),
+    ]
+    fetch_crypto_datasets(
+        ["BTC"],
+        datetime(2022, 3, 5),
+        datetime(2022, 3, 6),
+        str(tmp_path),
+        config,
+    )
+    assert len(StubAPI.requests) == 3
+
+
+def test_client_errors_are_not_retried(tmp_path, config):
+    StubAPI.failures = [(400, {}, {})]
+    with pytest.raises(FetchError):
+        fetch_crypto_datasets(
+            ["BTC"],
+            datetime(2022, 3, 5),
+            datetime(2022, 3, 6),
+            str(tmp_path),
+            config,
+        )
+    assert len(StubAPI.requests) == 1
+
+
+def test_retry_after_is_seconds_or_a_date():
+    assert retry_after("2.5", 1) == 2.5
+    assert retry_after(None, 1) == 1
+    assert retry_after("soon", 1) == 1
+    assert retry_after(formatdate(time.time() - 60, usegmt=True), 1) == 0
+    later = retry_after(formatdate(time.time() + 60, usegmt=True), 1)
+    assert 55 < later <= 60
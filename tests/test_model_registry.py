@@ -0,0 +1,99 @@
+"""Tests of versioning trained models in the registry."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+from pandas import DataFrame
+
+from model_registry import (
+    META_FILENAME,
+    ModelRegistry,
+    ModelVersion,
+    dataset_fingerprint,
+)
+from scaler import ZScoreScaler
+
+
+@pytest.fixture(name="model_path")
+def fixture_model_path(tmp_path):
+    path = tmp_path / "trained.keras"
+    path.write_bytes(b"weights")
+    return str(path)
+
+
+def test_versions_are_numbered_per_coin_and_kind(tmp_path, model_path):
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    assert registry.latest("bitcoin", "sentiment") is None
+
+    first = registry.register("bitcoin", "sentiment", model_path, "a", 10, 5)
+    second = registry.register(
+        "bitcoin", "sentiment", model_path, "b", 20, 3, parent=first.version
+    )
+    other = registry.register("bitcoin", "price", model_path, "c", 10, 5)
+
+    assert (first.version, second.version, other.version) == (1, 2, 1)
+    assert registry.latest("bitcoin", "sentiment") == second
+    assert registry.get("bitcoin", "sentiment", 1) == first
+    assert registry.get("bitcoin", "sentiment").parent == 1
+    assert [
+        version.fingerprint
+        for version in registry.versions("bitcoin", "sentiment")
+    ] == ["a", "b"]
+    with open(second.model_path, "rb") as file:
+        assert file.read() == b"weights"
+    with pytest.raises(KeyError):
+        registry.get("bitcoin", "sentiment", 3)
+
+
+def test_half_saved_versions_are_ignored_then_replaced(tmp_path, model_path):
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    registry.register("doge", "sentiment", model_path, "a", 10, 5)
+    # A version whose meta.json was never written.
+    half_saved = os.path.join(registry.model_dir("doge", "sentiment"), "v0002")
+    os.makedirs(half_saved)
+    with open(os.path.join(half_saved, "leftover"), "w", encoding="utf-8"):
+        pass
+
+    assert registry.latest("doge", "sentiment").version == 1
+    version = registry.register("doge", "sentiment", model_path, "b", 10, 5)
+
+    assert version.version == 2
+    assert sorted(os.listdir(half_saved)) == [
+        META_FILENAME,
+        "model.keras",
+    ]
+
+
+def test_versions_keep_their_scaler(tmp_path, model_path):
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    scaler = ZScoreScaler().fit(DataFrame({"x": [1.0, 2.0, 4.0]}))
+    registry.register("solana", "sentiment", model_path, "a", 3, 1, scaler)
+    registry.register("solana", "price", model_path, "a", 3, 1)
+
+    loaded = registry.latest("solana", "sentiment").scaler
+    assert loaded.columns == ["x"]
+    np.testing.assert_allclose(loaded.mean, scaler.mean)
+    assert registry.latest("solana", "price").scaler is None
+
+
+def test_meta_round_trips(tmp_path, model_path):
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    version = registry.register("avalanche", "price", model_path, "f", 7, 2)
+    with open(
+        os.path.join(version.path, META_FILENAME), encoding="utf-8"
+    ) as file:
+        meta = json.load(file)
+
+    assert "path" not in meta
+    assert ModelVersion(**meta, path=version.path) == version
+
+
+def test_fingerprints_change_with_values_and_shapes():
+    x = np.arange(6, dtype=float).reshape(3, 2)
+    y = np.ones(3)
+
+    assert dataset_fingerprint(x, y) == dataset_fingerprint(x.copy(), y)
+    assert dataset_fingerprint(x, y) != dataset_fingerprint(x, y * 2)
+    assert dataset_fingerprint(x, y) != dataset_fingerprint(x.reshape(2, 3), y)
@@ -0,0 +1,111 @@
+"""Tests of running the pipeline's stages."""
+
+import subprocess
+import sys
+
+import pytest
+
+from pipeline import SRC_DIR, Pipeline, Stage
+
+# A script like predictor.py, training in a spawned pool of workers.
+SPAWNING_SCRIPT = """
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+
+def square(x):
+    return x * x
+
+
+if __name__ == "__main__":
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(2, mp_context=context) as executor:
+        squares = list(executor.map(square, range(4)))
+    with open(sys.argv[0] + ".out", "w") as file:
+        file.write(str(squares))
+"""
+
+
+def test_stage_with_spawned_workers_runs_then_skips(tmp_path):
+    script = tmp_path / "train.py"
+    script.write_text(SPAWNING_SCRIPT)
+    stage = Stage("train", str(script), outputs=[f"{script}.out"])
+    pipeline = Pipeline([stage], state_path=str(tmp_path / "state.json"))
+
+    assert pipeline.run() == {"train": "ran"}
+    assert (tmp_path / "train.py.out").read_text() == "[0, 1, 4, 9]"
+    assert pipeline.run() == {"train": "skipped"}
+
+
+def test_model_stage_script_does_nothing_when_imported_by_workers():
+    # Spawned training workers import predictor.py as __mp_main__.
+    pytest.importorskip("tensorflow")
+    pytest.importorskip("keras")
+    check = (
+        "import os, runpy\n"
+        "cwd = os.getcwd()\n"
+        "names = runpy.run_path('predictor.py', run_name='__mp_main__')\n"
+        "assert os.getcwd() == cwd\n"
+        "assert 'sentiment_models' not in names\n"
+        "assert 'CATALOG' not in names\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", check], cwd=SRC_DIR, check=True, timeout=300
+    )
+
+
+def test_sentiment_stage_script_does_nothing_when_imported_by_workers():
+    # Spawned cleaning and scoring workers import the script as __mp_main__.
+    pytest.importorskip("nltk")
+    pytest.importorskip("textblob")
+    check = (
+        "import runpy\n"
+        "names = runpy.run_path("
+        "'sentiment_analysis.py', run_name='__mp_main__')\n"
+        "assert 'data' not in names\n"
+        "assert 'text_data' not in names\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", check], cwd=SRC_DIR, check=True, timeout=300
+    )
+
+
+def test_stage_modules_are_read_from_imports(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_text(
+        "import numpy\n"
+        "from crypto_fetcher import run\n"
+        "\n"
+        "def load():\n"
+        "    import storage\n"
+    )
+    # crypto_fetcher imports catalog, which imports storage.
+    assert Stage("script", str(script)).modules == [
+        "catalog.py",
+        "crypto_fetcher.py",
+        "storage.py",
+    ]
+
+
+def test_pattern_inputs_ignore_other_datasets_in_the_folder(tmp_path):
+    (tmp_path / "tweets_week.csv").write_text("text\nhodl\n")
+    script = tmp_path / "features.py"
+    script.write_text("import sys\nopen(sys.argv[0] + '.out', 'w').close()\n")
+    stage = Stage(
+        "features",
+        str(script),
+        inputs=[f"{tmp_path}/tweets_*"],
+        outputs=[f"{script}.out"],
+    )
+    writer = Stage("sentiment", "writer.py", outputs=[f"{tmp_path}/tweets_x"])
+    pipeline = Pipeline([stage], state_path=str(tmp_path / "state.json"))
+    dependencies = Pipeline([stage, writer], state_path=pipeline.state_path)
+    assert dependencies.dependencies(stage) == {"sentiment"}
+
+    assert pipeline.run() == {"features": "ran"}
+    # Datasets of other stages saved in the same folder.
+    (tmp_path / "sentiment_bars_min.csv").write_text("time\n0\n")
+    assert pipeline.run() == {"features": "skipped"}
+    (tmp_path / "tweets_next_week.csv").write_text("text\nwagmi\n")
+    assert pipeline.run() == {"features": "ran"}
@@ -0,0 +1,100 @@
+"""Tests of building the predictor's datasets."""
+
+import runpy
+from datetime import datetime
+from os.path import join
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas import DataFrame
+
+from pipeline import SRC_DIR
+from storage import table_path, write_table
+from tweet_features import update_feature_store
+
+pytest.importorskip("tensorflow")
+pytest.importorskip("keras")
+
+START = pd.Timestamp("2022-03-05")
+
+
+class HourlyPrices:
+    """A stand-in for the catalog, pricing each hour at its hours since 3/5."""
+
+    def load_prices(self, ticker, start, end, granularity, columns):
+        assert (ticker, granularity, columns) == ("BTC", "hour", ["open"])
+        hours = pd.date_range(start, end, freq="h", inclusive="left")
+        return DataFrame(
+            {
+                "time": (hours - pd.Timestamp(0)) // pd.Timedelta(seconds=1),
+                "open": (hours - START) / pd.Timedelta(hours=1),
+            }
+        )
+
+
+@pytest.fixture(name="predictor")
+def fixture_predictor(tmp_path, monkeypatch):
+    twitter_dir = tmp_path / "data" / "processed" / "twitter"
+    twitter_dir.mkdir(parents=True)
+    tweets = DataFrame(
+        {
+            # Times within the hour, one of them rounded up to the next.
+            "created_at": [
+                "2022-03-05 01:12:34+00:00",
+                "2022-03-05 02:47:05+00:00",
+                "2022-03-05 05:00:59+00:00",
+            ],
+            "name": ["a", "b", "c"],
+            "text": ["up\r\nonly", "down", "flat"],
+            "retweet_count": [1, 10, 100],
+            "favorite_count": [2, 20, 200],
+            "followers_count": [3, 30, 300],
+            "vader_sentiment_compound": [0.5, -0.5, 0.0],
+        }
+    )
+    write_table(tweets, table_path(str(twitter_dir / "bitcoin_sentiment")))
+    features = update_feature_store(str(twitter_dir), tweets)
+
+    monkeypatch.chdir(tmp_path)
+    names = runpy.run_path(
+        join(SRC_DIR, "predictor.py"), run_name="__mp_main__"
+    )
+    namespace = names["get_dataset"].__globals__
+    namespace["CATALOG"] = HourlyPrices()
+    namespace["TWEET_FEATURES"] = features.set_index("tweet_key")[
+        ["authority"]
+    ]
+    return namespace, features
+
+
+def test_get_dataset_joins_features_of_sub_hour_tweets(predictor):
+    namespace, features = predictor
+    twitter_df, X, y = namespace["get_dataset"](
+        "bitcoin", "03", "05", "03", "06"
+    )
+
+    assert twitter_df["created_at"].tolist() == [
+        datetime(2022, 3, 5, 1),
+        datetime(2022, 3, 5, 3),
+        datetime(2022, 3, 5, 5),
+    ]
+    np.testing.assert_allclose(X["authority"], features["authority"])
+    assert X["price"].tolist() == [1.0, 3.0, 5.0]
+    assert y["price_23hours"].tolist() == [24.0, 26.0, 28.0]
+
+
+def test_get_datasets_keeps_tweets_once_and_before_the_end(predictor):
+    namespace, _ = predictor
+    intervals = [("03", "05", "03", "06"), ("03", "05", "03", "07")]
+    get_datasets = namespace["get_datasets"]
+
+    twitter_df, X, y = get_datasets("bitcoin", intervals)
+    assert len(twitter_df) == len(X) == len(y) == 3
+
+    # Only the first tweet's prices end before 2 am the next day.
+    twitter_df, X, y = get_datasets(
+        "bitcoin", intervals, end=datetime(2022, 3, 6, 2)
+    )
+    assert twitter_df["created_at"].tolist() == [datetime(2022, 3, 5, 1)]
+    assert len(X) == len(y) == 1
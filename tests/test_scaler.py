@@ -0,0 +1,66 @@
+"""Tests of fitting z-score statistics chunk by chunk."""
+
+import numpy as np
+import pytest
+from pandas import DataFrame
+
+from scaler import ZScoreScaler
+
+
+@pytest.fixture(name="frame")
+def fixture_frame():
+    rng = np.random.default_rng(3)
+    frame = DataFrame(
+        {
+            "price": rng.normal(50_000, 2_000, 500),
+            "sentiment": rng.normal(0, 0.3, 500),
+            "constant": np.full(500, 7.0),
+        }
+    )
+    frame.loc[rng.choice(500, 50, replace=False), "sentiment"] = np.nan
+    return frame
+
+
+def test_fitting_chunks_matches_fitting_everything(frame):
+    chunks = [frame.iloc[:1], frame.iloc[1:120], frame.iloc[120:]]
+    scaler = ZScoreScaler().fit(iter(chunks))
+
+    np.testing.assert_allclose(scaler.mean, frame.mean(), rtol=1e-12)
+    np.testing.assert_allclose(scaler.std[:2], frame.std()[:2], rtol=1e-12)
+    assert scaler.count.tolist() == frame.count().tolist()
+
+
+def test_transform_scales_like_pandas_and_round_trips(frame):
+    scaler = ZScoreScaler(["price", "sentiment", "constant"]).fit(frame)
+    scaled = scaler.transform(frame)
+
+    expected = (
+        frame[["price", "sentiment"]] - frame.mean()[:2]
+    ) / frame.std()[:2]
+    np.testing.assert_allclose(
+        scaled[["price", "sentiment"]], expected, rtol=1e-9
+    )
+    # A column without spread is only centered.
+    assert (scaled["constant"] == 0).all()
+    assert scaled["sentiment"].isna().sum() == 50
+    np.testing.assert_allclose(
+        scaler.inverse_transform(scaled), frame, rtol=1e-12
+    )
+
+
+def test_saved_statistics_load_back(frame, tmp_path):
+    scaler = ZScoreScaler().fit(frame)
+    path = tmp_path / "scaler.json"
+    scaler.save(str(path))
+    loaded = ZScoreScaler.load(str(path))
+
+    assert loaded.columns == scaler.columns
+    np.testing.assert_array_equal(loaded.count, scaler.count)
+    np.testing.assert_allclose(
+        loaded.transform(frame), scaler.transform(frame)
+    )
+
+
+def test_fitting_nothing_fails():
+    with pytest.raises(ValueError):
+        ZScoreScaler().fit([])
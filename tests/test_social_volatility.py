@@ -0,0 +1,84 @@
+"""Tests of ranking social volatility over windows and lags."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas import DataFrame
+
+from social_volatility import rank_social_volatility
+
+START = pd.Timestamp("2022-04-05")
+LAGS = [0, 1, 5, 30]
+
+
+@pytest.fixture(name="data")
+def fixture_data():
+    rng = np.random.default_rng(2)
+    minutes = pd.date_range(START, periods=300, freq="min")
+    columns = pd.MultiIndex.from_product(
+        [["close_to_close", "parkinson"], ["5min", "1h"], ["BTC", "ETH"]],
+        names=["estimator", "window", "coin"],
+    )
+    volatilities = DataFrame(
+        rng.normal(size=(len(minutes), len(columns))),
+        index=minutes,
+        columns=columns,
+    )
+    volatilities.iloc[:10] = np.nan
+    count = 1000
+    sentiment = DataFrame(
+        {
+            "time": START
+            + pd.to_timedelta(rng.integers(0, 300 * 60, count), unit="s"),
+            "cryptocurrency": rng.choice(["BTC", "ETH"], count),
+            "sentiment": rng.normal(size=count),
+        }
+    )
+    # Sentiment that leads the volatility of BTC by five minutes.
+    btc = sentiment["cryptocurrency"] == "BTC"
+    lead = sentiment["time"].dt.floor("min") + pd.Timedelta(minutes=5)
+    led = volatilities[("close_to_close", "1h", "BTC")].reindex(lead)
+    sentiment.loc[btc, "sentiment"] += 3 * np.nan_to_num(
+        led.to_numpy()[btc.to_numpy()]
+    )
+    return volatilities, sentiment
+
+
+def test_rank_social_volatility_matches_series_corr(data):
+    volatilities, sentiment = data
+    ranking = rank_social_volatility(volatilities, sentiment, lags=LAGS)
+
+    assert len(ranking) == len(volatilities.columns) * len(LAGS)
+    for _, row in ranking.iterrows():
+        coin = row["cryptocurrency"]
+        tweets = sentiment[sentiment["cryptocurrency"] == coin]
+        later = tweets["time"].dt.floor("min") + pd.Timedelta(
+            minutes=int(row["lag"])
+        )
+        volatility = (
+            volatilities[(row["estimator"], row["window"], coin)]
+            .reindex(later)
+            .to_numpy()
+        )
+        expected = pd.Series(volatility).corr(
+            pd.Series(tweets["sentiment"].to_numpy())
+        )
+        assert row["correlation"] == pytest.approx(expected, rel=1e-9)
+        assert row["pairs"] == np.count_nonzero(~np.isnan(volatility))
+
+
+def test_rank_social_volatility_ranks_the_leading_lag_first(data):
+    volatilities, sentiment = data
+    ranking = rank_social_volatility(volatilities, sentiment, lags=LAGS)
+
+    best = ranking.iloc[0]
+    assert (best["cryptocurrency"], best["estimator"], best["window"]) == (
+        "BTC",
+        "close_to_close",
+        "1h",
+    )
+    assert best["lag"] == 5
+    assert ranking["social_volatility"].is_monotonic_decreasing
+    assert best["adjusted_p_value"] == pytest.approx(
+        min(best["p_value"] * 4 * len(LAGS), 1)
+    )
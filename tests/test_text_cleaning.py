@@ -0,0 +1,50 @@
+"""Tests of cleaning tweet text into tokens."""
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("nltk")
+
+# pylint: disable=wrong-import-position
+import text_cleaning
+from text_cleaning import clean_csv, clean_tweet
+
+
+@pytest.fixture(autouse=True)
+def no_corpora(monkeypatch):
+    """Clean without the nltk corpora, which are downloaded separately."""
+    monkeypatch.setattr(
+        text_cleaning, "get_stopwords", lambda: frozenset({"the", "to"})
+    )
+    monkeypatch.setattr(text_cleaning, "lemmatize", lambda word: word)
+
+
+def test_clean_tweet_keeps_hashtags_and_mentions():
+    assert clean_tweet("  #BTC to the moon, @elonmusk! ") == [
+        "#btc",
+        "moon",
+        "@elonmusk",
+    ]
+
+
+def test_clean_tweet_drops_empty_tokens():
+    assert clean_tweet("...") == []
+    assert clean_tweet("—wow—") == ["wow"]
+
+
+def test_clean_csv_keeps_the_columns(tmp_path):
+    input_path = tmp_path / "tweets.csv"
+    output_path = tmp_path / "clean.csv"
+    pd.DataFrame({"id": [1, 2, 3], "text": ["a b", "#c", "d!"]}).to_csv(
+        input_path, index=False
+    )
+
+    clean_csv(str(input_path), str(output_path), chunk_size=2, processes=1)
+
+    cleaned = pd.read_csv(output_path)
+    assert list(cleaned.columns) == ["id", "text", "clean_text"]
+    assert cleaned["clean_text"].tolist() == [
+        "['a', 'b']",
+        "['#c']",
+        "['d']",
+    ]
@@ -0,0 +1,46 @@
+"""Tests of training models against the model registry."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("tensorflow")
+pytest.importorskip("keras")
+
+# pylint: disable=wrong-import-position
+import models
+from model_registry import ModelRegistry, dataset_fingerprint
+from scaler import ZScoreScaler
+from training import TrainingConfig, train_models
+
+
+def test_unchanged_data_reuses_the_registered_model_and_scaler(tmp_path):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(20, 3)), columns=["a", "b", "c"])
+    y = rng.normal(size=(20, 23))
+    model_path = str(tmp_path / "model.keras")
+    models.make_model(3).save(model_path)
+
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    registered_scaler = ZScoreScaler().fit(X.iloc[:10])
+    registry.register(
+        "bitcoin",
+        "sentiment",
+        model_path,
+        dataset_fingerprint(X, y),
+        rows=len(y),
+        epochs=1,
+        scaler=registered_scaler,
+    )
+
+    results = train_models(
+        {"bitcoin": (X, y)},
+        "sentiment",
+        TrainingConfig(checkpoint_dir=str(tmp_path)),
+        scalers={"bitcoin": ZScoreScaler().fit(X)},
+        registry=registry,
+    )
+    _, history, scaler = results["bitcoin"]
+    assert history == {}
+    np.testing.assert_allclose(scaler.mean, registered_scaler.mean)
+    assert len(registry.versions("bitcoin", "sentiment")) == 1
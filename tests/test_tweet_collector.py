@@ -0,0 +1,137 @@
+"""Tests of collecting tweets, against recorded search results."""
+
+import json
+from os.path import exists, join
+
+import pytest
+
+pytest.importorskip("twython")
+
+# pylint: disable=wrong-import-position
+from storage import read_partitions
+from tweet_collector import CHECKPOINT_FILENAME, MAX_COUNT, TweetCollector
+
+
+class RecordedTwython:
+    """A stand-in for `Twython` that answers searches from recorded tweets.
+
+    `statuses` maps each query to its tweets, which are filtered and paged
+    like the search API does, newest first. `on_search` is called before
+    each search is answered.
+    """
+
+    def __init__(self, statuses: dict[str, list[dict]], on_search=None):
+        self.statuses = {
+            query: sorted(tweets, key=lambda tweet: tweet["id"], reverse=True)
+            for query, tweets in statuses.items()
+        }
+        self.on_search = on_search
+        self.calls: list[dict] = []
+
+    def search(self, q: str, count: int = 15, **params) -> dict:
+        """Get a page of a query's tweets, like `Twython.search`."""
+        if self.on_search is not None:
+            self.on_search()
+        self.calls.append({"q": q, "count": count, **params})
+        since_id = params.get("since_id")
+        max_id = params.get("max_id")
+        matches = [
+            tweet
+            for tweet in self.statuses.get(q, [])
+            if (since_id is None or tweet["id"] > since_id)
+            and (max_id is None or tweet["id"] <= max_id)
+        ]
+        return {"statuses": matches[:count]}
+
+
+def status(tweet_id: int) -> dict:
+    return {
+        "id": tweet_id,
+        "text": f"tweet {tweet_id}",
+        "retweet_count": 0,
+        "favorite_count": 0,
+        "created_at": "Tue Apr 05 12:00:00 +0000 2022",
+        "entities": {"hashtags": []},
+        "user": {
+            "followers_count": 10,
+            "verified": False,
+            "listed_count": 0,
+            "name": "someone",
+        },
+    }
+
+
+def saved_ids(collector: TweetCollector) -> list[int]:
+    if not collector.partitions:
+        return []
+    return list(
+        read_partitions(collector.data_dir, collector.partitions)["id"]
+    )
+
+
+def test_collect_pages_back_and_keeps_each_tweet_once(tmp_path):
+    statuses = {
+        "#a": [status(tweet_id) for tweet_id in range(1, 251)],
+        "#b": [status(tweet_id) for tweet_id in range(200, 301)],
+    }
+    client = RecordedTwython(statuses)
+    collector = TweetCollector(client, str(tmp_path), flush_size=120)
+
+    collector.collect(["#a", "#b"])
+
+    assert sorted(saved_ids(collector)) == list(range(1, 301))
+    assert [call.get("max_id") for call in client.calls[:4]] == [
+        None,
+        150,
+        50,
+        0,
+    ]
+    assert all(call["count"] == MAX_COUNT for call in client.calls)
+    checkpoints = json.loads((tmp_path / CHECKPOINT_FILENAME).read_text())
+    assert checkpoints["#a"] == {
+        "since_id": 250,
+        "max_id": None,
+        "newest_id": 250,
+    }
+    assert checkpoints["#b"]["since_id"] == 300
+
+
+def test_collect_resumes_after_the_last_collection(tmp_path):
+    statuses = {"#a": [status(tweet_id) for tweet_id in range(1, 51)]}
+    TweetCollector(RecordedTwython(statuses), str(tmp_path)).collect(["#a"])
+
+    statuses["#a"] += [status(tweet_id) for tweet_id in range(51, 61)]
+    client = RecordedTwython(statuses)
+    collector = TweetCollector(client, str(tmp_path))
+    new_partitions = collector.collect(["#a"])
+
+    assert client.calls[0]["since_id"] == 50
+    assert sorted(
+        read_partitions(str(tmp_path), new_partitions)["id"]
+    ) == list(range(51, 61))
+    assert sorted(saved_ids(collector)) == list(range(1, 61))
+
+
+def test_checkpoints_never_get_ahead_of_the_saved_tweets(tmp_path):
+    statuses = {"#a": [status(tweet_id) for tweet_id in range(1, 501)]}
+    checkpoint_path = join(tmp_path, CHECKPOINT_FILENAME)
+    collector = None
+
+    def check_saved_progress():
+        # What a collection killed at this search would resume from.
+        if collector is None or not exists(checkpoint_path):
+            return
+        with open(checkpoint_path, encoding="utf-8") as file:
+            checkpoint = json.load(file)["#a"]
+        if checkpoint["max_id"] is None:
+            return
+        newest = checkpoint["newest_id"]
+        collected = set(range(checkpoint["max_id"] + 1, newest + 1))
+        assert collected <= set(saved_ids(collector))
+
+    client = RecordedTwython(statuses, on_search=check_saved_progress)
+    collector = TweetCollector(client, str(tmp_path), flush_size=250)
+    collector.collect(["#a"])
+
+    assert len(client.calls) == 6
+    assert sorted(saved_ids(collector)) == list(range(1, 501))
@@ -0,0 +1,95 @@
+"""Tests of the store of tweet features."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scaler import ZScoreScaler
+from tweet_features import (
+    AUTHORITY_COLUMNS,
+    join_features,
+    load_features,
+    read_tweet_tables,
+    tweet_keys,
+    update_feature_store,
+)
+
+TWEETS = pd.DataFrame(
+    {
+        "created_at": ["2022-03-05 09:33:07+00:00", "2022-03-05 12:03:14"],
+        "name": ["alice", "bob"],
+        "text": ["to the\r\nmoon #btc", "hodl "],
+        "retweet_count": [3, 0],
+        "favorite_count": [10, 1],
+        "followers_count": [1000, 5],
+        "listed_count": [2, 0],
+        "verified": [True, False],
+    }
+)
+
+
+def test_keys_ignore_time_zones_and_line_endings():
+    other = TWEETS.assign(
+        created_at=["Sat Mar 05 09:33:07 +0000 2022", "2022-03-05 12:03:14"],
+        text=["to the\nmoon  #btc", "hodl"],
+    )
+    assert tweet_keys(other).tolist() == tweet_keys(TWEETS).tolist()
+
+
+def test_store_covers_every_dataset_of_tweets(tmp_path):
+    TWEETS.to_csv(tmp_path / "tweets_2022_03_05-2022_03_11.csv")
+    sentiment = pd.DataFrame(
+        {
+            "created_at": ["2022-04-05 21:11:32+00:00"],
+            "name": ["carol"],
+            "text": ["#doge"],
+            "followers_count": [20],
+            "vader_sentiment_compound": [0.5],
+        }
+    )
+    sentiment.to_csv(tmp_path / "doge_sentiment.csv", index=False)
+    pd.DataFrame({"tweet_id": [1], "BTC": [True]}).to_csv(
+        tmp_path / "coin_membership.csv", index=False
+    )
+
+    tweets = pd.concat(read_tweet_tables(str(tmp_path)), ignore_index=True)
+    update_feature_store(str(tmp_path), tweets)
+    # Tweets already in the store aren't added again.
+    features = update_feature_store(str(tmp_path), tweets)
+    assert len(features) == 3
+
+    store = load_features(str(tmp_path), ["authority", "influence"])
+    joined = join_features(sentiment, store, ["influence"])
+    assert joined["influence"].notna().all()
+    assert joined["influence"].iloc[0] == pytest.approx(np.log1p(20))
+
+
+def test_join_raises_or_fills_tweets_missing_from_store(tmp_path):
+    features = update_feature_store(str(tmp_path), TWEETS.iloc[:1])
+    store = features.set_index("tweet_key")
+    with pytest.raises(KeyError):
+        join_features(TWEETS, store, ["authority"])
+    joined = join_features(TWEETS, store, ["authority"], fill=0.0)
+    assert joined["authority"].tolist() == [0.0, 0.0]
+
+
+def test_stored_authority_never_changes(tmp_path):
+    first = update_feature_store(str(tmp_path), TWEETS.iloc[:1])
+    newer = pd.DataFrame(
+        {
+            "created_at": ["2022-03-12 08:00:00"],
+            "name": ["dave"],
+            "text": ["#eth"],
+            "retweet_count": [50],
+            "favorite_count": [500],
+            "followers_count": [99_000],
+        }
+    )
+    update_feature_store(str(tmp_path), TWEETS.iloc[1:])
+    features = update_feature_store(str(tmp_path), newer)
+
+    assert features["authority"].iloc[0] == first["authority"].iloc[0]
+    # New tweets are scored against every tweet stored so far.
+    counts = features[AUTHORITY_COLUMNS]
+    merged = ZScoreScaler().fit(counts).transform(counts).sum(axis=1)
+    assert features["authority"].iloc[-1] == pytest.approx(merged.iloc[-1])
@@ -0,0 +1,161 @@
+"""Tests of the streaming social volatility, against the batch one."""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas import DataFrame
+
+from asof_join import attach_candles
+from volatility_stream import (
+    MINUTE,
+    RollingCorrelation,
+    RollingMoments,
+    SocialVolatilityStream,
+    read_feed,
+)
+
+START = pd.Timestamp("2022-04-05")
+
+
+def test_rolling_stats_match_pandas():
+    rng = np.random.default_rng(0)
+    x = pd.Series(rng.normal(size=300))
+    y = pd.Series(0.5 * x + rng.normal(size=300))
+    window = 40
+    moments, correlation = RollingMoments(), RollingCorrelation()
+    stds, correlations = [], []
+    for i in range(len(x)):
+        moments.add(x[i])
+        correlation.add(x[i], y[i])
+        if i >= window:
+            moments.remove(x[i - window])
+            correlation.remove(x[i - window], y[i - window])
+        stds.append(moments.std())
+        correlations.append(correlation.correlation())
+
+    expected_std = x.rolling(window, min_periods=2).std()
+    expected_corr = x.rolling(window, min_periods=2).corr(y)
+    np.testing.assert_allclose(stds[1:], expected_std[1:], rtol=1e-9)
+    np.testing.assert_allclose(correlations[1:], expected_corr[1:], rtol=1e-9)
+
+
+def batch_social_volatility(
+    prices: DataFrame, tweets: DataFrame
+) -> dict[str, float]:
+    """Social volatility of each coin, like ``financial_volatility.py``."""
+    prices = prices.sort_values(["cryptocurrency", "time"])
+    returns = prices.groupby("cryptocurrency")["price"].transform(
+        lambda price: np.log(price.pct_change() + 1)
+    )
+    prices["minutely_volatility"] = returns.groupby(
+        prices["cryptocurrency"]
+    ).transform(lambda ret: ret.rolling(window=2).std() * np.sqrt(2))
+    synced = attach_candles(tweets, prices, columns=["minutely_volatility"])
+    return {
+        coin: abs(
+            frame[["minutely_volatility", "sentiment"]].corr(method="pearson")[
+                "minutely_volatility"
+            ]["sentiment"]
+        )
+        for coin, frame in synced.groupby("cryptocurrency")
+    }
+
+
+def test_read_feed_rankings_match_the_batch_social_volatility(tmp_path):
+    rng = np.random.default_rng(1)
+    minutes = 200
+    times = START + pd.to_timedelta(np.arange(minutes), unit="min")
+    prices, tweets = [], []
+    for coin, noise in [("BTC", 0.2), ("ETH", 1.0), ("DOGE", 3.0)]:
+        returns = rng.normal(scale=0.01, size=minutes)
+        price = 100 * np.exp(np.cumsum(returns))
+        prices.append(
+            DataFrame({"time": times, "cryptocurrency": coin, "price": price})
+        )
+        for minute, time in enumerate(times):
+            for _ in range(rng.integers(0, 4)):
+                tweets.append(
+                    {
+                        "time": time
+                        + pd.Timedelta(seconds=int(rng.integers(0, 60))),
+                        "cryptocurrency": coin,
+                        "sentiment": abs(returns[minute]) * 50
+                        + rng.normal(scale=noise),
+                    }
+                )
+    prices = pd.concat(prices, ignore_index=True)
+    tweets = DataFrame(tweets)
+
+    # Candles are written as dates and tweets as epoch seconds, with the
+    # candle of a minute first.
+    feed = pd.concat(
+        [
+            DataFrame(
+                {
+                    "time": prices["time"].dt.strftime("%Y-%m-%d %H:%M:%S"),
+                    "order": prices["time"],
+                    "kind": "candle",
+                    "coin": prices["cryptocurrency"],
+                    "value": prices["price"],
+                }
+            ),
+            DataFrame(
+                {
+                    "time": (tweets["time"] - pd.Timestamp(0))
+                    // pd.Timedelta(seconds=1),
+                    "order": tweets["time"],
+                    "kind": "tweet",
+                    "coin": tweets["cryptocurrency"],
+                    "value": tweets["sentiment"],
+                }
+            ),
+        ]
+    ).sort_values(["order", "kind"], kind="stable")
+    # Finishes the last minute.
+    feed.loc[len(feed)] = [
+        str(times[-1] + pd.Timedelta(minutes=1)),
+        None,
+        "candle",
+        "BTC",
+        1.0,
+    ]
+    path = tmp_path / "feed.csv"
+    feed.drop(columns="order").to_csv(path, index=False)
+
+    stream = SocialVolatilityStream(
+        volatility_window=2, correlation_window=minutes
+    )
+    rankings = list(stream.replay(read_feed(str(path))))
+
+    assert len(rankings) == minutes
+    assert rankings[-1].time == times[-1]
+    expected = batch_social_volatility(prices, tweets)
+    ranked = rankings[-1].social_volatility
+    assert list(ranked) == sorted(expected, key=expected.get, reverse=True)
+    assert ranked == pytest.approx(expected, rel=1e-9)
+
+
+def test_prices_that_are_not_positive_restart_the_volatility():
+    stream = SocialVolatilityStream(volatility_window=2)
+    for minute, price in enumerate([100, 101, 102, 0, 103, 104, 105]):
+        stream.on_candle("BTC", minute * MINUTE, price)
+    state = stream.coins["BTC"]
+
+    assert all(
+        math.isnan(state.volatilities[minute * MINUTE]) for minute in (3, 4, 5)
+    )
+    assert not math.isnan(state.volatilities[6 * MINUTE])
+    assert not math.isnan(state.volatilities[2 * MINUTE])
+
+
+def test_tweets_waiting_for_a_candle_expire():
+    stream = SocialVolatilityStream(max_delay=5)
+    stream.on_candle("BTC", 0, 100)
+    for minute in range(1, 50):
+        stream.on_tweet("BTC", minute * MINUTE + 30, 0.5)
+
+    assert sorted(stream.coins["BTC"].pending) == [
+        minute * MINUTE for minute in range(44, 50)
+    ]